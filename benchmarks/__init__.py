@@ -0,0 +1,4 @@
+# benchmarks/__init__.py
+# Benchmarks for core_logic, the CLI and the GUI. Every module also runs as a script
+# (python benchmarks/<name>.py); suite.py is the regression suite with a JSON baseline,
+# datagen.py the seeded synthetic dataset generator it uses.
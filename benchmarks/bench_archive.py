@@ -0,0 +1,69 @@
+# benchmarks/bench_archive.py
+# What archiving buys: load / save / sort of a task file holding years of finished work,
+# before and after the completed tasks are moved to the archive (core_logic.set_archive_policy),
+# plus the one-off cost of the archiving load and of reading the archive back on demand.
+#
+# Usage: python benchmarks/bench_archive.py [count] [--days 30] [--years 5] [--completed 0.9]
+
+import argparse
+import datetime
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import core_logic
+from benchmarks import datagen
+
+def timed(function, repeat=3):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples), result
+
+def hot_costs(label, data_file):
+    load_seconds, tasks = timed(core_logic.load_tasks_data)
+    save_seconds, _ok = timed(lambda: core_logic.save_tasks_data(tasks))
+    sort_seconds, _rows = timed(lambda: core_logic.query(tasks).order_by('due_date').to_list())
+    print(f"{label:<16}{len(tasks):>9}{os.path.getsize(data_file) / 2 ** 20:>9.1f}"
+          f"{load_seconds * 1000:>10.0f}{save_seconds * 1000:>10.0f}{sort_seconds * 1000:>10.0f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Hot list costs before and after archiving")
+    parser.add_argument("count", type=int, nargs="?", default=200_000)
+    parser.add_argument("--days", type=int, default=30, help="archive completed tasks due this many days ago")
+    parser.add_argument("--years", type=int, default=5, help="due dates spread over this many years up to today")
+    parser.add_argument("--completed", type=float, default=0.9, help="share of completed tasks")
+    args = parser.parse_args()
+
+    start_date = (datetime.date.today() - datetime.timedelta(days=365 * args.years)).isoformat()
+    with tempfile.TemporaryDirectory() as directory:
+        data_file = os.path.join(directory, "tasks.json")
+        datagen.write_dataset(data_file, args.count, start_date=start_date, date_spread_days=365 * args.years + 30,
+                              completed_ratio=args.completed, due_ratio=0.9)
+        core_logic.set_storage_backend(core_logic.JsonFileStorage(data_file))
+        print(f"{args.count} tasks over {args.years} years, {args.completed:.0%} completed, archive after {args.days} days")
+        print(f"{'':<16}{'tasks':>9}{'MB':>9}{'load ms':>10}{'save ms':>10}{'sort ms':>10}")
+        hot_costs("before", data_file)
+
+        core_logic.set_archive_policy(after_days=args.days)
+        started = time.perf_counter()
+        tasks = core_logic.load_tasks_data()
+        core_logic.auto_archive_tasks(tasks)
+        core_logic.save_tasks_data(tasks)
+        archiving_seconds = time.perf_counter() - started
+        core_logic.set_archive_policy(None, None)
+        hot_costs("after", data_file)
+
+        archive_path = core_logic.archive_file()
+        read_seconds, archived = timed(core_logic.load_archived_tasks, repeat=1)
+        print(f"archiving load   {archiving_seconds * 1000:8.0f} ms (once)")
+        print(f"archive          {len(archived)} tasks, {os.path.getsize(archive_path) / 2 ** 20:.1f} MB gzip, "
+              f"read on demand in {read_seconds * 1000:.0f} ms")
+
+if __name__ == '__main__':
+    main()
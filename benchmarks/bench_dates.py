@@ -0,0 +1,90 @@
+# benchmarks/bench_dates.py
+# Microbenchmarks for date validation/parsing: the original strptime validator
+# against the fast path, the cached parser and the batch (optionally NumPy) APIs.
+#
+# Usage: python benchmarks/bench_dates.py [count]
+
+import datetime
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import core_logic
+
+def strptime_validator(date_string):
+    """The validator core_logic used before the fast path."""
+    if not date_string:
+        return True
+    try:
+        datetime.datetime.strptime(date_string, "%Y-%m-%d")
+        return True
+    except ValueError:
+        return False
+
+def make_dates(count, seed=7, unique=False):
+    """Realistic due dates (a few thousand distinct values), or mostly distinct ones if unique."""
+    rng = random.Random(seed)
+    dates = []
+    for _ in range(count):
+        if unique:
+            dates.append(f"{rng.randint(1, 9999):04d}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}")
+            continue
+        roll = rng.random()
+        if roll < 0.2:
+            dates.append(None)
+        elif roll < 0.25:
+            dates.append(f"2026-{rng.randint(1, 14):02d}-{rng.randint(1, 33):02d}") # Some invalid
+        else:
+            dates.append(f"{rng.randint(2020, 2030)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}")
+    return dates
+
+def best_of(func, repeat=5):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    for unique in (False, True):
+        run(make_dates(count, unique=unique), "distinct" if unique else "repeating")
+
+def run(dates, label):
+    count = len(dates)
+
+    def cold_parse():
+        core_logic.parse_date_core.cache_clear()
+        for date_string in dates:
+            core_logic.parse_date_core(date_string)
+
+    def warm_parse():
+        for date_string in dates:
+            core_logic.parse_date_core(date_string)
+
+    scenarios = [
+        ("strptime validator", lambda: [strptime_validator(d) for d in dates]),
+        ("is_valid_date_format_core", lambda: [core_logic.is_valid_date_format_core(d) for d in dates]),
+        ("parse_date_core (cleared cache)", cold_parse),
+        ("parse_date_core (warm cache)", warm_parse),
+        ("validate_dates_core (python)", lambda: core_logic.validate_dates_core(dates, use_numpy=False)),
+        ("parse_dates_core (python)", lambda: core_logic.parse_dates_core(dates, use_numpy=False)),
+    ]
+    if core_logic._numpy() is not None:
+        scenarios += [
+            ("validate_dates_core (numpy)", lambda: core_logic.validate_dates_core(dates, use_numpy=True)),
+            ("parse_dates_core (numpy)", lambda: core_logic.parse_dates_core(dates, use_numpy=True)),
+        ]
+    else:
+        print("NumPy not installed: skipping the vectorized variants")
+
+    warm_parse() # Fill the cache for the warm scenario
+    baseline = None
+    print(f"\n{count} {label} date strings")
+    print(f"{'scenario':<30} {'ms':>9} {'ns/item':>9} {'speedup':>8}")
+    for name, func in scenarios:
+        seconds = best_of(func)
+        if baseline is None:
+            baseline = seconds
+        print(f"{name:<30} {seconds * 1000:>9.1f} {seconds * 1e9 / count:>9.0f} {baseline / seconds:>7.1f}x")
+
+if __name__ == '__main__':
+    main()
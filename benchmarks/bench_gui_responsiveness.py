@@ -0,0 +1,95 @@
+# benchmarks/bench_gui_responsiveness.py
+# How responsive the GUI event loop stays while a large tasks.json is loaded:
+# a 10 ms QTimer records the gap between its ticks, once with the old synchronous
+# load on the UI thread and once with TodoAppGUI's background load.
+#
+# Usage: QT_QPA_PLATFORM=offscreen python benchmarks/bench_gui_responsiveness.py [count]
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt6.QtCore import QTimer
+from PyQt6.QtWidgets import QApplication
+
+import core_logic
+import todo_app_gui
+
+TICK_MS = 10
+
+def write_tasks(path, count, seed=7):
+    rng = random.Random(seed)
+    tasks = core_logic.new_task_container()
+    for number in range(count):
+        due_date = f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}" if rng.random() < 0.7 else None
+        core_logic.add_task_data(tasks, f"任务 {number}", due_date, rng.choice(("high", "medium", "low", None)))
+    core_logic.JsonFileStorage(path).save(tasks)
+
+def measure(app, window, start_load):
+    """Runs start_load() inside the event loop and returns (seconds until rows are shown, tick gaps in ms)."""
+    window.tasks_data_list = []
+    window.show_tasks_gui()
+    gaps = []
+    last_tick = [time.perf_counter()]
+    started = [False]
+
+    def tick():
+        now = time.perf_counter()
+        if started[0]:
+            gaps.append((now - last_tick[0]) * 1000)
+        last_tick[0] = now
+        if started[0] and window.task_model.rowCount() > 1:
+            app.quit()
+
+    timer = QTimer()
+    timer.timeout.connect(tick)
+    timer.start(TICK_MS)
+    started_at = [0.0]
+
+    def start():
+        last_tick[0] = started_at[0] = time.perf_counter()
+        started[0] = True
+        start_load()
+
+    QTimer.singleShot(50, start)
+    app.exec()
+    timer.stop()
+    return time.perf_counter() - started_at[0], gaps
+
+def report(label, seconds, gaps):
+    gaps = sorted(gaps)
+    p99 = gaps[min(len(gaps) - 1, int(len(gaps) * 0.99))]
+    print(f"{label:<12} load+show {seconds:6.2f}s  ticks {len(gaps):5d}  "
+          f"max gap {gaps[-1]:8.1f} ms  p99 gap {p99:8.1f} ms")
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    app = QApplication(sys.argv)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, core_logic.DATA_FILE)
+        write_tasks(path, count)
+        core_logic.set_storage_backend(core_logic.JsonFileStorage(path))
+        print(f"{count} tasks, {os.path.getsize(path) / 1e6:.1f} MB, timer interval {TICK_MS} ms")
+
+        window = todo_app_gui.TodoAppGUI()
+        while len(window.tasks_data_list) < count: # The startup load
+            app.processEvents()
+            time.sleep(0.01)
+
+        def synchronous_load():
+            window.tasks_data_list = core_logic.load_tasks_data()
+            window.show_tasks_gui()
+
+        seconds, gaps = measure(app, window, synchronous_load)
+        report("synchronous", seconds, gaps)
+        seconds, gaps = measure(app, window, window.populate_task_list_gui)
+        report("background", seconds, gaps)
+        window.close()
+
+if __name__ == '__main__':
+    main()
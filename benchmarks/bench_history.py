@@ -0,0 +1,115 @@
+# benchmarks/bench_history.py
+# Cost of core_logic.TaskHistory (undo/redo + time travel) over a generated task list:
+#   memory      bytes per recorded change, per kind of change (tracemalloc, with minus
+#               without a history attached), next to the history's own estimate
+#   time        time per change, and the extra time for recording it (runs without tracemalloc)
+#   undo        time of one undo() and one redo()
+#   as_of       time of tasks_as_of() halfway back through the log, with and without
+#               checkpoints, for count tasks and for 1000
+#
+# Usage: python benchmarks/bench_history.py [count] [changes]   (default: 100000 5000)
+
+import gc
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import core_logic
+from benchmarks import datagen
+
+CHANGE_KINDS = ("add", "update", "toggle", "delete")
+
+def apply_changes(tasks, kind, count, seed=1):
+    """count changes of one kind (or "mixed"), through the core functions."""
+    rng = random.Random(seed)
+    ids = [task['id'] for task in tasks]
+    for number in range(count):
+        change = rng.choice(CHANGE_KINDS) if kind == "mixed" else kind
+        if change == "add" or not ids:
+            task = core_logic.add_task_data(tasks, f"history bench #{number}", "2026-06-01", "low")
+            ids.append(task['id'])
+        elif change == "delete":
+            core_logic.delete_task_by_id(tasks, ids.pop(rng.randrange(len(ids))))
+        else:
+            task = tasks.get_by_id(ids[rng.randrange(len(ids))])
+            if change == "update":
+                core_logic.update_task_data(task, f"edited #{number}", task['due_date'], "high")
+            else:
+                core_logic.toggle_task_completion_data(task)
+
+def measure(tasks_count, kind, changes, with_history, trace):
+    """(traced bytes or 0, seconds, history) for changes of kind on a fresh list."""
+    tasks = datagen.generate_tasks(tasks_count, container=core_logic.TaskList())
+    history = None
+    gc.collect()
+    if trace:
+        tracemalloc.start()
+    if with_history:
+        history = core_logic.TaskHistory(tasks, max_bytes=1 << 40, checkpoint_interval=1 << 40)
+    started = time.perf_counter()
+    apply_changes(tasks, kind, changes)
+    seconds = time.perf_counter() - started
+    traced = 0
+    if trace:
+        gc.collect()
+        traced = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+    if history is not None:
+        history.detach()
+    return traced, seconds, history
+
+def timed(function, repeat=5):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+def time_travel_seconds(tasks_count, changes, checkpoint_interval):
+    tasks = datagen.generate_tasks(tasks_count, container=core_logic.TaskList())
+    history = core_logic.TaskHistory(tasks, max_bytes=1 << 40, checkpoint_interval=checkpoint_interval)
+    halfway = None
+    for number in range(2):
+        apply_changes(tasks, "mixed", changes // 2, seed=number + 2)
+        halfway = halfway or time.time()
+    seconds = timed(lambda: history.tasks_as_of(halfway), repeat=3)
+    history.detach()
+    return seconds
+
+def main():
+    tasks_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    changes = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    print(f"{tasks_count} tasks, {changes} changes of each kind")
+    print(f"{'change':<8}{'B/change':>10}{'estimate':>10}{'µs/change':>11}{'+µs':>8}")
+    for kind in CHANGE_KINDS + ("mixed",):
+        plain_bytes, _seconds, _history = measure(tasks_count, kind, changes, False, trace=True)
+        traced_bytes, _seconds, history = measure(tasks_count, kind, changes, True, trace=True)
+        _bytes, plain_seconds, _history = measure(tasks_count, kind, changes, False, trace=False)
+        _bytes, seconds, _history = measure(tasks_count, kind, changes, True, trace=False)
+        print(f"{kind:<8}{(traced_bytes - plain_bytes) / changes:10.0f}{history.memory_usage() / changes:10.0f}"
+              f"{seconds / changes * 1e6:11.1f}{(seconds - plain_seconds) / changes * 1e6:8.1f}")
+
+    tasks = datagen.generate_tasks(tasks_count, container=core_logic.TaskList())
+    history = core_logic.TaskHistory(tasks)
+    apply_changes(tasks, "mixed", changes)
+    undo = timed(lambda: (history.undo(), history.redo()))
+    print(f"undo + redo            {undo * 1000:9.3f} ms")
+    history.detach()
+
+    # A checkpoint saves replaying the log but still costs a full copy of the list, so it
+    # pays off when the log is long next to the list; try a small list as well
+    default = core_logic.HISTORY_CHECKPOINT_INTERVAL
+    logged = changes * 4
+    print(f"as_of, {logged} changes logged, checkpoint every {default}:")
+    for count in (tasks_count, min(tasks_count, 1000)):
+        with_checkpoints = time_travel_seconds(count, logged, default)
+        log_only = time_travel_seconds(count, logged, 1 << 40)
+        print(f"  {count:>7} tasks  checkpoints {with_checkpoints * 1000:8.1f} ms   log only {log_only * 1000:8.1f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+# benchmarks/bench_memory.py
+# Compares the resident memory of the task representations in core_logic:
+# plain dicts (the pre-Task format), a TaskList of Task objects and the columnar TaskStore.
+#
+# Usage: python benchmarks/bench_memory.py [task_count]
+
+import gc
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import core_logic
+
+def make_records(count, seed=42):
+    """Builds count task dicts shaped like the records stored in tasks.json."""
+    rng = random.Random(seed)
+    words = ["写报告", "review", "买菜", "deploy", "meeting", "整理文档", "fix", "bug", "call", "plan"]
+    priorities = ["high", "medium", "low", None]
+    records = []
+    for i in range(count):
+        due_date = None
+        if rng.random() < 0.7:
+            due_date = f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        records.append({
+            'id': i + 1,
+            'description': " ".join(rng.choice(words) for _ in range(rng.randint(2, 5))) + f" #{i}",
+            'completed': rng.random() < 0.3,
+            'due_date': due_date,
+            'priority': rng.choice(priorities),
+        })
+    return records
+
+def measure(build):
+    """Returns (bytes allocated by build(), result) using tracemalloc."""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    current, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, result
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    records = make_records(count)
+
+    # Each representation gets its own copies of the strings so the numbers are comparable
+    # to what load_tasks_data would hold after parsing a file.
+    candidates = [
+        ("list of dicts", lambda: [json_roundtrip(record) for record in records]),
+        ("TaskList[Task]", lambda: core_logic.TaskList(
+            core_logic._sanitize_task_item(json_roundtrip(record)) for record in records)),
+        ("TaskStore", lambda: core_logic.TaskStore(json_roundtrip(record) for record in records)),
+    ]
+
+    # The description text itself is the same in every representation; the
+    # "overhead" columns show what each structure costs on top of it.
+    text_bytes = sum(sys.getsizeof(record['description']) for record in records)
+
+    baseline = None
+    print(f"{count} tasks, {text_bytes / count:.1f} bytes/task of description text")
+    print(f"{'representation':<16} {'bytes/task':>11} {'total MiB':>10} {'vs dicts':>9} "
+          f"{'overhead/task':>14} {'vs dicts':>9}")
+    for name, build in candidates:
+        used, result = measure(build)
+        overhead = used - text_bytes
+        if baseline is None:
+            baseline = (used, overhead)
+        print(f"{name:<16} {used / count:>11.1f} {used / 2 ** 20:>10.1f} {baseline[0] / used:>8.1f}x "
+              f"{overhead / count:>14.1f} {baseline[1] / overhead:>8.1f}x")
+        del result
+
+def json_roundtrip(record):
+    # Fresh objects per call, as json.load would produce them.
+    return {key: (''.join(value) if isinstance(value, str) else value) for key, value in record.items()}
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+# benchmarks/bench_parallel_load.py
+# Speedup curve of the multi-process JSON snapshot load (core_logic._read_snapshot_parallel)
+# over the serial streaming load, for a range of worker counts. Every parallel result is
+# checked against the serial one (same tasks, same order).
+#
+# Usage: python benchmarks/bench_parallel_load.py [count] [workers,...]
+#        (default: 1000000 tasks, 1,2,4,... up to the number of usable CPUs, at least 4)
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import core_logic
+from benchmarks import datagen
+
+REPEAT = 3
+
+def serial_load(path):
+    with core_logic.paused_gc():
+        return core_logic.new_task_container(core_logic.iter_tasks_data(path))
+
+def parallel_load(path, workers):
+    with core_logic.paused_gc():
+        tasks = core_logic._read_snapshot_parallel(path, workers=workers, min_bytes=0)
+    if tasks is None:
+        raise RuntimeError("the parallel loader fell back to the serial path")
+    return tasks
+
+def timed(function):
+    samples = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        result = function()
+        samples.append(time.perf_counter() - started)
+    return result, statistics.median(samples)
+
+def default_worker_counts():
+    counts, workers = [], 1
+    while workers <= max(core_logic.parallel_load_workers(), 4):
+        counts.append(workers)
+        workers *= 2
+    return counts
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    worker_counts = [int(w) for w in sys.argv[2].split(",")] if len(sys.argv) > 2 else default_worker_counts()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "tasks.json")
+        datagen.write_dataset(path, count)
+        size_mb = os.path.getsize(path) / 2 ** 20
+        print(f"{count} tasks, {size_mb:.0f} MB, {core_logic.parallel_load_workers()} usable CPUs, median of {REPEAT}")
+        expected, serial_seconds = timed(lambda: serial_load(path))
+        expected_rows = [core_logic.task_to_dict(task) for task in expected]
+        del expected
+        print(f"{'loader':<14}{'seconds':>9}{'speedup':>9}")
+        print(f"{'serial':<14}{serial_seconds:9.2f}{1:9.2f}")
+        for workers in worker_counts:
+            tasks, seconds = timed(lambda: parallel_load(path, workers))
+            if [core_logic.task_to_dict(task) for task in tasks] != expected_rows:
+                raise RuntimeError(f"{workers} workers: result differs from the serial load")
+            del tasks
+            print(f"{f'{workers} workers':<14}{seconds:9.2f}{serial_seconds / seconds:9.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+# benchmarks/bench_scheduler.py
+# scheduler.TaskScheduler against answering the same questions from a sorted list:
+#   queries     overdue / due today / next 10 due, from sorted() over a copy, from the
+#               task_index due-date index (filtered), and from the scheduler's heap
+#   build       building the scheduler once
+#   upkeep      time its task listener adds to a toggle / update / add / delete
+#
+# Usage: python benchmarks/bench_scheduler.py [count]   (default: 1000000)
+
+import datetime
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import core_logic
+import scheduler
+import task_index
+from benchmarks import datagen
+
+def median_ms(function, repeat=5):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+def from_sorted(dated_in_order, today):
+    """The three answers from pending tasks already in (due_date, ...) order."""
+    pending = [task for task in dated_in_order if task.get('due_date') and not task.get('completed')]
+    return ([task for task in pending if task['due_date'] < today],
+            [task for task in pending if task['due_date'] == today],
+            [task for task in pending if task['due_date'] >= today][:10])
+
+def edit_ms(tasks, edit, repeat=2000):
+    """Mean milliseconds of edit(task) over random tasks."""
+    rng = random.Random(1)
+    targets = [tasks.get_by_id(task_id) for task_id in rng.sample([task['id'] for task in tasks], repeat)]
+    started = time.perf_counter()
+    for task in targets:
+        edit(task)
+    return (time.perf_counter() - started) * 1000 / repeat
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    today = datetime.date.today()
+    start_date = (today - datetime.timedelta(days=180)).isoformat()
+    tasks = datagen.generate_tasks(count, container=core_logic.TaskStore(), start_date=start_date)
+    today = today.isoformat()
+    print(f"{count} tasks (TaskStore), due dates over a year around {today}")
+
+    sort_key = core_logic.SORT_KEYS_CORE['due_date']
+    sorted_ms = median_ms(lambda: from_sorted(sorted(tasks, key=sort_key), today), repeat=3)
+    indexes = task_index.indexes_for(tasks)
+    index_ms = median_ms(lambda: from_sorted(indexes.sorted_by_due_date(), today), repeat=3)
+    started = time.perf_counter()
+    task_scheduler = scheduler.TaskScheduler(tasks)
+    build_ms = (time.perf_counter() - started) * 1000
+    print(f"{'all three answers, sorted() copy':<40}{sorted_ms:10.1f} ms")
+    print(f"{'all three answers, task_index':<40}{index_ms:10.1f} ms")
+    print(f"{'scheduler build (once)':<40}{build_ms:10.1f} ms")
+    for name, query in (("overdue", lambda: task_scheduler.overdue(today)),
+                        ("due today", lambda: task_scheduler.due_on(today)),
+                        ("next 10", lambda: task_scheduler.next_due(10, today)),
+                        ("counts", lambda: task_scheduler.counts(today))):
+        print(f"{'scheduler ' + name:<40}{median_ms(query):10.3f} ms   ({len(query()) if name != 'counts' else query()})")
+
+    # 每次修改时监听器的额外开销：同样的修改在有/没有 scheduler 时各做一遍
+    indexes.detach()
+    def rescheduled(task):
+        core_logic.update_task_data(task, task['description'], today, "high")
+    costs = {}
+    for label in ("without", "with"):
+        if label == "without":
+            task_scheduler.detach()
+        else:
+            task_scheduler = scheduler.TaskScheduler(tasks)
+        costs[label] = (edit_ms(tasks, core_logic.toggle_task_completion_data),
+                        edit_ms(tasks, rescheduled),
+                        median_ms(lambda: core_logic.add_task_data(tasks, "new", today, "low"), repeat=200),
+                        edit_ms(tasks, lambda task: core_logic.delete_task_by_id(tasks, task['id']), repeat=500))
+    print(f"{'upkeep per edit (µs)':<24}{'toggle':>9}{'update':>9}{'add':>9}{'delete':>9}")
+    print(f"{'':<24}" + "".join(f"{(with_ms - without_ms) * 1000:9.1f}"
+                                for with_ms, without_ms in zip(costs["with"], costs["without"])))
+
+if __name__ == '__main__':
+    main()
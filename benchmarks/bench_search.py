@@ -0,0 +1,68 @@
+# benchmarks/bench_search.py
+# Full-text search: building search_index.SearchIndex, then query latency against a
+# lowercase substring scan over every description, and the cost the index adds to
+# add/update/delete through its task listener.
+#
+# Usage: python benchmarks/bench_search.py [count]   (default: 1000000)
+
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import core_logic
+import search_index
+
+WORDS = ("review", "report", "meeting", "invoice", "deploy", "backup", "budget", "design",
+         "季度报告", "周会", "采购", "部署", "预算", "设计评审", "客户回访", "买菜")
+QUERIES = ("report", "rep", "季度", "设计评审", "deploy 预算", "客户 invoice", "task 4242")
+
+def make_tasks(count, seed=7):
+    rng = random.Random(seed)
+    tasks = core_logic.TaskStore()
+    for number in range(count):
+        words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 5)))
+        tasks.append({'id': core_logic._new_task_id(), 'description': f"{words} task {number}",
+                      'completed': rng.random() < 0.3, 'due_date': None, 'priority': None})
+    return tasks
+
+def median_ms(function, repeat=5):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    tasks = make_tasks(count)
+    started = time.perf_counter()
+    index = search_index.search_index_for(tasks)
+    print(f"{count} tasks, index built in {time.perf_counter() - started:.2f} s")
+    print(f"{'query':<16}{'matches':>9}{'index ms':>10}{'scan ms':>10}")
+    for query in QUERIES:
+        matches = len(index.search(query, limit=count))
+        needle = query.split()[0].lower()
+        index_ms = median_ms(lambda: index.search(query))
+        scan_ms = median_ms(lambda: [task for task in tasks if needle in task['description'].lower()][:20],
+                            repeat=1)
+        print(f"{query:<16}{matches:9d}{index_ms:10.2f}{scan_ms:10.1f}")
+
+    rng = random.Random(1)
+    targets = [tasks[rng.randrange(len(tasks))] for _ in range(2000)]
+    for label, attached in (("without index", False), ("with index", True)):
+        if not attached:
+            index.detach()
+        else:
+            core_logic.add_task_listener(index._on_task_event)
+        started = time.perf_counter()
+        for task in targets[:1000] if not attached else targets[1000:]:
+            core_logic.update_task_data(task, "采购 deploy 新描述", None, None)
+            core_logic.add_task_data(tasks, "周会 review")
+        print(f"1000 update+add {label:<14}{(time.perf_counter() - started) * 1000:8.1f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+# benchmarks/bench_server.py
+# Load test of task_server.py on localhost: starts the server in its own process over a
+# generated task file, then keeps --concurrency keep-alive connections busy for
+# --duration seconds with a mix of requests, and reports requests/sec and the latency
+# percentiles (p50/p99) overall and per kind of request. Always 127.0.0.1: it is not
+# meant to be pointed at anything else.
+#
+# Usage: python benchmarks/bench_server.py [--size 100000] [--concurrency 32] [--duration 10]
+#                                          [--stream] (also time streaming the whole list)
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..'))
+from benchmarks import datagen
+
+SERVER = os.path.join(BENCH_DIR, '..', "task_server.py")
+HOST = "127.0.0.1"
+
+# (名称, 权重)；任务 id 从 /tasks?limit=... 的结果里随机取
+REQUEST_MIX = (("get", 60), ("list_page", 20), ("toggle", 15), ("add", 5))
+
+async def request(reader, writer, method, path, body=None):
+    """One request on a keep-alive connection. Returns (status, body bytes)."""
+    data = json.dumps(body).encode('utf-8') if body is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: {HOST}\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode('latin-1').partition(":")
+        headers[name.strip().lower()] = value.strip()
+    if headers.get('transfer-encoding') == "chunked":
+        chunks = []
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            chunk = await reader.readexactly(size + 2)
+            if not size:
+                break
+            chunks.append(chunk[:-2])
+        return status, b"".join(chunks)
+    return status, await reader.readexactly(int(headers.get('content-length', 0)))
+
+async def client(port, task_ids, deadline, latencies, rng):
+    reader, writer = await asyncio.open_connection(HOST, port)
+    kinds = [kind for kind, _weight in REQUEST_MIX]
+    weights = [weight for _kind, weight in REQUEST_MIX]
+    try:
+        while time.perf_counter() < deadline:
+            kind = rng.choices(kinds, weights)[0]
+            task_id = rng.choice(task_ids)
+            started = time.perf_counter()
+            if kind == "get":
+                status, _body = await request(reader, writer, "GET", f"/tasks/{task_id}")
+            elif kind == "list_page":
+                status, _body = await request(reader, writer, "GET", "/tasks?status=pending&limit=20")
+            elif kind == "toggle":
+                status, _body = await request(reader, writer, "POST", f"/tasks/{task_id}/toggle")
+            else:
+                status, _body = await request(reader, writer, "POST", "/tasks",
+                                              {"description": "load test", "priority": "low"})
+            if status >= 400:
+                raise RuntimeError(f"{kind}: HTTP {status}")
+            latencies.setdefault(kind, []).append(time.perf_counter() - started)
+    finally:
+        writer.close()
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+def report_line(name, samples, seconds):
+    samples = sorted(samples)
+    return (f"{name:<12}{len(samples):>9}{len(samples) / seconds:>10.0f}"
+            f"{percentile(samples, 0.5) * 1000:>10.2f}{percentile(samples, 0.99) * 1000:>10.2f}")
+
+async def run_load(port, concurrency, duration, stream):
+    reader, writer = await asyncio.open_connection(HOST, port)
+    _status, body = await request(reader, writer, "GET", "/tasks?limit=5000")
+    task_ids = [task['id'] for task in json.loads(body)]
+    if stream:
+        started = time.perf_counter()
+        _status, body = await request(reader, writer, "GET", "/tasks")
+        print(f"streamed the whole list: {len(json.loads(body))} tasks, {len(body) / 2 ** 20:.1f} MB "
+              f"in {time.perf_counter() - started:.2f} s")
+    writer.close()
+
+    latencies = {}
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(client(port, task_ids, deadline, latencies, random.Random(number))
+                           for number in range(concurrency)))
+    seconds = time.perf_counter() - started
+    print(f"{'request':<12}{'count':>9}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for kind, _weight in REQUEST_MIX:
+        if kind in latencies:
+            print(report_line(kind, latencies[kind], seconds))
+    print(report_line("all", [value for values in latencies.values() for value in values], seconds))
+
+def main():
+    parser = argparse.ArgumentParser(description="task_server.py load test (localhost only)")
+    parser.add_argument("--size", type=int, default=100_000, help="tasks in the dataset")
+    parser.add_argument("--concurrency", type=int, default=32, help="keep-alive connections")
+    parser.add_argument("--duration", type=float, default=10, help="seconds of load")
+    parser.add_argument("--stream", action="store_true", help="also time a GET of the whole list")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        datagen.write_dataset(os.path.join(directory, "tasks.json"), args.size)
+        server = subprocess.Popen([sys.executable, SERVER, "--host", HOST, "--port", "0"], cwd=directory,
+                                  stdout=subprocess.PIPE, text=True)
+        try:
+            banner = server.stdout.readline() # "listening on http://127.0.0.1:PORT (N tasks)"
+            port = int(banner.split(f"{HOST}:")[1].split()[0])
+            print(f"{args.size} tasks, {args.concurrency} connections, {args.duration:g} s")
+            asyncio.run(run_load(port, args.concurrency, args.duration, args.stream))
+        finally:
+            server.terminate()
+            server.wait()
+
+if __name__ == '__main__':
+    main()
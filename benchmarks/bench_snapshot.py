@@ -0,0 +1,61 @@
+# benchmarks/bench_snapshot.py
+# Snapshot size and load time: tasks.json (indent=4) versus the binary snapshot,
+# uncompressed (memory-mapped), zlib and lzma. "first page" additionally reads the
+# first 20 rows, which is what the CLI/GUI show right after startup.
+#
+# Usage: python benchmarks/bench_snapshot.py [count]   (default: 1000000)
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import core_logic
+
+def make_tasks(count, seed=7):
+    rng = random.Random(seed)
+    tasks = core_logic.TaskStore()
+    for number in range(count):
+        due_date = f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}" if rng.random() < 0.7 else None
+        tasks.append({'id': core_logic._new_task_id(), 'description': f"任务 {number} review the report",
+                      'completed': rng.random() < 0.3, 'due_date': due_date,
+                      'priority': rng.choice(("high", "medium", "low", None))})
+    return tasks
+
+def timed(function):
+    started = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - started
+
+def first_page(tasks):
+    return [core_logic.task_to_dict(tasks[position]) for position in range(min(20, len(tasks)))]
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    tasks = make_tasks(count)
+    print(f"{count} tasks")
+    print(f"{'format':<16}{'size MB':>9}{'write s':>9}{'load ms':>10}{'first page ms':>15}")
+    with tempfile.TemporaryDirectory() as directory:
+        json_path = os.path.join(directory, "tasks.json")
+        _result, write_seconds = timed(lambda: core_logic._write_snapshot(json_path, tasks))
+        core_logic.use_columnar_store(True)
+        loaded, load_seconds = timed(lambda: core_logic._read_snapshot(json_path))
+        core_logic.use_columnar_store(False)
+        _rows, page_seconds = timed(lambda: first_page(loaded))
+        print(f"{'json indent=4':<16}{os.path.getsize(json_path) / 1e6:9.1f}{write_seconds:9.2f}"
+              f"{load_seconds * 1000:10.1f}{(load_seconds + page_seconds) * 1000:15.1f}")
+        del loaded
+        for compression in (None, 'zlib', 'lzma'):
+            path = os.path.join(directory, f"tasks.{compression or 'raw'}.bin")
+            _result, write_seconds = timed(lambda: core_logic.write_binary_snapshot(path, tasks, compression))
+            loaded, load_seconds = timed(lambda: core_logic.read_binary_snapshot(path))
+            _rows, page_seconds = timed(lambda: first_page(loaded))
+            label = f"binary {compression or 'mmap'}"
+            print(f"{label:<16}{os.path.getsize(path) / 1e6:9.1f}{write_seconds:9.2f}"
+                  f"{load_seconds * 1000:10.1f}{(load_seconds + page_seconds) * 1000:15.1f}")
+            del loaded
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+# benchmarks/bench_startup.py
+# CLI startup cost, each measured in a fresh interpreter over a generated task file:
+#   import      cumulative import time of todo_app_cli (python -X importtime)
+#   menu        wall clock from process start until the interactive menu is printed
+#   menu+exit   wall clock of starting the menu and choosing "exit" right away
+#   list        wall clock of the batch command "list --limit 1"
+#
+# Usage: python benchmarks/bench_startup.py [count] [runs]   (default: 100000 5)
+
+import compileall
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.join(BENCH_DIR, '..')
+sys.path.insert(0, REPO_DIR)
+from benchmarks import datagen
+
+CLI = os.path.join(REPO_DIR, "todo_app_cli.py")
+MENU_MARKER = "请输入你的选择".encode("utf-8")
+
+def import_milliseconds(directory):
+    output = subprocess.run([sys.executable, "-X", "importtime", "-c", "import todo_app_cli"],
+                            cwd=directory, env=dict(os.environ, PYTHONPATH=REPO_DIR),
+                            capture_output=True, text=True).stderr
+    for line in output.splitlines():
+        if line.rstrip().endswith("| todo_app_cli"):
+            return int(line.split("|")[1]) / 1000
+    raise RuntimeError(output[-2000:])
+
+def menu_seconds(directory):
+    """(seconds until the menu prompt shows, seconds until the process exited after choosing exit)."""
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, CLI], cwd=directory, stdin=subprocess.PIPE,
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    seen = b""
+    while MENU_MARKER not in seen:
+        chunk = os.read(process.stdout.fileno(), 65536)
+        if not chunk:
+            raise RuntimeError("the CLI exited before showing the menu")
+        seen += chunk
+    shown = time.perf_counter() - started
+    process.communicate(b"7\n")
+    return shown, time.perf_counter() - started
+
+def list_seconds(directory):
+    started = time.perf_counter()
+    subprocess.run([sys.executable, CLI, "list", "--limit", "1"], cwd=directory,
+                   stdout=subprocess.DEVNULL, check=True)
+    return time.perf_counter() - started
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    # Byte-compile first: otherwise a stale or missing .pyc (PYTHONDONTWRITEBYTECODE) makes
+    # every run recompile core_logic, which is not what an installed program pays
+    compileall.compile_dir(REPO_DIR, maxlevels=1, quiet=1)
+    with tempfile.TemporaryDirectory() as directory:
+        datagen.write_dataset(os.path.join(directory, "tasks.json"), count)
+        list_seconds(directory) # First run: creates the journal/summary files, warms the page cache
+        imports = [import_milliseconds(directory) for _ in range(runs)]
+        menus = [menu_seconds(directory) for _ in range(runs)]
+        lists = [list_seconds(directory) for _ in range(runs)]
+    print(f"{count} tasks, median of {runs} runs")
+    print(f"import todo_app_cli {statistics.median(imports):9.1f} ms")
+    print(f"menu shown          {statistics.median(shown for shown, _exited in menus) * 1000:9.1f} ms")
+    print(f"menu + exit         {statistics.median(exited for _shown, exited in menus) * 1000:9.1f} ms")
+    print(f"list --limit 1      {statistics.median(lists) * 1000:9.1f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+# benchmarks/bench_storage.py
+# Per-operation latency (mutate + save) of the storage backends: the JSON full
+# rewrite, the snapshot + journal default and SQLite, plus the cost of the CLI's
+# sort/filter views answered in memory (indexes) versus pushed down to SQL, and a
+# burst of edits saved one by one versus with write coalescing.
+#
+# Usage: python benchmarks/bench_storage.py [count ...]   (default: 10000 100000)
+
+import itertools
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import core_logic
+import task_index
+
+def make_tasks(count, seed=7):
+    rng = random.Random(seed)
+    tasks = core_logic.new_task_container()
+    for number in range(count):
+        due_date = f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}" if rng.random() < 0.7 else None
+        tasks.append(core_logic.Task(id=core_logic._new_task_id(), description=f"任务 {number}",
+                                     completed=rng.random() < 0.3, due_date=due_date,
+                                     priority=rng.choice(("high", "medium", "low", None))))
+    return tasks
+
+def time_operations(tasks, repeat, rng):
+    """Median milliseconds of each operation followed by save_tasks_data()."""
+    # Pick the targets up front: positional access after a delete compacts the TaskList.
+    targets = iter([tasks[rng.randrange(len(tasks))] for _ in range(3 * repeat)])
+    operations = {
+        'add': lambda: core_logic.add_task_data(tasks, "新任务", "2026-05-01", "high"),
+        'update': lambda: core_logic.update_task_data(next(targets), "已修改", "2026-06-01", "low"),
+        'toggle': lambda: core_logic.toggle_task_completion_data(next(targets)),
+        'delete': lambda: core_logic.delete_task_by_id(tasks, next(targets)['id']),
+    }
+    results = {}
+    for name, operation in operations.items():
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            operation()
+            core_logic.save_tasks_data(tasks)
+            samples.append((time.perf_counter() - started) * 1000)
+        results[name] = statistics.median(samples)
+    return results
+
+def time_views(tasks):
+    """
+    Milliseconds for the CLI views: through SQL when the backend supports it, otherwise
+    through task_index (the first view includes building the indexes).
+    """
+    backend = core_logic.get_storage_backend()
+    views = {
+        'sort due': dict(order_by='due_date'),
+        'sort prio': dict(order_by='priority'),
+        'pending': dict(where={'completed': False}),
+    }
+    results = {}
+    for name, conditions in views.items():
+        started = time.perf_counter()
+        if hasattr(backend, 'select_tasks'):
+            backend.select_tasks(tasks, **conditions)
+        else:
+            indexes = task_index.indexes_for(tasks) # Built once, then maintained incrementally
+            if 'order_by' in conditions:
+                if conditions['order_by'] == 'due_date':
+                    indexes.sorted_by_due_date()
+                else:
+                    indexes.sorted_by_priority()
+            else:
+                indexes.with_status(False)
+        results[name] = (time.perf_counter() - started) * 1000
+    return results
+
+def run(count, repeat):
+    print(f"\n{count} tasks (median of {repeat} ops, ms per operation incl. save)")
+    source = make_tasks(count)
+    with tempfile.TemporaryDirectory() as directory:
+        backends = {
+            'json rewrite': core_logic.JsonFileStorage(os.path.join(directory, "tasks.json")),
+            'journal': core_logic.JournalStorage(os.path.join(directory, "journal.json"),
+                                                compact_threshold=10 ** 9),
+            'sqlite': core_logic.SqliteStorage(os.path.join(directory, "tasks.db")),
+        }
+        print(f"{'backend':<14}{'load s':>8}{'add':>9}{'update':>9}{'toggle':>9}{'delete':>9}"
+              f"{'sort due':>10}{'sort prio':>10}{'pending':>9}")
+        for name, backend in backends.items():
+            backend.save(source) # Initial contents
+            core_logic.set_storage_backend(backend)
+            started = time.perf_counter()
+            tasks = core_logic.load_tasks_data()
+            load_seconds = time.perf_counter() - started
+            operations = time_operations(tasks, repeat, random.Random(1))
+            views = time_views(tasks)
+            print(f"{name:<14}{load_seconds:8.2f}" + "".join(f"{operations[op]:9.2f}" for op in operations)
+                  + f"{views['sort due']:10.1f}{views['sort prio']:10.1f}{views['pending']:9.1f}")
+            core_logic.set_storage_backend(core_logic.JsonFileStorage(os.path.join(directory, "unused.json")))
+
+def time_burst(count, edits=200, window=0.5):
+    """A scripted burst of edits, each followed by save_tasks_data(), saved immediately vs coalesced."""
+    print(f"\n{count} tasks, burst of {edits} edits + flush")
+    with tempfile.TemporaryDirectory() as directory:
+        backends = {
+            'json rewrite': core_logic.JsonFileStorage(os.path.join(directory, "tasks.json")),
+            'journal': core_logic.JournalStorage(os.path.join(directory, "journal.json")),
+        }
+        for name, backend in backends.items():
+            backend.save(make_tasks(count))
+            writes = [0]
+            def counting_save(tasks, save=backend.save):
+                writes[0] += 1
+                save(tasks)
+            backend.save = counting_save
+            core_logic.set_storage_backend(backend)
+            for label, seconds in (("immediate", 0), (f"window {window}s", window)):
+                tasks = core_logic.load_tasks_data()
+                core_logic.set_write_coalescing(seconds)
+                writes[0] = 0
+                started = time.perf_counter()
+                for task in itertools.islice(tasks, edits):
+                    core_logic.toggle_task_completion_data(task)
+                    core_logic.save_tasks_data(tasks)
+                core_logic.flush_tasks_data()
+                elapsed = time.perf_counter() - started
+                print(f"{name:<14}{label:<14}{elapsed:8.3f} s  {writes[0]:4d} writes")
+                core_logic.set_write_coalescing(0)
+            core_logic.set_storage_backend(core_logic.JsonFileStorage(os.path.join(directory, "unused.json")))
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000]
+    for count in counts:
+        run(count, repeat=3 if count >= 1_000_000 else 9)
+    time_burst(counts[0])
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+# benchmarks/bench_table.py
+# Cost of printing the CLI task table to a pipe: the previous print-per-row
+# view_tasks_cli versus the buffered renderer, with a cold and a warm row cache,
+# against the bare cost of writing the same number of bytes. stdout is the same
+# colorama wrapper the CLI installs on a pipe (it strips colour codes), over /dev/null.
+#
+# Usage: python benchmarks/bench_table.py [count]   (default: 100000)
+
+import contextlib
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from colorama import Fore
+from colorama.ansitowin32 import AnsiToWin32
+import core_logic
+import todo_app_cli
+
+def make_tasks(count, seed=7):
+    rng = random.Random(seed)
+    tasks = core_logic.new_task_container()
+    for number in range(count):
+        due_date = f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}" if rng.random() < 0.7 else None
+        description = f"任务 {number} 季度报告 review" if rng.random() < 0.5 else f"task {number} deploy the backup job"
+        tasks.append(core_logic.Task(id=core_logic._new_task_id(), description=description,
+                                     completed=rng.random() < 0.3, due_date=due_date,
+                                     priority=rng.choice(("high", "medium", "low", None))))
+    return tasks
+
+def print_per_row_view(tasks_to_display, title="--- 你的任务清单 ---", start_number=1):
+    """view_tasks_cli before the buffered renderer: one print per row, formatted every time."""
+    print(Fore.CYAN + f"\n{title}")
+    header = f"{'序号':<5} | {'状态':<7} | {'任务描述':<40} | {'截止日期':<12} | {'优先级':<8}"
+    print(header)
+    print("-" * len(header))
+    for index, task in enumerate(tasks_to_display):
+        status_marker = (Fore.GREEN if task.get('completed') else Fore.YELLOW) + ("[x]" if task.get('completed') else "[ ]")
+        desc_color = Fore.GREEN if task.get('completed') else Fore.WHITE
+        due_date_display = todo_app_cli.format_date_display_cli(task.get('due_date'))
+        priority_display = todo_app_cli.format_priority_display_cli(task.get('priority'))
+        description_str = task.get('description', '')
+        description_display = description_str[:38] + ".." if len(description_str) > 38 else description_str
+        print(f"{index + start_number:<5} | {status_marker:<13} | {desc_color + description_display:<40} | {due_date_display:<12} | {priority_display:<8}")
+    print(Fore.CYAN + "-" * len(header))
+
+def timed_to_devnull(function):
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, \
+            contextlib.redirect_stdout(AnsiToWin32(devnull, autoreset=True, strip=True).stream):
+        started = time.perf_counter()
+        function()
+        return time.perf_counter() - started
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    tasks = make_tasks(count)
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        todo_app_cli.view_tasks_cli(tasks[:1], page_size=0) # Create the renderer outside the timings
+    todo_app_cli.table_renderer_cli(colored=False)._rows.clear()
+    text = "x" * 100 * count
+    results = [
+        ("write same bytes", timed_to_devnull(lambda: todo_app_cli.write_table_output_cli(text, colored=False))),
+        ("print per row", timed_to_devnull(lambda: print_per_row_view(tasks))),
+        ("buffered, cold", timed_to_devnull(lambda: todo_app_cli.view_tasks_cli(tasks, page_size=0))),
+        ("buffered, warm", timed_to_devnull(lambda: todo_app_cli.view_tasks_cli(tasks, page_size=0))),
+    ]
+    print(f"{count} tasks to {os.devnull}")
+    for label, seconds in results:
+        print(f"{label:<18}{seconds * 1000:9.1f} ms")
+
+if __name__ == '__main__':
+    main()
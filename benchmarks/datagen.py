@@ -0,0 +1,88 @@
+# benchmarks/datagen.py
+# Seeded synthetic task lists for the benchmarks: the same seed and options always
+# give the same tasks (ids included), so timings from different runs and machines
+# describe the same data.
+#
+# Usage: python benchmarks/datagen.py count [-o tasks.json] [--seed 7] [--cjk-ratio 0.5] ...
+
+import argparse
+import datetime
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import core_logic
+
+ASCII_WORDS = ("review", "report", "meeting", "invoice", "deploy", "backup", "budget", "design",
+               "call", "fix", "bug", "plan", "release", "notes", "client", "draft")
+CJK_WORDS = ("季度报告", "周会", "采购", "部署", "预算", "设计评审", "客户回访", "买菜",
+             "整理文档", "修复", "计划", "发布", "写总结", "报销", "面试", "培训")
+DEFAULT_PRIORITY_MIX = {"high": 0.2, "medium": 0.3, "low": 0.3, None: 0.2}
+
+def generate_records(count, seed=7, start_date="2026-01-01", date_spread_days=365, due_ratio=0.7,
+                     priority_mix=None, completed_ratio=0.3, words_per_description=(2, 6), cjk_ratio=0.5):
+    """
+    Yields count task dicts shaped like the records in tasks.json.
+
+    date_spread_days: due dates are spread uniformly over that many days from start_date.
+    due_ratio / completed_ratio: share of tasks with a due date / already completed.
+    priority_mix: {priority: weight}; None is "no priority".
+    words_per_description: (min, max) words; each word is CJK with probability cjk_ratio.
+    """
+    rng = random.Random(seed)
+    first_day = datetime.date.fromisoformat(start_date).toordinal()
+    mix = priority_mix or DEFAULT_PRIORITY_MIX
+    priorities, weights = list(mix), list(mix.values())
+    min_words, max_words = words_per_description
+    taken_ids = set()
+    for number in range(count):
+        task_id = rng.getrandbits(core_logic.TASK_ID_BITS) # Like core_logic._new_task_id, but seeded
+        while not task_id or task_id in taken_ids:
+            task_id = rng.getrandbits(core_logic.TASK_ID_BITS)
+        taken_ids.add(task_id)
+        words = [rng.choice(CJK_WORDS) if rng.random() < cjk_ratio else rng.choice(ASCII_WORDS)
+                 for _ in range(rng.randint(min_words, max_words))]
+        due_date = None
+        if rng.random() < due_ratio:
+            due_date = datetime.date.fromordinal(first_day + rng.randrange(max(date_spread_days, 1))).isoformat()
+        yield {
+            'id': task_id,
+            'description': f"{' '.join(words)} #{number}",
+            'completed': rng.random() < completed_ratio,
+            'due_date': due_date,
+            'priority': rng.choices(priorities, weights)[0],
+        }
+
+def generate_tasks(count, container=None, **options):
+    """generate_records() into a task container (core_logic.new_task_container() by default)."""
+    tasks = core_logic.new_task_container() if container is None else container
+    for record in generate_records(count, **options):
+        tasks.append(core_logic.Task(**record) if isinstance(tasks, core_logic.TaskList) else record)
+    return tasks
+
+def write_dataset(path, count, **options):
+    """Writes a generated tasks.json (the JSON snapshot format) to path."""
+    core_logic._write_snapshot(path, generate_tasks(count, **options))
+
+def main():
+    parser = argparse.ArgumentParser(description="Writes a seeded synthetic tasks.json")
+    parser.add_argument("count", type=int)
+    parser.add_argument("-o", "--output", default=core_logic.DATA_FILE)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--start-date", default="2026-01-01")
+    parser.add_argument("--date-spread-days", type=int, default=365)
+    parser.add_argument("--due-ratio", type=float, default=0.7)
+    parser.add_argument("--completed-ratio", type=float, default=0.3)
+    parser.add_argument("--cjk-ratio", type=float, default=0.5)
+    parser.add_argument("--min-words", type=int, default=2)
+    parser.add_argument("--max-words", type=int, default=6)
+    args = parser.parse_args()
+    write_dataset(args.output, args.count, seed=args.seed, start_date=args.start_date,
+                  date_spread_days=args.date_spread_days, due_ratio=args.due_ratio,
+                  completed_ratio=args.completed_ratio, cjk_ratio=args.cjk_ratio,
+                  words_per_description=(args.min_words, args.max_words))
+    print(f"{args.count} tasks -> {args.output} ({os.path.getsize(args.output) / 1e6:.1f} MB)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,289 @@
+# benchmarks/suite.py
+# Regression suite: timed scenarios over a seeded synthetic dataset (datagen.py),
+# reporting the median time and the peak Python memory (tracemalloc) of each, and
+# comparing them with a JSON baseline.
+#
+# Usage: python benchmarks/suite.py [--size 100000] [--backend journal] [--repeat 3]
+#                                   [--ops 2000] [--delete-ops 200] [--only load,save,...] [--no-gui]
+#                                   [--save-baseline] [--compare] [--baseline FILE] [--tolerance 0.25]
+#
+# --save-baseline stores the results in the baseline file (benchmarks/baseline.json by
+# default) under "<backend>/<size>"; --compare checks against that entry and exits with
+# status 1 if any scenario got slower or bigger than the tolerance allows.
+
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import core_logic
+import todo_app_cli
+from benchmarks import datagen
+
+DEFAULT_BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+BACKEND_FILES = {'journal': core_logic.DATA_FILE, 'json': core_logic.DATA_FILE,
+                 'sqlite': core_logic.SQLITE_DATA_FILE, 'binary': core_logic.BINARY_DATA_FILE}
+
+class Scenario:
+    """setup(context) -> state runs untimed before every repetition; run(state) is what is measured."""
+
+    def __init__(self, name, setup, run, teardown=None):
+        self.name = name
+        self.setup = setup
+        self.run = run
+        self.teardown = teardown
+
+class Context:
+    """What the scenarios share: the dataset, the storage backend under test and its directory."""
+
+    def __init__(self, size, backend_name, directory, ops, delete_ops):
+        self.size = size
+        self.backend_name = backend_name
+        self.directory = directory
+        self.ops = ops
+        self.delete_ops = delete_ops
+        self.data_path = os.path.join(directory, BACKEND_FILES[backend_name])
+        self.backend = None
+
+    def install_backend(self):
+        """Creates the backend over the dataset (written once) and makes it the active one."""
+        if self.backend is None:
+            self.backend = core_logic.STORAGE_BACKENDS[self.backend_name](self.data_path)
+            self.backend.save(datagen.generate_tasks(self.size))
+        core_logic.set_storage_backend(self.backend)
+
+    def load(self):
+        self.install_backend()
+        return core_logic.load_tasks_data()
+
+# --- 场景 ---
+def setup_loaded(context):
+    return context.load()
+
+def setup_save(context):
+    tasks = context.load()
+    core_logic.toggle_task_completion_data(tasks[random.randrange(len(tasks))]) # One edit to save
+    return tasks
+
+def run_save(tasks):
+    core_logic.save_tasks_data(tasks)
+    core_logic.flush_tasks_data()
+
+def setup_generated(context):
+    return context, datagen.generate_tasks(context.size)
+
+def run_add_loop(state):
+    context, tasks = state
+    for number in range(context.ops):
+        core_logic.add_task_data(tasks, f"新任务 {number} benchmark", "2026-05-01", "high")
+
+def setup_delete_loop(context):
+    # Deletes by display position, like the CLI's "delete task number n"
+    rng = random.Random(3)
+    positions = [rng.randrange(context.size - number) for number in range(min(context.delete_ops, context.size))]
+    return datagen.generate_tasks(context.size), positions
+
+def run_delete_loop(state):
+    tasks, positions = state
+    for position in positions:
+        core_logic.delete_task_data(tasks, position)
+
+def sort_scenario(sort_key):
+    return Scenario(f"sort_{sort_key}", setup_loaded,
+                    lambda tasks: todo_app_cli.sort_tasks_cli(tasks, sort_key))
+
+def filter_scenario(name, filter_type, filter_value):
+    return Scenario(name, setup_loaded,
+                    lambda tasks: todo_app_cli.filter_tasks_cli(tasks, filter_type, filter_value))
+
+def gui_scenario():
+    """TodoAppGUI.populate_task_list_gui on the offscreen Qt platform, until the rows are shown. None without PyQt6."""
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    try:
+        from PyQt6.QtWidgets import QApplication
+        import todo_app_gui
+    except ImportError:
+        return None
+    windows = [] # The QApplication and the window, created by the first setup and kept until teardown
+
+    def wait_for_load(app, window, previous_tasks):
+        while window.tasks_data_list is previous_tasks or not window.task_model.rowCount():
+            app.processEvents()
+            time.sleep(0.001)
+
+    def setup(context):
+        context.install_backend()
+        if not windows:
+            app = QApplication.instance() or QApplication([])
+            windows.extend([app, todo_app_gui.TodoAppGUI()]) # The window's startup load is not measured
+            wait_for_load(app, windows[1], [])
+        app, window = windows
+        window.tasks_data_list = []
+        window.show_tasks_gui()
+        return app, window
+
+    def run(state):
+        app, window = state
+        previous_tasks = window.tasks_data_list
+        window.populate_task_list_gui()
+        wait_for_load(app, window, previous_tasks)
+
+    def teardown():
+        if windows:
+            windows[1].close()
+
+    return Scenario("gui_populate", setup, run, teardown)
+
+def all_scenarios(include_gui=True):
+    scenarios = [
+        Scenario("load", lambda context: context.install_backend(), lambda _state: core_logic.load_tasks_data()),
+        Scenario("save", setup_save, run_save),
+        Scenario("add_loop", setup_generated, run_add_loop),
+        Scenario("delete_loop", setup_delete_loop, run_delete_loop),
+        sort_scenario("due_date"),
+        sort_scenario("priority"),
+        sort_scenario("description"),
+        filter_scenario("filter_pending", "status", False),
+        filter_scenario("filter_priority", "priority", "high"),
+    ]
+    if include_gui:
+        scenario = gui_scenario()
+        if scenario is None:
+            print("PyQt6 is not installed: skipping gui_populate")
+        else:
+            scenarios.append(scenario)
+    return scenarios
+
+# --- 计时与内存 ---
+def measure(scenario, context, repeat, trace_memory=True):
+    """Returns {'seconds': median of repeat runs, 'peak_mb': tracemalloc peak of one more run}."""
+    samples = []
+    for _ in range(repeat):
+        state = scenario.setup(context)
+        gc.collect()
+        started = time.perf_counter()
+        scenario.run(state)
+        samples.append(time.perf_counter() - started)
+        del state
+    result = {'seconds': round(statistics.median(samples), 6)}
+    if trace_memory: # A separate run: tracing slows Python code down several times
+        state = scenario.setup(context)
+        gc.collect()
+        tracemalloc.start()
+        scenario.run(state)
+        _current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result['peak_mb'] = round(peak / 2 ** 20, 2)
+        del state
+    return result
+
+def run_suite(size, backend_name, repeat, ops, delete_ops, only=None, include_gui=True, trace_memory=True):
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        context = Context(size, backend_name, directory, ops, delete_ops)
+        previous_backend = core_logic.get_storage_backend()
+        scenarios = [scenario for scenario in all_scenarios(include_gui) if not only or scenario.name in only]
+        try:
+            for scenario in scenarios:
+                results[scenario.name] = measure(scenario, context, repeat, trace_memory)
+                print_result(scenario.name, results[scenario.name])
+        finally:
+            for scenario in scenarios:
+                if scenario.teardown:
+                    scenario.teardown()
+            core_logic.set_storage_backend(previous_backend)
+    return results
+
+def print_result(name, result, baseline=None, verdict=""):
+    line = f"{name:<18}{result['seconds'] * 1000:11.1f} ms"
+    if 'peak_mb' in result:
+        line += f"{result['peak_mb']:10.1f} MB"
+    if baseline:
+        line += f"   baseline {baseline['seconds'] * 1000:9.1f} ms"
+        if 'peak_mb' in baseline:
+            line += f" {baseline['peak_mb']:8.1f} MB"
+        line += f"  {verdict}"
+    print(line)
+
+# --- 基线 ---
+def load_baseline_file(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_baseline(path, key, results):
+    baselines = load_baseline_file(path)
+    baselines[key] = {
+        'recorded': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': f"{platform.system()} {platform.machine()}",
+        'results': results,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(baselines, f, ensure_ascii=False, indent=4, sort_keys=True)
+        f.write("\n")
+
+def compare_with_baseline(results, baseline_results, tolerance):
+    """Prints each scenario next to its baseline. Returns the names that regressed."""
+    print(f"\ncompared with the baseline (tolerance {tolerance:.0%}):")
+    regressed = []
+    for name, result in results.items():
+        baseline = baseline_results.get(name)
+        if baseline is None:
+            print_result(name, result, verdict="(no baseline)")
+            continue
+        slower = result['seconds'] > baseline['seconds'] * (1 + tolerance)
+        bigger = 'peak_mb' in result and 'peak_mb' in baseline and result['peak_mb'] > baseline['peak_mb'] * (1 + tolerance)
+        verdict = f"x{result['seconds'] / baseline['seconds']:.2f}" if baseline['seconds'] else ""
+        if slower or bigger:
+            regressed.append(name)
+            verdict += "  REGRESSION (" + ", ".join(kind for kind, flag in (("time", slower), ("memory", bigger)) if flag) + ")"
+        print_result(name, result, baseline, verdict)
+    return regressed
+
+def main():
+    parser = argparse.ArgumentParser(description="core_logic / CLI / GUI benchmark suite")
+    parser.add_argument("--size", type=int, default=100_000, help="tasks in the dataset")
+    parser.add_argument("--backend", choices=sorted(core_logic.STORAGE_BACKENDS), default='journal')
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--ops", type=int, default=2000, help="adds in the add loop")
+    parser.add_argument("--delete-ops", type=int, default=200, help="deletes in the delete loop")
+    parser.add_argument("--only", help="comma-separated scenario names")
+    parser.add_argument("--no-gui", action="store_true")
+    parser.add_argument("--no-memory", action="store_true", help="skip the traced run")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    key = f"{args.backend}/{args.size}"
+    print(f"{args.size} tasks, {args.backend} backend, median of {args.repeat}")
+    print(f"{'scenario':<18}{'time':>14}{'peak':>13}")
+    only = set(args.only.split(",")) if args.only else None
+    results = run_suite(args.size, args.backend, args.repeat, args.ops, args.delete_ops, only,
+                        include_gui=not args.no_gui, trace_memory=not args.no_memory)
+    exit_code = 0
+    if args.compare:
+        baseline = load_baseline_file(args.baseline).get(key)
+        if baseline is None:
+            print(f"\nno baseline for {key} in {args.baseline}")
+        elif compare_with_baseline(results, baseline['results'], args.tolerance):
+            exit_code = 1
+    if args.save_baseline:
+        save_baseline(args.baseline, key, results)
+        print(f"\nbaseline {key} saved to {args.baseline}")
+    return exit_code
+
+if __name__ == '__main__':
+    sys.exit(main())
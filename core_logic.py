@@ -2,13 +2,32 @@
 # This file contains the core data handling and business logic 
 # for the To-Do application, to be shared by CLI and GUI.
 
+import bisect
+import collections
 import json
+import mmap
+import os
+import random
+import re
+import struct
+import sys
+import threading
+import time
 import datetime # datetime is used for date validation
+import functools
+import gc
+import heapq
+import itertools
+import zlib
+from contextlib import contextmanager
+from array import array
+from collections.abc import Mapping, MutableMapping
 
 DATA_FILE = "tasks.json"
 # 定义核心逻辑层接受的优先级值，None 代表无优先级。
 # UI 层在获取用户输入时，可以将空字符串或其他“无”的表示转换成 None 再传给核心逻辑。
 VALID_PRIORITIES_CORE = ["high", "medium", "low", None] 
+_PRIORITY_NAMES_CORE = frozenset(p for p in VALID_PRIORITIES_CORE if p is not None) # 校验时用的集合，不必每次重建列表
 
 # 核心逻辑层使用的优先级排序映射
 PRIORITY_ORDER_MAP_CORE = { 
@@ -19,72 +38,2151 @@ PRIORITY_ORDER_MAP_CORE = {
 }
 
 # --- 日期验证 ---
+# 加载和显示时每个任务都要校验日期，strptime 太慢。固定宽度的 YYYY-MM-DD 走快速路径
+# （逐字符检查 + 日历校验），只有其他写法（如 2024-1-5）才回退到 strptime 以保持兼容。
+DATE_CACHE_SIZE = 4096 # parse_date_core 的 LRU 缓存大小
+NUMPY_BATCH_THRESHOLD = 2048 # 批量校验至少这么多条时才使用 NumPy
+_DAYS_IN_MONTH = (0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+# NumPy is optional and only vectorizes the batch date APIs. Importing it is most of the
+# startup time of this module, so it is imported on the first large batch (_numpy()).
+np = None
+_numpy_missing = False
+
+def _numpy():
+    """The numpy module, imported on first use; None if it is not installed."""
+    global np, _numpy_missing
+    if np is None and not _numpy_missing:
+        try:
+            import numpy
+        except ImportError:
+            _numpy_missing = True
+        else:
+            np = numpy
+    return np
+
+def _is_leap_year(year):
+    return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+
+def _fixed_width_date_parts(date_string):
+    """Returns (year, month, day) if date_string is a valid fixed-width YYYY-MM-DD date, else None."""
+    if (len(date_string) != 10 or date_string[4] != '-' or date_string[7] != '-'
+            or not date_string.isascii()):
+        return None
+    year, month, day = date_string[:4], date_string[5:7], date_string[8:]
+    if not (year.isdigit() and month.isdigit() and day.isdigit()):
+        return None
+    year, month, day = int(year), int(month), int(day)
+    if year < 1 or not 1 <= month <= 12 or day < 1:
+        return None
+    if day > _DAYS_IN_MONTH[month] and not (month == 2 and day == 29 and _is_leap_year(year)):
+        return None
+    return year, month, day
+
 def is_valid_date_format_core(date_string):
     """Checks if the date string is YYYY-MM-DD format and a valid date."""
     if not date_string: # Allows due date to be None (empty string representing no date)
         return True
-    try:
-        datetime.datetime.strptime(date_string, "%Y-%m-%d")
-        return True
-    except ValueError:
+    if not isinstance(date_string, str):
         return False
+    return parse_date_core(date_string) is not None # Dates repeat a lot, so the cache usually answers
+
+def _parse_date_slow(date_string):
+    # strptime also accepts unpadded forms such as 2024-1-5; keep accepting them.
+    try:
+        return datetime.datetime.strptime(date_string, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return None
+
+@functools.lru_cache(maxsize=DATE_CACHE_SIZE)
+def parse_date_core(date_string):
+    """Parses a YYYY-MM-DD string into a datetime.date (cached). Returns None if empty or invalid."""
+    if not date_string or not isinstance(date_string, str):
+        return None
+    parts = _fixed_width_date_parts(date_string)
+    if parts is not None:
+        return datetime.date(*parts)
+    return _parse_date_slow(date_string)
+
+def _numpy_date_ordinals(date_strings):
+    """Vectorized fixed-width parsing. Returns (ordinals, ok) arrays; ok is False for rows needing the scalar path."""
+    fixed = [s if isinstance(s, str) and len(s) == 10 and s.isascii() else '' for s in date_strings]
+    codes = np.array(fixed, dtype='S10').view(np.uint8).reshape(-1, 10).astype(np.int32) - ord('0')
+    digits = codes[:, [0, 1, 2, 3, 5, 6, 8, 9]]
+    year = digits[:, 0] * 1000 + digits[:, 1] * 100 + digits[:, 2] * 10 + digits[:, 3]
+    month = digits[:, 4] * 10 + digits[:, 5]
+    day = digits[:, 6] * 10 + digits[:, 7]
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    month_length = np.array(_DAYS_IN_MONTH, dtype=np.int32)[np.clip(month, 0, 12)] + ((month == 2) & leap)
+    ok = (((digits >= 0) & (digits <= 9)).all(axis=1)
+          & (codes[:, 4] == ord('-') - ord('0')) & (codes[:, 7] == ord('-') - ord('0'))
+          & (year >= 1) & (month >= 1) & (month <= 12) & (day >= 1) & (day <= month_length))
+    safe_year = np.where(ok, year, 1970) - 1970
+    safe_month = np.where(ok, month, 1) - 1
+    safe_day = np.where(ok, day, 1) - 1
+    days = ((safe_year.astype('datetime64[Y]').astype('datetime64[M]') + safe_month).astype('datetime64[D]')
+            + safe_day).astype(np.int64)
+    ordinals = np.where(ok, days + datetime.date(1970, 1, 1).toordinal(), 0)
+    return ordinals, ok
+
+def _use_numpy_for(date_strings, use_numpy):
+    if use_numpy is None:
+        use_numpy = len(date_strings) >= NUMPY_BATCH_THRESHOLD
+    return bool(use_numpy) and _numpy() is not None
+
+def parse_dates_core(date_strings, use_numpy=None):
+    """
+    Parses a whole column of date strings at once.
+    Returns an array('i') of proleptic Gregorian ordinals, 0 for empty or invalid entries.
+    Uses NumPy when it is installed and the column is large (use_numpy=None), or when forced.
+    """
+    date_strings = list(date_strings)
+    if _use_numpy_for(date_strings, use_numpy):
+        ordinals, ok = _numpy_date_ordinals(date_strings)
+        result = array('i', ordinals.astype(np.int32).tobytes())
+        for row in np.flatnonzero(~ok).tolist(): # Empty, invalid or non fixed-width entries
+            parsed = parse_date_core(date_strings[row]) if date_strings[row] else None
+            result[row] = parsed.toordinal() if parsed else 0
+        return result
+    result = array('i')
+    for date_string in date_strings:
+        parsed = parse_date_core(date_string) if date_string else None
+        result.append(parsed.toordinal() if parsed else 0)
+    return result
+
+def validate_dates_core(date_strings, use_numpy=None):
+    """Batch form of is_valid_date_format_core. Returns a list of bools (empty/None counts as valid)."""
+    date_strings = list(date_strings)
+    if _use_numpy_for(date_strings, use_numpy):
+        _ordinals, ok = _numpy_date_ordinals(date_strings)
+        result = ok.tolist()
+        for row in np.flatnonzero(~ok).tolist():
+            result[row] = is_valid_date_format_core(date_strings[row])
+        return result
+    return [is_valid_date_format_core(date_string) for date_string in date_strings]
+
+@contextmanager
+def paused_gc():
+    """
+    Disables the cyclic garbage collector for the duration of a bulk build.
+    Creating hundreds of thousands of container objects otherwise triggers repeated
+    full-heap collections that can cost more than the build itself.
+    """
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+# --- 变更监听 ---
+# 每次 add/update/toggle/delete 成功后都会通知监听者，
+# 日志存储、索引等需要增量维护的组件通过这里挂接，而不必重新扫描整个列表。
+# merge_loaded_tasks 合并其他进程写入的修改时，事件带有 external=True。
+_task_listeners = []
+
+def add_task_listener(listener):
+    """Registers listener(event, task, **details), called after every task mutation."""
+    if listener not in _task_listeners:
+        _task_listeners.append(listener)
+
+def remove_task_listener(listener):
+    """Unregisters a listener added with add_task_listener (no-op if absent)."""
+    if listener in _task_listeners:
+        _task_listeners.remove(listener)
+
+def _notify_task_listeners(event, task, **details):
+    for listener in list(_task_listeners):
+        listener(event, task, **details)
+
+# --- 任务数据结构 ---
+TASK_FIELDS = ('id', 'description', 'completed', 'due_date', 'priority')
+_TASK_FIELD_SET = frozenset(TASK_FIELDS)
+
+class Task(MutableMapping):
+    """
+    A single task with fixed fields and no per-instance __dict__.
+
+    Behaves like the task dicts used before (task['description'], task.get('due_date'),
+    dict(task), ...) so the UIs work unchanged, at well under half the memory of a dict.
+    """
+    __slots__ = TASK_FIELDS
+
+    def __init__(self, description, completed=False, due_date=None, priority=None, id=None):
+        self.id = id
+        self.description = description
+        self.completed = completed
+        self.due_date = due_date
+        self.priority = priority
+
+    def __getitem__(self, key):
+        if key not in _TASK_FIELD_SET:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in _TASK_FIELD_SET:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __delitem__(self, key):
+        raise TypeError("Task fields cannot be deleted")
+
+    def __iter__(self):
+        return iter(TASK_FIELDS)
+
+    def __len__(self):
+        return len(TASK_FIELDS)
+
+    def __contains__(self, key):
+        return key in _TASK_FIELD_SET
+
+    def get(self, key, default=None):
+        if key not in _TASK_FIELD_SET:
+            return default
+        return getattr(self, key)
+
+    def to_dict(self):
+        return {'id': self.id, 'description': self.description, 'completed': self.completed,
+                'due_date': self.due_date, 'priority': self.priority}
+
+    def __repr__(self):
+        return f"Task({self.to_dict()!r})"
+
+def task_to_dict(task):
+    """Returns a plain dict copy of a task (Task, TaskView or dict), e.g. for JSON output."""
+    to_dict = getattr(task, 'to_dict', None)
+    return to_dict() if to_dict else dict(task)
+
+# --- 任务 ID 与索引 ---
+# 每个任务都有一个持久化的整数 id（保存在 tasks.json 中），与列表位置无关。
+# 53 位以内，保证 JSON/JavaScript 客户端读取时不丢精度。
+TASK_ID_BITS = 53
+TASKLIST_COMPACT_MIN_TOMBSTONES = 1024 # 墓碑数超过该值且超过一半时才整理
+
+def _is_valid_task_id(task_id):
+    return isinstance(task_id, int) and not isinstance(task_id, bool) and 0 < task_id < 2 ** TASK_ID_BITS
+
+def _new_task_id(taken=()):
+    """Returns a random task id not present in taken."""
+    while True:
+        task_id = random.getrandbits(TASK_ID_BITS)
+        if task_id and task_id not in taken:
+            return task_id
+
+def _insert_position(position, count):
+    """Clamps an insert position the way list.insert does."""
+    if position < 0:
+        position += count
+    return max(0, min(position, count))
+
+def _live_slot(dead_slots, position):
+    """
+    The slot of the live entry at display position (0 <= position < live count), given
+    the sorted slots of the tombstones. O(log T): dead_slots[k] - k never decreases, so
+    the number of tombstones before the wanted slot can be found by bisection.
+    """
+    low, high = 0, len(dead_slots)
+    while low < high:
+        middle = (low + high) // 2
+        if dead_slots[middle] - middle <= position:
+            low = middle + 1
+        else:
+            high = middle
+    return position + low
+
+class TaskList:
+    """
+    List-like container of tasks with an id index.
+
+    Iteration, len() and positional access behave like the plain list used before, so
+    display numbering in the UIs is unchanged. Lookup, update and delete by id are O(1):
+    deleting leaves a tombstone in the underlying slot list, and the tombstones are
+    compacted lazily, once they outnumber live tasks. Positional access skips them by
+    bisecting the sorted tombstone slots (O(log T)), so it never compacts.
+    """
+
+    def __init__(self, tasks=()):
+        self._slots = []     # Tasks in display order, None for deleted ones
+        self._slot_of = {}   # task id -> index into _slots
+        self._tombstones = 0
+        self._dead_slots = [] # Sorted slots of the tombstones, for position_of
+        self.assigned_ids = False # True if a task needed a freshly generated id
+        for task in tasks:
+            self.append(task)
+
+    def __len__(self):
+        return len(self._slots) - self._tombstones
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __iter__(self):
+        if self._tombstones:
+            return (task for task in self._slots if task is not None)
+        return iter(self._slots)
+
+    def __getitem__(self, position):
+        if not self._tombstones:
+            return self._slots[position]
+        if isinstance(position, slice):
+            return list(self)[position]
+        count = len(self)
+        if position < 0:
+            position += count
+        if not 0 <= position < count:
+            raise IndexError("TaskList index out of range")
+        return self._slots[_live_slot(self._dead_slots, position)]
+
+    def __repr__(self):
+        return f"TaskList({list(self)!r})"
+
+    def append(self, task):
+        """Appends a task, assigning a new id if it has none or a duplicate one."""
+        task_id = task.get('id')
+        if not _is_valid_task_id(task_id) or task_id in self._slot_of:
+            task_id = task['id'] = _new_task_id(self._slot_of)
+            self.assigned_ids = True
+        self._slot_of[task_id] = len(self._slots)
+        self._slots.append(task)
+        return task
+
+    def get_by_id(self, task_id):
+        slot = self._slot_of.get(task_id)
+        return None if slot is None else self._slots[slot]
+
+    def owns(self, task):
+        """True if task is the object stored in this list (not just a task with the same id)."""
+        return self.get_by_id(task.get('id')) is task
+
+    def remove_by_id(self, task_id):
+        """Removes the task with task_id in O(1). Returns the removed task, or None."""
+        slot = self._slot_of.pop(task_id, None)
+        if slot is None:
+            return None
+        task = self._slots[slot]
+        self._slots[slot] = None
+        self._tombstones += 1
+        bisect.insort(self._dead_slots, slot)
+        if self._tombstones >= TASKLIST_COMPACT_MIN_TOMBSTONES and self._tombstones * 2 > len(self._slots):
+            self._compact()
+        return task
+
+    def pop(self, position=-1):
+        return self.remove_by_id(self[position]['id'])
+
+    def remove_many(self, task_ids):
+        """
+        Removes the tasks with the given ids (unknown ones are skipped) with at most one
+        compaction. Returns (position, task) pairs in list order, positions as before the call.
+        """
+        slots = sorted({self._slot_of[task_id] for task_id in task_ids if task_id in self._slot_of})
+        removed = [(slot - bisect.bisect_left(self._dead_slots, slot), self._slots[slot]) for slot in slots]
+        for slot in slots:
+            del self._slot_of[self._slots[slot]['id']]
+            self._slots[slot] = None
+        self._tombstones += len(slots)
+        if len(slots) >= TASKLIST_COMPACT_MIN_TOMBSTONES or (
+                self._tombstones >= TASKLIST_COMPACT_MIN_TOMBSTONES and self._tombstones * 2 > len(self._slots)):
+            self._compact() # One O(N) pass for the whole batch
+        else:
+            self._dead_slots = list(heapq.merge(self._dead_slots, slots))
+        return removed
+
+    def insert(self, position, task):
+        """Inserts a task before position, like list.insert. O(N): the later slots are renumbered."""
+        self._compact()
+        position = _insert_position(position, len(self._slots))
+        task = self.append(task) # Checks the id
+        if position < len(self._slots) - 1:
+            self._slots.insert(position, self._slots.pop())
+            for slot in range(position, len(self._slots)):
+                self._slot_of[self._slots[slot]['id']] = slot
+        return task
+
+    def position_of(self, task_id):
+        """The display position of the task with task_id, or None. O(1) while there are no tombstones."""
+        slot = self._slot_of.get(task_id)
+        if slot is None or not self._tombstones:
+            return slot
+        return slot - bisect.bisect_left(self._dead_slots, slot)
+
+    def _compact(self):
+        if not self._tombstones:
+            return
+        self._slots = [task for task in self._slots if task is not None]
+        self._slot_of = {task['id']: slot for slot, task in enumerate(self._slots)}
+        self._tombstones = 0
+        self._dead_slots = []
+
+# --- 列式任务存储 (可选) ---
+# 百万级任务时，每个任务一个对象的开销太大。TaskStore 把各字段存成列：
+# 描述放在一个 list 中，完成状态是位图，截止日期是 int32 序数日（0 表示无），
+# 优先级是取自 PRIORITY_ORDER_MAP_CORE 的 uint8 编码。行通过轻量的 TaskView 访问。
+_PRIORITY_BY_CODE = {code: priority for priority, code in PRIORITY_ORDER_MAP_CORE.items()}
+
+def _date_to_ordinal(date_string):
+    parsed = parse_date_core(date_string) if date_string else None
+    return parsed.toordinal() if parsed else 0
+
+def _ordinal_to_date(ordinal):
+    return datetime.date.fromordinal(ordinal).isoformat() if ordinal else None
+
+class TaskView(MutableMapping):
+    """A dict-compatible view of one TaskStore row. Reads and writes go to the store's columns."""
+    __slots__ = ('_store', '_id', '_slot', '_epoch')
+
+    def __init__(self, store, slot):
+        self._store = store
+        self._id = store._ids[slot]
+        self._slot = slot
+        self._epoch = store._epoch
+
+    def _current_slot(self):
+        store = self._store
+        if self._epoch != store._epoch: # The store was compacted since this view was made
+            self._slot = store._slot_for_id(self._id)
+            self._epoch = store._epoch
+        if self._slot is None:
+            raise KeyError(f"task {self._id} is no longer in the store")
+        return self._slot
+
+    def __getitem__(self, key):
+        if key not in _TASK_FIELD_SET:
+            raise KeyError(key)
+        return self._store._get_field(self._current_slot(), key)
+
+    def __setitem__(self, key, value):
+        if key not in _TASK_FIELD_SET:
+            raise KeyError(key)
+        self._store._set_field(self._current_slot(), key, value)
+        if key == 'id':
+            self._id = value
+
+    def __delitem__(self, key):
+        raise TypeError("Task fields cannot be deleted")
+
+    def __iter__(self):
+        return iter(TASK_FIELDS)
+
+    def __len__(self):
+        return len(TASK_FIELDS)
+
+    def __contains__(self, key):
+        return key in _TASK_FIELD_SET
+
+    def get(self, key, default=None):
+        if key not in _TASK_FIELD_SET:
+            return default
+        return self._store._get_field(self._current_slot(), key)
+
+    def to_dict(self):
+        slot = self._current_slot()
+        return {field: self._store._get_field(slot, field) for field in TASK_FIELDS}
+
+    def __repr__(self):
+        return f"TaskView({self.to_dict()!r})"
+
+class TaskStore:
+    """
+    Columnar task container with the same interface as TaskList.
+
+    Iterating or indexing yields TaskView objects created on demand. Deleting leaves
+    a tombstone (description None); tombstones are skipped and compacted like in
+    TaskList, and views made before a compaction re-resolve their row by id.
+    """
+
+    def __init__(self, tasks=()):
+        self._ids = array('q')
+        self._descriptions = []      # None marks a deleted row
+        self._completed = bytearray() # Bitmap, one bit per row
+        self._due = array('i')       # Proleptic Gregorian ordinal, 0 = no due date
+        self._priority = array('B')  # PRIORITY_ORDER_MAP_CORE code
+        self._slot_of = None         # task id -> row, built on first lookup by id
+        self._tombstones = 0
+        self._dead_slots = []        # Sorted rows of the tombstones, for position_of
+        self._epoch = 0              # Incremented whenever rows move
+        self.assigned_ids = False
+        for task in tasks:
+            self.append(task)
+
+    @classmethod
+    def from_columns(cls, ids, descriptions, completed, due, priority):
+        """Builds a store directly from its columns (e.g. read from a binary snapshot), without per-row work."""
+        store = cls()
+        store._ids = ids
+        store._descriptions = descriptions
+        store._completed = completed
+        store._due = due
+        store._priority = priority
+        return store
+
+    def __len__(self):
+        return len(self._descriptions) - self._tombstones
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __iter__(self):
+        descriptions = self._descriptions
+        if not self._tombstones: # Skip the tombstone test (a lazy column would decode every row)
+            for slot in range(len(descriptions)):
+                yield TaskView(self, slot)
+            return
+        for slot in range(len(descriptions)):
+            if descriptions[slot] is not None:
+                yield TaskView(self, slot)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            if self._tombstones:
+                return list(self)[position]
+            return [TaskView(self, slot) for slot in range(len(self._descriptions))[position]]
+        count = len(self)
+        if position < 0:
+            position += count
+        if not 0 <= position < count:
+            raise IndexError("TaskStore index out of range")
+        if self._tombstones:
+            position = _live_slot(self._dead_slots, position)
+        return TaskView(self, position)
+
+    def __repr__(self):
+        return f"TaskStore({[view.to_dict() for view in self]!r})"
+
+    def append(self, task):
+        """Appends a task (any mapping) as a new row. Returns its TaskView."""
+        slot_of = self._slot_of # While None, duplicates are resolved when the map is built
+        task_id = task.get('id')
+        if not _is_valid_task_id(task_id) or (slot_of is not None and task_id in slot_of):
+            task_id = _new_task_id(slot_of or ())
+            self.assigned_ids = True
+        slot = len(self._descriptions)
+        if slot_of is not None:
+            slot_of[task_id] = slot
+        self._ids.append(task_id)
+        self._descriptions.append(task['description'])
+        if slot % 8 == 0:
+            self._completed.append(0)
+        self._due.append(_date_to_ordinal(task.get('due_date')))
+        self._priority.append(PRIORITY_ORDER_MAP_CORE.get(task.get('priority'), PRIORITY_ORDER_MAP_CORE[None]))
+        self._set_completed(slot, task.get('completed', False))
+        return TaskView(self, slot)
+
+    def get_by_id(self, task_id):
+        slot = self._slot_for_id(task_id)
+        return None if slot is None else TaskView(self, slot)
+
+    def owns(self, task):
+        return isinstance(task, TaskView) and task._store is self and self._slot_for_id(task._id) is not None
+
+    def remove_by_id(self, task_id):
+        """Removes the row with task_id in O(1). Returns a detached Task copy, or None."""
+        slot = self._slot_for_id(task_id)
+        if slot is None:
+            return None
+        removed = Task(**self._row_dict(slot))
+        del self._slot_of[task_id]
+        self._descriptions[slot] = None
+        self._tombstones += 1
+        bisect.insort(self._dead_slots, slot)
+        if self._tombstones >= TASKLIST_COMPACT_MIN_TOMBSTONES and self._tombstones * 2 > len(self._descriptions):
+            self._compact()
+        return removed
+
+    def pop(self, position=-1):
+        return self.remove_by_id(self[position]['id'])
+
+    def remove_many(self, task_ids):
+        """
+        Removes the rows with the given ids (unknown ones are skipped) with at most one
+        compaction. Returns (position, detached Task) pairs in list order, positions as before the call.
+        """
+        slot_of = self._id_map()
+        slots = sorted({slot_of[task_id] for task_id in task_ids if task_id in slot_of})
+        removed = [(slot - bisect.bisect_left(self._dead_slots, slot), Task(**self._row_dict(slot))) for slot in slots]
+        for slot in slots:
+            del slot_of[self._ids[slot]]
+            self._descriptions[slot] = None
+        self._tombstones += len(slots)
+        if len(slots) >= TASKLIST_COMPACT_MIN_TOMBSTONES or (
+                self._tombstones >= TASKLIST_COMPACT_MIN_TOMBSTONES and self._tombstones * 2 > len(self._descriptions)):
+            self._compact() # One O(N) pass for the whole batch
+        else:
+            self._dead_slots = list(heapq.merge(self._dead_slots, slots))
+        return removed
+
+    def insert(self, position, task):
+        """Inserts a task (any mapping) before position, like list.insert. Returns its TaskView. O(N)."""
+        self._compact()
+        count = len(self._descriptions)
+        position = _insert_position(position, count)
+        if position == count:
+            return self.append(task)
+        if not isinstance(self._descriptions, list):
+            self._descriptions = list(self._descriptions) # A lazy column cannot shift rows
+        self._id_map()
+        self.append(task) # Checks the id and grows every column by one row
+        for column in (self._ids, self._descriptions, self._due, self._priority):
+            column.insert(position, column.pop())
+        flags = [self._is_completed(slot) for slot in range(position, count + 1)]
+        flags.insert(0, flags.pop())
+        for slot, value in enumerate(flags, position):
+            self._set_completed(slot, value)
+        self._slot_of = None # Rebuilt on the next lookup by id
+        self._epoch += 1     # Rows moved: existing views re-resolve by id
+        return TaskView(self, position)
+
+    def position_of(self, task_id):
+        """The display position of the row with task_id, or None. O(1) while there are no tombstones."""
+        slot = self._slot_for_id(task_id)
+        if slot is None or not self._tombstones:
+            return slot
+        return slot - bisect.bisect_left(self._dead_slots, slot)
+
+    # 列访问
+    def _id_map(self):
+        """The id -> row map. Built lazily: a freshly loaded store may never need it."""
+        if self._slot_of is None:
+            slot_of = {}
+            descriptions = self._descriptions
+            check_tombstones = self._tombstones > 0
+            for slot, task_id in enumerate(self._ids):
+                if check_tombstones and descriptions[slot] is None:
+                    continue
+                if task_id in slot_of: # Duplicate id in the input: give this row a new one
+                    task_id = self._ids[slot] = _new_task_id(slot_of)
+                    self.assigned_ids = True
+                slot_of[task_id] = slot
+            self._slot_of = slot_of
+        return self._slot_of
+
+    def _slot_for_id(self, task_id):
+        return self._id_map().get(task_id)
+
+    def _is_completed(self, slot):
+        return bool(self._completed[slot >> 3] & (1 << (slot & 7)))
+
+    def _set_completed(self, slot, value):
+        if value:
+            self._completed[slot >> 3] |= 1 << (slot & 7)
+        else:
+            self._completed[slot >> 3] &= ~(1 << (slot & 7)) & 0xFF
+
+    def _get_field(self, slot, field):
+        if field == 'description':
+            return self._descriptions[slot]
+        if field == 'completed':
+            return self._is_completed(slot)
+        if field == 'due_date':
+            return _ordinal_to_date(self._due[slot])
+        if field == 'priority':
+            return _PRIORITY_BY_CODE[self._priority[slot]]
+        return self._ids[slot]
+
+    def _set_field(self, slot, field, value):
+        if field == 'description':
+            self._descriptions[slot] = value
+        elif field == 'completed':
+            self._set_completed(slot, value)
+        elif field == 'due_date':
+            self._due[slot] = _date_to_ordinal(value)
+        elif field == 'priority':
+            self._priority[slot] = PRIORITY_ORDER_MAP_CORE.get(value, PRIORITY_ORDER_MAP_CORE[None])
+        else:
+            slot_of = self._id_map()
+            del slot_of[self._ids[slot]]
+            self._ids[slot] = value
+            slot_of[value] = slot
+
+    def _row_dict(self, slot):
+        return {field: self._get_field(slot, field) for field in TASK_FIELDS}
+
+    def detached_tasks(self):
+        """Task copies of every row in order, read straight from the columns (no TaskView per row)."""
+        dates = {}
+        tasks = []
+        for slot, (task_id, description, due, code) in enumerate(
+                zip(self._ids, self._descriptions, self._due, self._priority)):
+            if description is None:
+                continue
+            due_date = dates.get(due)
+            if due_date is None and due:
+                due_date = dates[due] = _ordinal_to_date(due)
+            tasks.append(Task(description, completed=self._is_completed(slot), due_date=due_date,
+                              priority=_PRIORITY_BY_CODE[code], id=task_id))
+        return tasks
+
+    def pending_due_rows(self):
+        """(id, due_date, priority) of every pending task with a due date, in order, read straight from the columns."""
+        dates = {}
+        rows = []
+        for slot, (task_id, description, due, code) in enumerate(
+                zip(self._ids, self._descriptions, self._due, self._priority)):
+            if description is None or not due or self._is_completed(slot):
+                continue
+            due_date = dates.get(due)
+            if due_date is None:
+                due_date = dates[due] = _ordinal_to_date(due)
+            rows.append((task_id, due_date, _PRIORITY_BY_CODE[code]))
+        return rows
+
+    def _compact(self):
+        if not self._tombstones:
+            return
+        keep = [slot for slot, description in enumerate(self._descriptions) if description is not None]
+        completed = [self._is_completed(slot) for slot in keep]
+        self._ids = array('q', (self._ids[slot] for slot in keep))
+        self._descriptions = [self._descriptions[slot] for slot in keep]
+        self._due = array('i', (self._due[slot] for slot in keep))
+        self._priority = array('B', (self._priority[slot] for slot in keep))
+        self._completed = bytearray((len(keep) + 7) // 8)
+        for slot, value in enumerate(completed):
+            if value:
+                self._completed[slot >> 3] |= 1 << (slot & 7)
+        self._slot_of = None
+        self._tombstones = 0
+        self._dead_slots = []
+        self._epoch += 1
+
+_task_container_class = TaskList
+
+def use_columnar_store(enabled=True):
+    """Makes load_tasks_data return a TaskStore (enabled) or a TaskList of Task objects."""
+    global _task_container_class
+    _task_container_class = TaskStore if enabled else TaskList
+
+def new_task_container(tasks=()):
+    """Creates an empty (or pre-filled) container of the configured type."""
+    return _task_container_class(tasks)
+
+def owns_task(tasks_list, task):
+    """
+    True if task is the object stored in tasks_list (not just a task with the same id).
+    O(1) for a TaskList/TaskStore; any other container, e.g. a plain list a caller
+    built itself, is scanned by identity. For listeners that follow one container.
+    """
+    owns = getattr(tasks_list, 'owns', None)
+    if owns is not None:
+        return owns(task)
+    return any(stored is task for stored in tasks_list)
 
 # --- 数据加载与保存 ---
-def load_tasks_data():
-    """Loads tasks from the JSON data file."""
-    tasks = []
-    try:
-        with open(DATA_FILE, 'r', encoding='utf-8') as f:
-            tasks_data = json.load(f)
-            if isinstance(tasks_data, list):
-                for item in tasks_data:
-                    # Ensure essential keys exist and have somewhat expected types before adding
-                    if (isinstance(item, dict) and 
-                            'description' in item and isinstance(item['description'], str) and
-                            'completed' in item and isinstance(item['completed'], bool)):
-                        
-                        # Sanitize optional fields
-                        due_date = item.get('due_date')
-                        if due_date and not is_valid_date_format_core(due_date):
-                            due_date = None # If stored date is invalid, treat as None
-
-                        priority = item.get('priority')
-                        if priority and str(priority).lower() not in [p for p in VALID_PRIORITIES_CORE if p is not None]:
-                            priority = None # If stored priority is invalid, treat as None
-                        elif priority: # Ensure stored priorities are lowercase if they are strings
-                            priority = str(priority).lower()
-
-
-                        task = {
-                            'description': item['description'],
-                            'completed': item['completed'],
-                            'due_date': due_date, # Already sanitized or None
-                            'priority': priority  # Already sanitized or None
-                        }
-                        tasks.append(task)
-            # Silently ignore malformed files or entries for core logic
+JOURNAL_SUFFIX = ".journal" # 操作日志文件 = DATA_FILE + JOURNAL_SUFFIX
+JOURNAL_COMPACT_THRESHOLD = 1000 # 日志记录数达到该值时合并为新的快照
+SQLITE_DATA_FILE = "tasks.db" # SqliteStorage 默认使用的数据库文件
+BINARY_DATA_FILE = "tasks.bin" # BinarySnapshotStorage 默认使用的快照文件
+
+def _sanitize_task_item(item):
+    """Validates one stored task record. Returns a clean Task, or None if malformed."""
+    # Ensure essential keys exist and have somewhat expected types before adding
+    if not (isinstance(item, dict) and
+            'description' in item and isinstance(item['description'], str) and
+            'completed' in item and isinstance(item['completed'], bool)):
+        return None
+
+    # Sanitize optional fields
+    due_date = item.get('due_date')
+    if due_date and not is_valid_date_format_core(due_date):
+        due_date = None # If stored date is invalid, treat as None
+
+    priority = item.get('priority')
+    if priority: # Ensure stored priorities are lowercase if they are strings
+        priority = str(priority).lower()
+        if priority not in _PRIORITY_NAMES_CORE:
+            priority = None # If stored priority is invalid, treat as None
+
+    task_id = item.get('id')
+    if not _is_valid_task_id(task_id):
+        task_id = None # A fresh id is assigned when the task is added to a TaskList
+
+    return Task(
+        id=task_id,
+        description=item['description'],
+        completed=item['completed'],
+        due_date=due_date, # Already sanitized or None
+        priority=priority  # Already sanitized or None
+    )
+
+STREAM_CHUNK_SIZE = 1 << 16 # 流式加载时每次读取的字符数
+_STREAM_SEPARATORS = re.compile(r'[ \t\r\n,]*')
+
+def iter_tasks_data(path=None, chunk_size=STREAM_CHUNK_SIZE, strict=False):
+    """
+    Streams validated tasks out of a JSON snapshot (default: DATA_FILE).
+
+    The top-level array is read chunk_size characters at a time and decoded one
+    element at a time, so memory stays proportional to one element and the first
+    tasks are available long before a large file is fully parsed. Malformed entries
+    are skipped like in load_tasks_data; a syntax error ends the stream, or raises
+    LoadFailed if strict is True (e.g. a file another program is still writing).
+    """
+    decoder = json.JSONDecoder()
+    try:
+        with open(path or DATA_FILE, 'r', encoding='utf-8') as f:
+            buffer = f.read(chunk_size).lstrip()
+            if not buffer.startswith('['):
+                if strict: # An empty file too: it is being rewritten, we never save one
+                    raise LoadFailed("the task file is not a JSON array")
+                return # Not a JSON array: nothing to load
+            pos = 1
+            at_eof = False
+            while True:
+                pos = _STREAM_SEPARATORS.match(buffer, pos).end() # Up to the next element
+                if pos >= len(buffer):
+                    if at_eof:
+                        if strict:
+                            raise LoadFailed("the task file ends before its closing ']'")
+                        return # Unterminated array
+                    buffer = f.read(chunk_size)
+                    pos = 0
+                    at_eof = not buffer
+                    continue
+                if buffer[pos] == ']':
+                    return
+                try:
+                    item, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if at_eof:
+                        if strict:
+                            raise LoadFailed("the task file holds malformed JSON")
+                        return # Malformed element
+                    # The element continues in the next chunk; drop what has been consumed.
+                    # Read at least as much as is buffered so a huge (or broken) element
+                    # is re-parsed O(log n) times rather than once per chunk.
+                    more = f.read(max(chunk_size, len(buffer) - pos))
+                    at_eof = not more
+                    buffer = buffer[pos:] + more
+                    pos = 0
+                    continue
+                pos = end
+                task = _sanitize_task_item(item)
+                if task is not None:
+                    yield task
     except FileNotFoundError:
-        pass 
-    except json.JSONDecodeError:
-        pass 
-    except Exception: # Catch-all for other potential I/O or unexpected errors
         pass
+    except LoadFailed:
+        raise
+    except Exception as error: # Catch-all for other potential I/O or unexpected errors
+        if strict:
+            raise LoadFailed(str(error)) from error
+
+LOAD_PROGRESS_INTERVAL = 5000 # 每加载这么多任务回调一次进度 / 检查一次取消
+
+class LoadCancelled(Exception):
+    """Raised by load_tasks_data when its should_cancel callback returns True."""
+
+class LoadFailed(Exception):
+    """Raised by load_tasks_data(strict=True) when the task files could not be read completely."""
+
+def _read_snapshot(path, progress_callback=None, should_cancel=None, strict=False):
+    """
+    Reads a JSON task snapshot (the legacy tasks.json format) into a task container.
+    strict=True raises LoadFailed on a truncated or malformed file instead of keeping
+    the tasks read up to the error.
+    """
+    with paused_gc():
+        tasks = _read_snapshot_parallel(path, progress_callback, should_cancel)
+        if tasks is not None:
+            return tasks
+        if progress_callback is None and should_cancel is None:
+            return new_task_container(iter_tasks_data(path, strict=strict))
+        tasks = new_task_container()
+        for count, task in enumerate(iter_tasks_data(path, strict=strict), 1):
+            tasks.append(task)
+            if count % LOAD_PROGRESS_INTERVAL == 0:
+                if should_cancel is not None and should_cancel():
+                    raise LoadCancelled()
+                if progress_callback is not None:
+                    progress_callback(count)
+        return tasks
+
+# --- 多进程并行加载 ---
+# 几百万个任务的快照在一个进程里逐个解析、校验要十几秒。文件足够大且有多个 CPU 时，
+# 按元素边界把文件切成若干段，在进程池里解析并用 _sanitize_task_item 校验，再按原顺序
+# 合并进任务容器。切分依赖 _write_snapshot 的 indent=4 排版：每个元素都从一行 "    {"
+# 开始，而 JSON 字符串里不会有真正的换行，所以在这些换行处切开一定落在元素之间。
+# 找不到这样的切分点（例如单行 JSON）或某一段解析失败时，回退到串行的 iter_tasks_data，
+# 所以结果（包括跳过的坏记录）与串行加载完全相同。
+PARALLEL_LOAD_ENV = "TODO_LOAD_WORKERS" # 环境变量：并行加载的进程数，0 或 1 表示总是串行
+PARALLEL_LOAD_MIN_BYTES = 32 << 20     # 小于该大小的文件串行加载：启动进程池比省下的时间还贵
+PARALLEL_LOAD_CHUNK_BYTES = 4 << 20    # 每段的大致字节数
+_parallel_load_workers = None          # None: 可用的 CPU 数
+
+def set_parallel_loading(workers):
+    """
+    Sets how many processes load a large JSON snapshot (None: one per usable CPU,
+    0 or 1: always load serially). Returns the old setting.
+    """
+    global _parallel_load_workers
+    previous = _parallel_load_workers
+    _parallel_load_workers = None if workers is None else max(0, int(workers))
+    return previous
+
+def parallel_load_workers():
+    """The number of worker processes a large snapshot load would use now (1 = serial)."""
+    if _parallel_load_workers is not None:
+        return max(1, _parallel_load_workers)
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError: # Not available on Windows and macOS
+        return os.cpu_count() or 1
+
+def _snapshot_segments(path, segment_bytes):
+    """
+    Splits a JSON snapshot into (start, end) byte ranges that each hold whole array
+    elements, cut at the line where an element starts. None if the file is not laid
+    out one element per indented block, or is too small to split.
+    """
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < 2 * segment_bytes:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            first = data.find(b"{")
+            line_start = data.rfind(b"\n", 0, first)
+            if first < 0 or line_start < 0 or data[line_start + 1:first].strip(b" \t"):
+                return None # The first element does not start its own line
+            element_start = data[line_start:first + 1] # e.g. b"\n    {"
+            segments = []
+            start = 0
+            while start < size:
+                cut = data.find(element_start, start + segment_bytes)
+                end = size if cut < 0 else cut + 1 # Cut after the newline
+                segments.append((start, end))
+                start = end
+    return segments if len(segments) > 1 else None
+
+def _parse_snapshot_segment(path, start, end, size):
+    """
+    Worker side of the parallel load: parses and validates one segment. Returns columns
+    (descriptions, completed, due dates, priorities, ids) in Task argument order, which
+    pickle much faster than one object per task. Raises ValueError if the segment is not
+    a run of whole elements.
+    """
+    with open(path, 'rb') as f:
+        f.seek(start)
+        text = f.read(end - start).decode('utf-8').strip()
+    if start == 0:
+        text = text[1:] if text.startswith('[') else text
+    if end == size:
+        text = text[:-1] if text.endswith(']') else text
+    text = text.rstrip().rstrip(',')
+    columns = ([], [], [], [], [])
+    for item in json.loads(f"[{text}]"):
+        task = _sanitize_task_item(item)
+        if task is not None:
+            for column, value in zip(columns, (task.description, task.completed, task.due_date,
+                                               task.priority, task.id)):
+                column.append(value)
+    return columns
+
+def _read_snapshot_parallel(path, progress_callback=None, should_cancel=None, workers=None,
+                            min_bytes=None, segment_bytes=PARALLEL_LOAD_CHUNK_BYTES):
+    """
+    Loads a JSON snapshot with a process pool. Returns the task container, or None when
+    the serial path should be used instead (small file, one CPU, unsplittable layout,
+    a segment that does not parse, or no process pool available).
+    """
+    if workers is None: # Explicit workers (e.g. 1, to measure the pool's overhead) are used as given
+        workers = parallel_load_workers()
+        if workers < 2:
+            return None
+    min_bytes = PARALLEL_LOAD_MIN_BYTES if min_bytes is None else min_bytes
+    try:
+        if os.path.getsize(path) < min_bytes:
+            return None
+        segments = _snapshot_segments(path, segment_bytes)
+    except (OSError, ValueError):
+        return None
+    if segments is None:
+        return None
+    import concurrent.futures
+    import multiprocessing
+    size = segments[-1][1]
+    tasks = new_task_container()
+    try:
+        # spawn, not fork: the GUI loads on a worker thread, and forking a threaded process
+        # can deadlock the child. The workers only import core_logic.
+        with concurrent.futures.ProcessPoolExecutor(min(workers, len(segments)),
+                                                    mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [pool.submit(_parse_snapshot_segment, path, start, end, size) for start, end in segments]
+            append = tasks.append
+            try:
+                for future in futures: # In file order
+                    for task in map(Task, *future.result()):
+                        append(task)
+                    if should_cancel is not None and should_cancel():
+                        raise LoadCancelled()
+                    if progress_callback is not None:
+                        progress_callback(len(tasks))
+            finally:
+                for future in futures:
+                    future.cancel()
+    except LoadCancelled:
+        raise
+    except Exception: # A segment that is not whole elements, a broken pool, ...
+        return None
+    return tasks
+
+def _write_snapshot(path, tasks):
+    """
+    Writes tasks as a JSON snapshot, atomically: the data goes to a temporary file in the
+    same directory, which is fsynced and then renamed over path. A crash mid-write leaves
+    the previous snapshot intact instead of a truncated file.
+    """
+    temp_path = f"{path}.{os.getpid()}.tmp" # Per process, so the CLI and GUI never share one
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump([task_to_dict(task) for task in tasks], f, indent=4, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    _fsync_directory(os.path.dirname(os.path.abspath(path)))
+
+def _fsync_directory(directory):
+    """Makes a rename in directory durable (POSIX only; elsewhere a no-op)."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def _file_signature(path):
+    """Returns (size, mtime_ns) of a file, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+class FileChangeDetector:
+    """
+    Tells whether a backend's files were changed by someone else (e.g. the CLI while
+    the GUI is open) since this process last loaded or saved them.
+
+    changed() costs one stat() per file while nothing changed. When a file's
+    (size, mtime) differs but its size does not, the content hash decides, so a
+    touch or a rewrite with identical content is not reported as a change.
+    With hash_contents=False only (size, mtime) is compared.
+    """
+
+    def __init__(self, files, hash_contents=True):
+        self._files = files # Callable returning the paths to watch
+        self._hash_contents = hash_contents
+        self._synced = None # path -> (size, mtime_ns, digest) as of the last mark_synced()
+        self._lock = threading.Lock()
+
+    def mark_synced(self):
+        """Records the current state of the files as our own (call after load/save)."""
+        synced = {}
+        with self._lock:
+            previous = self._synced or {}
+            for path in self._files():
+                signature = _file_signature(path)
+                if signature is None:
+                    synced[path] = None
+                    continue
+                known = previous.get(path)
+                if known is not None and known[:2] == tuple(signature):
+                    synced[path] = known # Unchanged since the last sync: no need to hash it again
+                else:
+                    digest = _file_digest(path) if self._hash_contents else None
+                    synced[path] = (signature[0], signature[1], digest)
+            self._synced = synced
+
+    def changed(self):
+        """True if any watched file differs from its state at the last mark_synced()."""
+        with self._lock:
+            if self._synced is None:
+                return False # Never loaded: there is nothing in memory to be out of date
+            for path in self._files():
+                known = self._synced.get(path)
+                signature = _file_signature(path)
+                if known is None or signature is None:
+                    if known != signature:
+                        return True
+                    continue
+                if known[:2] == tuple(signature):
+                    continue
+                if known[0] != signature[0] or known[2] is None or known[2] != _file_digest(path):
+                    return True
+                self._synced[path] = (signature[0], signature[1], known[2]) # Touched, same content
+            return False
+
+def _file_digest(path):
+    import hashlib # Only needed when a file changed on disk; not worth its import time at startup
+    digest = hashlib.blake2b(digest_size=16)
+    try:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    except OSError:
+        return None
+    return digest.digest()
+
+class JsonFileStorage:
+    """Legacy backend: every save rewrites the whole JSON file."""
+
+    def __init__(self, path=None):
+        self.path = path # None means core_logic.DATA_FILE, resolved at call time
+        self.changes = FileChangeDetector(self.watched_files)
+
+    def data_file(self):
+        return self.path or DATA_FILE
+
+    def watched_files(self):
+        return [self.data_file()]
+
+    def load(self, progress_callback=None, should_cancel=None, strict=False):
+        tasks = _read_snapshot(self.data_file(), progress_callback, should_cancel, strict)
+        self.changes.mark_synced()
+        return tasks
+
+    def save(self, tasks):
+        _write_snapshot(self.data_file(), tasks)
+        self.changes.mark_synced()
+
+    def close(self):
+        pass
+
+class JournalStorage:
+    """
+    Snapshot + append-only operation log.
+
+    The snapshot is the ordinary tasks.json file, so older versions can still read it.
+    Every mutation is recorded as one JSON line in DATA_FILE + JOURNAL_SUFFIX; save()
+    only appends the pending records. Once the log reaches compact_threshold records
+    it is folded into a new snapshot and truncated.
+
+    The first journal line stores the snapshot's (size, mtime) signature. A journal
+    whose signature no longer matches the snapshot (e.g. a crash between writing a
+    new snapshot and removing the old log) is stale and is ignored on replay. A torn
+    last line from a crash mid-append is ignored as well.
+
+    Records are id-based, so when another process has written to the files since our
+    last load/save, save() still appends our pending records on top of its changes;
+    it only postpones compaction, which would overwrite them with our in-memory list.
+    """
+
+    def __init__(self, path=None, compact_threshold=JOURNAL_COMPACT_THRESHOLD):
+        self.path = path
+        self.compact_threshold = compact_threshold
+        self._tasks = None     # The list returned by the last load()/save()
+        self._pending = []     # Records not yet appended to the journal
+        self._log_records = 0  # Records already in the journal file
+        self._needs_snapshot = False # Ids were assigned on load and must be persisted
+        self._lock = threading.RLock()
+        self.changes = FileChangeDetector(self.watched_files)
+        add_task_listener(self._on_task_event)
+
+    def data_file(self):
+        return self.path or DATA_FILE
+
+    def journal_file(self):
+        return self.data_file() + JOURNAL_SUFFIX
+
+    def watched_files(self):
+        return [self.data_file(), self.journal_file()]
+
+    def load(self, progress_callback=None, should_cancel=None, strict=False):
+        tasks = _read_snapshot(self.data_file(), progress_callback, should_cancel, strict)
+        with self._lock:
+            self._log_records = self._replay(tasks)
+            self._tasks = tasks
+            self._pending = []
+            # Legacy files have no ids; journal records refer to ids, so write them out on the next save.
+            self._needs_snapshot = tasks.assigned_ids
+        self.changes.mark_synced()
+        return tasks
+
+    def track(self, tasks):
+        """Makes tasks (which must hold what load() just returned) the list whose mutations are journaled."""
+        with self._lock:
+            self._tasks = tasks
+
+    def save(self, tasks):
+        with self._lock: # The GUI saves on a worker thread while the UI thread records mutations
+            if tasks is not self._tasks or self._needs_snapshot:
+                # Not the list we are tracking (e.g. a freshly built list): write it as a snapshot.
+                self.compact(tasks)
+                return
+            if not self._pending:
+                return
+            external = self.changes.changed()
+            lines = []
+            mode = 'a'
+            if not self._journal_is_current():
+                # No journal yet, or a stale one: start a new log for the current snapshot.
+                lines.append(json.dumps({'op': 'base', 'snapshot': _file_signature(self.data_file())}))
+                mode = 'w'
+                self._log_records = 0
+            lines.extend(json.dumps(record, ensure_ascii=False) for record in self._pending)
+            with open(self.journal_file(), mode, encoding='utf-8') as f:
+                f.write("\n".join(lines) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._log_records += len(self._pending)
+            self._pending = []
+            if external:
+                return # Leave the files marked as changed so our caller picks up the other writer's records
+            self.changes.mark_synced()
+            if self._log_records >= self.compact_threshold:
+                self.compact(tasks)
+
+    def compact(self, tasks):
+        """Folds the journal into a fresh snapshot and removes the journal."""
+        with self._lock:
+            _write_snapshot(self.data_file(), tasks)
+            try:
+                os.remove(self.journal_file())
+            except FileNotFoundError:
+                pass
+            self._tasks = tasks
+            self._pending = []
+            self._log_records = 0
+            self._needs_snapshot = False
+            self.changes.mark_synced()
+
+    def close(self):
+        remove_task_listener(self._on_task_event)
+
+    def _on_task_event(self, event, task, tasks_list=None, external=False, **details):
+        if self._tasks is None or external:
+            return # Changes merged in from disk are already in the files
+        if event in ('add', 'delete'):
+            if tasks_list is not self._tasks:
+                return
+        elif not owns_task(self._tasks, task):
+            return # A task from some other list
+        if event == 'add':
+            record = {'op': 'add', 'task': task_to_dict(task)}
+            index = details.get('index')
+            if index is not None and index < len(tasks_list) - 1:
+                record['index'] = index # Inserted mid-list (insert_task_data), not appended
+        elif event == 'update':
+            record = {'op': 'update', 'id': task['id'], 'task': task_to_dict(task)}
+        elif event == 'toggle':
+            record = {'op': 'toggle', 'id': task['id'], 'completed': task['completed']}
+        elif event == 'delete':
+            record = {'op': 'delete', 'id': task['id']}
+        else:
+            return
+        with self._lock:
+            self._pending.append(record)
+
+    def _journal_is_current(self):
+        """True if the journal file exists and its base line matches the current snapshot."""
+        try:
+            with open(self.journal_file(), 'rb') as f:
+                first_line = f.readline()
+            record = json.loads(first_line)
+        except (OSError, ValueError):
+            return False
+        return (isinstance(record, dict) and record.get('op') == 'base'
+                and record.get('snapshot') == _file_signature(self.data_file()))
+
+    def _replay(self, tasks):
+        """
+        Applies journal records to tasks in place. Returns the number of records applied.
+        A record that does not make sense (wrong types, an unknown task) is skipped and
+        replay goes on; an I/O error propagates to load().
+        """
+        applied = 0
+        good_offset = 0
+        try:
+            with open(self.journal_file(), 'rb+') as f:
+                for line_number, line in enumerate(f):
+                    try:
+                        if not line.endswith(b"\n"):
+                            raise ValueError("incomplete record")
+                        record = json.loads(line)
+                    except ValueError:
+                        # Torn write at the end of the log: cut it off so later appends stay readable.
+                        f.truncate(good_offset)
+                        break
+                    good_offset += len(line)
+                    if line_number == 0:
+                        if (not isinstance(record, dict) or record.get('op') != 'base'
+                                or record.get('snapshot') != _file_signature(self.data_file())):
+                            return 0 # Stale journal from before the current snapshot
+                        continue
+                    try:
+                        _apply_journal_record(tasks, record)
+                    except (AttributeError, KeyError, TypeError, ValueError):
+                        continue # A malformed record: skip it like a malformed snapshot entry
+                    applied += 1
+        except FileNotFoundError:
+            pass
+        return applied
+
+def _apply_journal_record(tasks, record):
+    op = record.get('op')
+    if op == 'add':
+        task = _sanitize_task_item(record.get('task'))
+        index = record.get('index')
+        if task is None:
+            return
+        if isinstance(index, int) and not isinstance(index, bool) and 0 <= index < len(tasks):
+            tasks.insert(index, task)
+        else:
+            tasks.append(task)
+        return
+
+    if 'id' in record:
+        target = tasks.get_by_id(record['id'])
+    else:
+        # Records written before tasks had ids address them by position.
+        index = record.get('index')
+        target = tasks[index] if isinstance(index, int) and 0 <= index < len(tasks) else None
+    if target is None:
+        return # Records for unknown tasks are skipped, like malformed entries
+
+    if op == 'update':
+        task = _sanitize_task_item(record.get('task'))
+        if task is not None:
+            task['id'] = target['id']
+            target.update(task)
+    elif op == 'toggle':
+        target['completed'] = bool(record.get('completed'))
+    elif op == 'delete':
+        tasks.remove_by_id(target['id'])
+
+class _SqliteDataVersion:
+    """
+    SqliteStorage's change detector: PRAGMA data_version changes whenever another
+    connection commits, so the check is one query instead of stat()/hash of the files.
+    """
+
+    def __init__(self, storage):
+        self._storage = storage
+        self._synced = None
+
+    def mark_synced(self):
+        self._synced = self._storage._data_version()
+
+    def changed(self):
+        return self._synced is not None and self._storage._data_version() != self._synced
+
+class SqliteStorage:
+    """
+    SQLite backend: one row per task, written with per-row INSERT/UPDATE/DELETE.
+
+    Like JournalStorage, mutations of the loaded list are collected through the task
+    listeners and save() writes only those rows, in a single transaction. The
+    database runs in WAL mode, so readers (e.g. the GUI) are not blocked by a save.
+    The position column keeps list order; completed, priority_rank and due_date are
+    indexed so select_tasks() can answer the CLI's sort/filter views in SQL.
+    """
+
+    _SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS tasks ("
+        " position INTEGER PRIMARY KEY," # rowid: list order
+        " id INTEGER NOT NULL UNIQUE,"
+        " description TEXT NOT NULL,"
+        " completed INTEGER NOT NULL,"
+        " due_date TEXT,"
+        " priority TEXT,"
+        " priority_rank INTEGER NOT NULL)", # PRIORITY_ORDER_MAP_CORE rank, for ORDER BY
+        "CREATE INDEX IF NOT EXISTS tasks_completed ON tasks (completed, position)",
+        "CREATE INDEX IF NOT EXISTS tasks_priority ON tasks (priority_rank, position)",
+        "CREATE INDEX IF NOT EXISTS tasks_due_date ON tasks (due_date, position)",
+    )
+    _INSERT = ("INSERT INTO tasks (id, description, completed, due_date, priority, priority_rank)"
+               " VALUES (?, ?, ?, ?, ?, ?)")
+    _UPDATE = ("UPDATE tasks SET description = ?, completed = ?, due_date = ?, priority = ?, priority_rank = ?"
+               " WHERE id = ?")
+    _TOGGLE = "UPDATE tasks SET completed = ? WHERE id = ?"
+    _DELETE = "DELETE FROM tasks WHERE id = ?"
+    _ORDER_BY = { # sort key -> (ascending, descending) ORDER BY clause; ties keep list order
+        'due_date': ("due_date IS NULL, due_date, position", "due_date IS NULL DESC, due_date DESC, position"),
+        'priority': ("priority_rank, position", "priority_rank DESC, position"),
+    }
+    _WHERE = {'completed': "completed = ?", 'priority': "priority IS ?"}
+
+    def __init__(self, path=None):
+        self.path = path # None means core_logic.SQLITE_DATA_FILE, resolved on first use
+        self._connection = None
+        self._tasks = None
+        self._pending = [] # (statement, parameters) not yet executed
+        self._rewrite = False # A task was inserted mid-list: positions shift, the next save rewrites the table
+        self._lock = threading.RLock()
+        self.changes = _SqliteDataVersion(self)
+        add_task_listener(self._on_task_event)
+
+    def data_file(self):
+        return self.path or SQLITE_DATA_FILE
+
+    def watched_files(self):
+        return [self.data_file(), self.data_file() + "-wal"]
+
+    def connection(self):
+        with self._lock:
+            if self._connection is None:
+                import sqlite3 # Imported on first use, so the other backends do not pay for it at startup
+                # The GUI saves on a worker thread; all access goes through self._lock.
+                connection = sqlite3.connect(self.data_file(), check_same_thread=False)
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.execute("PRAGMA synchronous=NORMAL") # Durable at checkpoints, safe in WAL mode
+                for statement in self._SCHEMA:
+                    connection.execute(statement)
+                connection.commit()
+                self._connection = connection
+            return self._connection
+
+    def load(self, progress_callback=None, should_cancel=None, strict=False):
+        with self._lock: # Read errors always raise: there is nothing partial to keep
+            cursor = self.connection().execute(
+                "SELECT id, description, completed, due_date, priority FROM tasks ORDER BY position")
+            tasks = new_task_container()
+            with paused_gc():
+                while True:
+                    rows = cursor.fetchmany(LOAD_PROGRESS_INTERVAL)
+                    if not rows:
+                        break
+                    for task_id, description, completed, due_date, priority in rows:
+                        tasks.append(Task(id=task_id, description=description, completed=bool(completed),
+                                          due_date=due_date, priority=priority))
+                    if should_cancel is not None and should_cancel():
+                        raise LoadCancelled()
+                    if progress_callback is not None:
+                        progress_callback(len(tasks))
+            self._tasks = tasks
+            self._pending = []
+            self._rewrite = False
+            self.changes.mark_synced()
+        return tasks
+
+    def track(self, tasks):
+        """Makes tasks (which must hold what load() just returned) the list whose mutations are saved."""
+        with self._lock:
+            self._tasks = tasks
+
+    def save(self, tasks):
+        with self._lock:
+            connection = self.connection()
+            with connection: # One transaction; rolled back if anything fails
+                if tasks is not self._tasks or self._rewrite:
+                    # Not the list we are tracking (or its order changed): replace the table contents.
+                    connection.execute("DELETE FROM tasks")
+                    connection.executemany(self._INSERT, map(_sqlite_row, tasks))
+                    self._tasks = tasks
+                else:
+                    for statement, group in itertools.groupby(self._pending, key=lambda item: item[0]):
+                        connection.executemany(statement, [parameters for _statement, parameters in group])
+                self._pending = []
+                self._rewrite = False
+            self.changes.mark_synced()
+
+    def select_tasks(self, tasks, where=None, order_by=None, reverse=False):
+        """
+        Runs a filter (where={'completed': bool} or {'priority': value}) and/or an order
+        (order_by='due_date' or 'priority') in SQL. Returns the matching tasks of tasks,
+        or None when the database cannot answer for that list (not the loaded list,
+        unsaved changes, or an unsupported condition); callers then filter in memory.
+        """
+        where = where or {}
+        if order_by is not None and order_by not in self._ORDER_BY:
+            return None
+        if any(field not in self._WHERE for field in where):
+            return None
+        with self._lock:
+            if tasks is not self._tasks or self._pending or self._rewrite:
+                return None
+            sql = "SELECT id FROM tasks"
+            if where:
+                sql += " WHERE " + " AND ".join(self._WHERE[field] for field in where)
+            if order_by is None:
+                sql += " ORDER BY position"
+            else:
+                sql += " ORDER BY " + self._ORDER_BY[order_by][1 if reverse else 0]
+            parameters = [int(value) if field == 'completed' else value for field, value in where.items()]
+            ids = [row[0] for row in self.connection().execute(sql, parameters)]
+        return list(map(tasks.get_by_id, ids))
+
+    def close(self):
+        remove_task_listener(self._on_task_event)
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def _data_version(self):
+        with self._lock:
+            return self.connection().execute("PRAGMA data_version").fetchone()[0]
+
+    def _on_task_event(self, event, task, tasks_list=None, external=False, **details):
+        if self._tasks is None or external:
+            return
+        if event in ('add', 'delete'):
+            if tasks_list is not self._tasks:
+                return
+        elif not owns_task(self._tasks, task):
+            return
+        if event == 'add':
+            index = details.get('index')
+            if index is not None and index < len(tasks_list) - 1:
+                with self._lock:
+                    self._rewrite = True
+                return
+            item = (self._INSERT, _sqlite_row(task))
+        elif event == 'update':
+            item = (self._UPDATE, _sqlite_row(task)[1:] + (task['id'],))
+        elif event == 'toggle':
+            item = (self._TOGGLE, (int(bool(task['completed'])), task['id']))
+        elif event == 'delete':
+            item = (self._DELETE, (task['id'],))
+        else:
+            return
+        with self._lock:
+            self._pending.append(item)
+
+def _sqlite_row(task):
+    priority = task.get('priority')
+    return (task['id'], task['description'], int(bool(task.get('completed'))), task.get('due_date'),
+            priority, PRIORITY_ORDER_MAP_CORE.get(priority, PRIORITY_ORDER_MAP_CORE[None]))
+
+def migrate_json_to_sqlite(json_path=None, db_path=None):
+    """
+    One-shot migration: reads tasks.json (and its journal, if any) and writes every task
+    into the SQLite database, replacing its contents. Returns the number of tasks migrated.
+    """
+    source = JournalStorage(json_path)
+    target = SqliteStorage(db_path)
+    try:
+        tasks = source.load()
+        target.save(tasks)
+        return len(tasks)
+    finally:
+        source.close()
+        target.close()
+
+# --- 二进制快照格式 ---
+# JSON (indent=4) 快照体积大、解析慢。二进制快照按列存放 TaskStore 的数据：
+#   头部: BINARY_MAGIC, struct _BINARY_HEADER = (版本, 压缩方式, 保留, 任务数, 描述区字节数, 数据区字节数)
+#   数据区 (可整体用 zlib/lzma 压缩):
+#     ids int64[N] | due_date 序数日 int32[N] | priority 编码 uint8[N] | completed 位图 ceil(N/8) 字节
+#     | 描述偏移 uint32[N+1] | 描述 UTF-8 字节串 (字符串表)
+# 所有整数均为小端序。未压缩的快照直接 mmap，描述在访问到某一行时才解码，
+# 所以 100 万任务的加载只需复制几个定长数组。
+BINARY_MAGIC = b"TODOBIN\0"
+BINARY_FORMAT_VERSION = 1
+_BINARY_HEADER = struct.Struct("<BBHQQQ")
+BINARY_COMPRESSION = {None: 0, 'zlib': 1, 'lzma': 2}
+_BINARY_COMPRESSION_NAMES = {code: name for name, code in BINARY_COMPRESSION.items()}
+
+class _EncodedStrings:
+    """
+    TaskStore description column over a UTF-8 string table (bytes or an mmap):
+    row i is decoded from blob[offsets[i]:offsets[i+1]] when it is read. Writes and
+    appends are kept in a side dict, so the table itself is never modified.
+    """
+    __slots__ = ('_blob', '_base', '_offsets', '_count', '_changed')
+
+    def __init__(self, blob, base, offsets):
+        self._blob = blob
+        self._base = base # Start of the string table within blob
+        self._offsets = offsets
+        self._count = len(offsets) - 1
+        self._changed = {}
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, slot):
+        if slot < 0:
+            slot += self._count
+        if not 0 <= slot < self._count:
+            raise IndexError("description index out of range")
+        if slot in self._changed:
+            return self._changed[slot]
+        base = self._base
+        return str(self._blob[base + self._offsets[slot]:base + self._offsets[slot + 1]], 'utf-8')
+
+    def __setitem__(self, slot, value):
+        if slot < 0:
+            slot += self._count
+        self._changed[slot] = value
+
+    def append(self, value):
+        self._changed[self._count] = value
+        self._count += 1
+
+    def __iter__(self):
+        return (self[slot] for slot in range(self._count))
+
+def _column_from_bytes(typecode, data):
+    column = array(typecode)
+    column.frombytes(data)
+    if sys.byteorder == 'big':
+        column.byteswap()
+    return column
+
+def _column_bytes(column):
+    if sys.byteorder == 'big':
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+def write_binary_snapshot(path, tasks, compression=None):
+    """
+    Writes tasks to path in the binary snapshot format, atomically (temp file + rename).
+    compression is None, 'zlib' or 'lzma'.
+    """
+    if compression not in BINARY_COMPRESSION:
+        raise ValueError(f"Unknown compression: {compression}")
+    if isinstance(tasks, TaskStore):
+        # Same columns as the file: copy them instead of going row by row.
+        tasks._compact()
+        ids, due, priority = tasks._ids, tasks._due, tasks._priority
+        completed = tasks._completed
+        descriptions = tasks._descriptions
+    else:
+        ids, due, priority = array('q'), array('i'), array('B')
+        completed = bytearray()
+        descriptions = []
+        for row, task in enumerate(tasks):
+            ids.append(task['id'])
+            due.append(_date_to_ordinal(task.get('due_date')))
+            priority.append(PRIORITY_ORDER_MAP_CORE.get(task.get('priority'), PRIORITY_ORDER_MAP_CORE[None]))
+            if row % 8 == 0:
+                completed.append(0)
+            if task.get('completed'):
+                completed[row >> 3] |= 1 << (row & 7)
+            descriptions.append(task['description'])
+    encoded = [description.encode('utf-8') for description in descriptions]
+    offsets = array('I', [0])
+    offsets.extend(itertools.accumulate(map(len, encoded)))
+    strings = b"".join(encoded)
+    payload = b"".join((_column_bytes(ids), _column_bytes(due), priority.tobytes(), bytes(completed),
+                        _column_bytes(offsets), strings))
+    if compression == 'zlib':
+        payload = zlib.compress(payload, 6)
+    elif compression == 'lzma':
+        import lzma
+        payload = lzma.compress(payload)
+    header = _BINARY_HEADER.pack(BINARY_FORMAT_VERSION, BINARY_COMPRESSION[compression], 0,
+                                 len(ids), len(strings), len(payload))
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(BINARY_MAGIC)
+            f.write(header)
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    _fsync_directory(os.path.dirname(os.path.abspath(path)))
+
+def read_binary_snapshot(path):
+    """
+    Reads a binary snapshot into a TaskStore. Uncompressed snapshots are memory-mapped
+    and their descriptions decoded lazily; compressed ones are decompressed into memory.
+    Raises ValueError if the file is not a valid snapshot.
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+            raise ValueError(f"{path} is not a binary task snapshot")
+        header = f.read(_BINARY_HEADER.size)
+        if len(header) != _BINARY_HEADER.size:
+            raise ValueError(f"{path}: truncated header")
+        version, compression, _reserved, count, strings_size, payload_size = _BINARY_HEADER.unpack(header)
+        if version != BINARY_FORMAT_VERSION or compression not in _BINARY_COMPRESSION_NAMES:
+            raise ValueError(f"{path}: unsupported snapshot version {version} / compression {compression}")
+        start = len(BINARY_MAGIC) + _BINARY_HEADER.size
+        if compression == BINARY_COMPRESSION[None] and os.name != 'nt':
+            # Map the file instead of reading it. (Not on Windows, where a mapped file cannot
+            # be replaced by the next save's rename.)
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            f.seek(start)
+            data = f.read()
+            start = 0
+            if compression == BINARY_COMPRESSION['zlib']:
+                data = zlib.decompress(data)
+            elif compression == BINARY_COMPRESSION['lzma']:
+                import lzma
+                data = lzma.decompress(data)
+    bitmap_size = (count + 7) // 8
+    sizes = (8 * count, 4 * count, count, bitmap_size, 4 * (count + 1), strings_size)
+    if start + sum(sizes) > len(data):
+        raise ValueError(f"{path}: truncated snapshot")
+    bounds = list(itertools.accumulate(sizes, initial=start))
+    ids = _column_from_bytes('q', data[bounds[0]:bounds[1]])
+    due = _column_from_bytes('i', data[bounds[1]:bounds[2]])
+    priority = _column_from_bytes('B', data[bounds[2]:bounds[3]])
+    completed = bytearray(data[bounds[3]:bounds[4]])
+    offsets = _column_from_bytes('I', data[bounds[4]:bounds[5]]) if count else array('I', [0])
+    descriptions = _EncodedStrings(data, bounds[5], offsets)
+    return TaskStore.from_columns(ids, descriptions, completed, due, priority)
+
+class BinarySnapshotStorage:
+    """
+    Backend for the binary snapshot format. Every save rewrites the snapshot (atomically),
+    like JsonFileStorage, but loading a 1M-task file only maps it and copies the fixed-width
+    columns. Loaded lists are always TaskStores. The snapshot is not content-hashed for
+    change detection: hashing it would cost more than loading it.
+    """
+
+    def __init__(self, path=None, compression=None):
+        self.path = path # None means core_logic.BINARY_DATA_FILE, resolved at call time
+        self.compression = compression
+        self.changes = FileChangeDetector(self.watched_files, hash_contents=False)
+
+    def data_file(self):
+        return self.path or BINARY_DATA_FILE
+
+    def watched_files(self):
+        return [self.data_file()]
+
+    def load(self, progress_callback=None, should_cancel=None, strict=False):
+        try: # A damaged snapshot always raises: there is nothing partial to keep
+            tasks = read_binary_snapshot(self.data_file())
+        except FileNotFoundError:
+            tasks = TaskStore()
+        self.changes.mark_synced()
+        if progress_callback is not None:
+            progress_callback(len(tasks))
+        return tasks
+
+    def save(self, tasks):
+        write_binary_snapshot(self.data_file(), tasks, self.compression)
+        self.changes.mark_synced()
+
+    def close(self):
+        pass
+
+def migrate_json_to_binary(json_path=None, binary_path=None, compression=None):
+    """Imports tasks.json (and its journal, if any) into a binary snapshot. Returns the task count."""
+    source = JournalStorage(json_path)
+    try:
+        tasks = source.load()
+    finally:
+        source.close()
+    write_binary_snapshot(binary_path or BINARY_DATA_FILE, tasks, compression)
+    return len(tasks)
+
+def export_binary_to_json(binary_path=None, json_path=None):
+    """Exports a binary snapshot to the JSON format (tasks.json layout). Returns the task count."""
+    tasks = read_binary_snapshot(binary_path or BINARY_DATA_FILE)
+    _write_snapshot(json_path or DATA_FILE, tasks)
+    return len(tasks)
+
+STORAGE_BACKENDS = {
+    'journal': JournalStorage,
+    'json': JsonFileStorage,
+    'sqlite': SqliteStorage,
+    'binary': BinarySnapshotStorage,
+}
+STORAGE_BACKEND_ENV = "TODO_STORAGE_BACKEND" # 环境变量，选择默认存储后端（见 STORAGE_BACKENDS）
+
+_storage_backend = STORAGE_BACKENDS.get(os.environ.get(STORAGE_BACKEND_ENV, ''), JournalStorage)()
+
+def get_storage_backend():
+    """Returns the active storage backend."""
+    return _storage_backend
+
+def set_storage_backend(backend):
+    """Replaces the active storage backend (anything with load()/save(tasks)). Returns the old one."""
+    global _storage_backend
+    flush_tasks_data()
+    previous = _storage_backend
+    if previous is not backend and hasattr(previous, 'close'):
+        previous.close()
+    _storage_backend = backend
+    return previous
+
+def load_tasks_data(progress_callback=None, should_cancel=None, strict=False):
+    """
+    Loads tasks through the active storage backend. Nothing is written: the automatic
+    archiving policy is applied by the caller after the initial load (auto_archive_tasks).
+    progress_callback(count) is called every LOAD_PROGRESS_INTERVAL tasks; if
+    should_cancel() returns True at one of those points, LoadCancelled is raised.
+
+    By default a file that cannot be read yields an empty list (and a truncated JSON
+    snapshot the tasks before the damage). strict=True raises LoadFailed instead: a
+    reload that is merged into tasks already in memory must not mistake a file another
+    program is halfway through writing for "every task was deleted".
+    """
+    flush_tasks_data() # A coalesced save still waiting would otherwise be lost
+    signature = _summary_signature(_storage_backend) # Taken first: a write during the load makes it stale
+    try:
+        if progress_callback is None and should_cancel is None and not strict:
+            tasks = _storage_backend.load()
+        else:
+            tasks = _storage_backend.load(progress_callback=progress_callback, should_cancel=should_cancel,
+                                          strict=strict)
+    except (LoadCancelled, LoadFailed):
+        raise
+    except Exception as error:
+        if strict:
+            raise LoadFailed(str(error)) from error
+        return new_task_container() # The same type as a successful load: listeners rely on it
+    _refresh_summary_cache(tasks, signature)
     return tasks
 
+# --- 任务摘要缓存 ---
+# 数据文件旁的 <数据文件>.summary.json 记录任务总数、已完成数和未完成任务按截止日期的计数，
+# 以及写入时各数据文件的 (大小, mtime)。CLI 启动时只读这个小文件就能显示“共几个任务、
+# 几个过期、最近的截止日期”，不用解析整个任务文件。文件签名对不上就当作没有缓存。
+# 摘要在加载后（以及 UI 退出前）写出，而不是每次保存都写：那样每次保存都要 O(N)。
+SUMMARY_SUFFIX = ".summary.json"
+SUMMARY_FORMAT_VERSION = 1
+
+def summary_file(backend=None):
+    """Path of the summary sidecar of backend (default: the active one), or None if it has no data file."""
+    backend = backend or _storage_backend
+    data_file = getattr(backend, 'data_file', None)
+    return data_file() + SUMMARY_SUFFIX if data_file is not None else None
+
+def _summary_signature(backend):
+    watched_files = getattr(backend, 'watched_files', None)
+    if watched_files is None or summary_file(backend) is None:
+        return None
+    return [type(backend).__name__] + [[path, _file_signature(path)] for path in watched_files()]
+
+def summarize_tasks(tasks):
+    """
+    Counts of a task list that stay meaningful on later days:
+    {'total', 'completed', 'pending_due': [[due_date, pending tasks due that day], ...] sorted}.
+    """
+    completed = 0
+    pending_due = {}
+    for task in tasks:
+        if task.get('completed'):
+            completed += 1
+        else:
+            due_date = task.get('due_date')
+            if due_date:
+                pending_due[due_date] = pending_due.get(due_date, 0) + 1
+    return {'total': len(tasks), 'completed': completed, 'pending_due': sorted(pending_due.items())}
+
+class TaskSummary:
+    """
+    summarize_tasks() of one task container, kept up to date through the task listeners,
+    so a long-running process (the task server) can report counts without an O(N) pass:
+    summary() costs O(D log D) for D distinct pending due dates. Call detach() when done.
+    """
+
+    def __init__(self, tasks_list):
+        self.tasks = tasks_list
+        self._stale = False
+        self._reset(summarize_tasks(tasks_list))
+        add_task_listener(self._on_task_event)
+
+    def detach(self):
+        """Stops following mutations. The summary is stale afterwards."""
+        remove_task_listener(self._on_task_event)
+
+    def summary(self):
+        """The same dict summarize_tasks(tasks_list) would return now."""
+        if self._stale:
+            self._stale = False
+            self._reset(summarize_tasks(self.tasks))
+        return {'total': self._total, 'completed': self._completed,
+                'pending_due': sorted(self._pending_due.items())}
+
+    def _reset(self, summary):
+        self._total = summary['total']
+        self._completed = summary['completed']
+        self._pending_due = dict(summary['pending_due'])
+
+    def _count(self, completed, due_date, sign):
+        """Counts one task with these fields in (sign=1) or out (sign=-1)."""
+        if completed:
+            self._completed += sign
+        elif due_date:
+            count = self._pending_due.get(due_date, 0) + sign
+            if count:
+                self._pending_due[due_date] = count
+            else:
+                del self._pending_due[due_date]
+
+    def _on_task_event(self, event, task, tasks_list=None, previous=None, **details):
+        if event in ('add', 'delete'):
+            if tasks_list is not self.tasks:
+                return
+            sign = 1 if event == 'add' else -1
+            self._total += sign
+            self._count(bool(task.get('completed')), task.get('due_date'), sign)
+        elif not owns_task(self.tasks, task):
+            return
+        elif event == 'toggle':
+            completed = bool(task.get('completed'))
+            self._count(not completed, task.get('due_date'), -1)
+            self._count(completed, task.get('due_date'), 1)
+        elif previous is None:
+            self._stale = True # An update without the old values: recount on the next summary()
+        else:
+            completed, due_date = bool(task.get('completed')), task.get('due_date')
+            self._count(bool(previous.get('completed', completed)), previous.get('due_date', due_date), -1)
+            self._count(completed, due_date, 1)
+
+def summary_counts(summary, today=None):
+    """
+    Turns a summarize_tasks() result into {'total', 'completed', 'pending', 'overdue',
+    'due_today', 'next_due'} as of today (a YYYY-MM-DD string, default: the current date).
+    next_due is the earliest due date of a pending task that is today or later, or None.
+    """
+    today = today or datetime.date.today().isoformat()
+    overdue = due_today = 0
+    next_due = None
+    for due_date, count in summary['pending_due']:
+        if due_date < today:
+            overdue += count
+        elif next_due is None:
+            next_due = due_date
+            if due_date == today:
+                due_today = count
+    return {'total': summary['total'], 'completed': summary['completed'],
+            'pending': summary['total'] - summary['completed'],
+            'overdue': overdue, 'due_today': due_today, 'next_due': next_due}
+
+def _read_summary_file(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return cached if isinstance(cached, dict) and cached.get('version') == SUMMARY_FORMAT_VERSION else None
+
+def read_summary_cache(today=None):
+    """
+    summary_counts() of the active backend's summary sidecar, without loading any task.
+    None if there is no sidecar or the data files changed since it was written.
+    """
+    path = summary_file()
+    signature = _summary_signature(_storage_backend)
+    cached = _read_summary_file(path) if path is not None else None
+    if cached is None or signature is None or cached.get('signature') != signature:
+        return None
+    try:
+        return summary_counts(cached['summary'], today)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def _write_summary_file(path, signature, summary):
+    # 每个进程、每个线程一个临时文件：CLI、GUI（加载线程和 UI 线程）和服务器可能同时写摘要
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': SUMMARY_FORMAT_VERSION, 'signature': signature, 'summary': summary},
+                      f, ensure_ascii=False)
+        os.replace(temp_path, path)
+        return True
+    except OSError:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        return False # E.g. a read-only directory: the summary is only a startup shortcut
+
+def _refresh_summary_cache(tasks, signature):
+    path = summary_file()
+    if signature is None or path is None:
+        return False
+    cached = _read_summary_file(path)
+    if cached is not None and cached.get('signature') == signature:
+        return True # Same files as when the sidecar was written
+    return _write_summary_file(path, signature, summarize_tasks(tasks))
+
+def write_summary_cache(tasks):
+    """
+    Writes the summary sidecar for tasks, which must be what is on disk now: call it after
+    flush_tasks_data(), e.g. when a UI exits. Does nothing (returns False) if another
+    process changed the files since our last load/save, or the backend has no data file.
+    """
+    if storage_changed_on_disk():
+        return False
+    return _refresh_summary_cache(tasks, _summary_signature(_storage_backend))
+
+# --- 写入合并 ---
+# 批量修改（脚本导入、连续编辑）时每次 save 都写一次文件太浪费。设置了合并窗口后，
+# 距离上次实际写入不到一个窗口的 save_tasks_data 只做标记，由窗口过后的下一次保存或
+# flush_tasks_data() 一次写出。不使用后台定时线程，所以写入总是发生在调用者的线程里。
+WRITE_COALESCE_ENV = "TODO_WRITE_COALESCE_SECONDS" # 环境变量，设置默认的合并窗口
+_write_coalesce_window = 0.0 # 秒，0 表示每次 save_tasks_data 都立即写入
+_deferred_save = None        # 等待写入的任务列表
+_last_write_at = None        # 上次实际写入的时间 (time.monotonic)
+_save_lock = threading.RLock()
+
+def save_lock():
+    """
+    The lock save_tasks_data and flush_tasks_data hold while writing. A UI that saves on
+    a worker thread mutates its task list under it, so a save never reads a half-applied
+    edit. Reentrant: saving while holding it is fine.
+    """
+    return _save_lock
+
+def set_write_coalescing(window_seconds):
+    """
+    Sets the write coalescing window in seconds (0 disables it). Returns the old window.
+    Disabling it flushes any save that is still waiting.
+    """
+    global _write_coalesce_window
+    with _save_lock:
+        previous = _write_coalesce_window
+        _write_coalesce_window = max(0.0, float(window_seconds or 0))
+        if not _write_coalesce_window:
+            flush_tasks_data()
+        return previous
+
 def save_tasks_data(tasks):
-    """Saves the list of tasks to the JSON data file."""
+    """
+    Saves the list of tasks through the active storage backend.
+    With write coalescing enabled the write may be deferred (see set_write_coalescing);
+    call flush_tasks_data() before exiting.
+    """
+    global _deferred_save
+    with _save_lock:
+        if _deferred_save is not None and _deferred_save is not tasks:
+            flush_tasks_data() # A different list is waiting: write it first
+        if (_write_coalesce_window and _last_write_at is not None
+                and time.monotonic() - _last_write_at < _write_coalesce_window):
+            _deferred_save = tasks
+            return True
+        _deferred_save = None
+        return _write_tasks_now(tasks)
+
+def flush_tasks_data():
+    """Writes a save deferred by write coalescing, if any. Returns True on success."""
+    global _deferred_save
+    with _save_lock:
+        if _deferred_save is None:
+            return True
+        tasks, _deferred_save = _deferred_save, None
+        return _write_tasks_now(tasks)
+
+def _write_tasks_now(tasks):
+    global _last_write_at
     try:
-        with open(DATA_FILE, 'w', encoding='utf-8') as f:
-            json.dump(tasks, f, indent=4, ensure_ascii=False)
+        _storage_backend.save(tasks)
+        _last_write_at = time.monotonic()
         return True # Indicate success
     except Exception:
         return False # Indicate failure
 
+try:
+    set_write_coalescing(os.environ.get(WRITE_COALESCE_ENV, 0))
+except ValueError:
+    pass # Not a number: keep writing immediately
+
+try:
+    if os.environ.get(PARALLEL_LOAD_ENV):
+        set_parallel_loading(os.environ[PARALLEL_LOAD_ENV])
+except ValueError:
+    pass # Not a number: one worker per CPU
+
+# --- 外部修改同步 ---
+# CLI 和 GUI 可以同时打开同一个任务文件。每次操作前先用 storage_changed_on_disk()
+# 检查（没有变化时只是几次 stat），有变化时重新加载，再按 id 把差异合并进内存中的列表，
+# 这样索引、GUI 模型等监听者只会收到真正变化的那几行。
+def storage_changed_on_disk():
+    """True if another process changed the active backend's files since our last load/save."""
+    changes = getattr(_storage_backend, 'changes', None)
+    return changes is not None and changes.changed()
+
+def diff_tasks(old_tasks, new_tasks):
+    """
+    Compares two task containers by id.
+    Returns (added, changed, removed): tasks only in new_tasks, (old, new) pairs whose
+    fields differ, and tasks only in old_tasks.
+    """
+    if isinstance(old_tasks, (TaskList, TaskStore)):
+        old_by_id = old_tasks.get_by_id
+    else:
+        old_by_id = {task.get('id'): task for task in old_tasks}.get
+    added, changed = [], []
+    seen = set()
+    for new_task in new_tasks:
+        task_id = new_task['id']
+        seen.add(task_id)
+        old_task = old_by_id(task_id)
+        if old_task is None:
+            added.append(new_task)
+        elif any(old_task.get(field) != new_task.get(field) for field in TASK_FIELDS):
+            changed.append((old_task, new_task))
+    removed = [task for task in old_tasks if task.get('id') not in seen]
+    return added, changed, removed
+
+def merge_loaded_tasks(tasks_list, fresh_tasks):
+    """
+    Brings tasks_list up to date with fresh_tasks (just returned by load_tasks_data) in
+    place, notifying listeners with external=True for each added, changed or removed
+    task. The backend then journals later mutations of tasks_list, not of fresh_tasks.
+    Returns the number of tasks that changed.
+    """
+    added, changed, removed = diff_tasks(tasks_list, fresh_tasks)
+    if removed and not isinstance(tasks_list, (TaskList, TaskStore)):
+        removed_ids = {task.get('id') for task in removed}
+        tasks_list[:] = [task for task in tasks_list if task.get('id') not in removed_ids]
+    for task in removed:
+        index = None
+        if isinstance(tasks_list, (TaskList, TaskStore)):
+            index = tasks_list.position_of(task['id'])
+            task = tasks_list.remove_by_id(task['id']) or task # A TaskStore returns a detached copy
+        _notify_task_listeners('delete', task, tasks_list=tasks_list, external=True, index=index)
+    for old_task, new_task in changed:
+        previous = {field: old_task.get(field) for field in TASK_FIELDS if field != 'id'}
+        old_task.update({field: new_task.get(field) for field in TASK_FIELDS if field != 'id'})
+        _notify_task_listeners('update', old_task, external=True, previous=previous)
+    for task in added:
+        new_task = Task(**task_to_dict(task))
+        stored_task = tasks_list.append(new_task)
+        if stored_task is None: # A plain list
+            stored_task = new_task
+        _notify_task_listeners('add', stored_task, tasks_list=tasks_list, index=len(tasks_list) - 1, external=True)
+    if hasattr(_storage_backend, 'track'):
+        _storage_backend.track(tasks_list)
+    return len(added) + len(changed) + len(removed)
+
+def reload_changed_tasks_data():
+    """
+    Loads the tasks again if another process changed the files since our last load/save.
+    Returns the fresh tasks for merge_loaded_tasks, or None if nothing changed or the
+    files could not be read completely (the next call tries again).
+    """
+    if not storage_changed_on_disk():
+        return None
+    try:
+        return load_tasks_data(strict=True) # load_tasks_data flushes our deferred save first
+    except LoadFailed:
+        return None
+
+def sync_tasks_data(tasks_list):
+    """
+    Merges changes another process saved since our last load/save into tasks_list.
+    Returns the number of tasks that changed (0 after just a few stat calls if none,
+    and 0 with tasks_list untouched if the files could not be read).
+    """
+    fresh_tasks = reload_changed_tasks_data()
+    if fresh_tasks is None:
+        return 0
+    return merge_loaded_tasks(tasks_list, fresh_tasks)
+
 # --- 核心任务操作函数 (只处理数据，不进行 print/input) ---
 def add_task_data(tasks_list, description, due_date=None, priority=None):
     """
     Adds a new task to the tasks_list.
-    Returns the new task dictionary if successful, None otherwise.
+    Returns the new task if successful, None otherwise.
     """
     clean_description = description.strip() if description else ""
     if not clean_description:
@@ -101,16 +2199,20 @@ def add_task_data(tasks_list, description, due_date=None, priority=None):
     valid_priority = None
     if priority:
         normalized_priority = str(priority).lower()
-        if normalized_priority in [p for p in VALID_PRIORITIES_CORE if p is not None]: # Check against "high", "medium", "low"
+        if normalized_priority in _PRIORITY_NAMES_CORE: # Check against "high", "medium", "low"
             valid_priority = normalized_priority
     
-    new_task = {
-        'description': clean_description,
-        'completed': False,
-        'due_date': valid_due_date,
-        'priority': valid_priority 
-    }
-    tasks_list.append(new_task)
+    new_task = Task(
+        id=_new_task_id(), # TaskList.append replaces it in the unlikely case of a clash
+        description=clean_description,
+        completed=False,
+        due_date=valid_due_date,
+        priority=valid_priority
+    )
+    stored_task = tasks_list.append(new_task)
+    if stored_task is not None: # TaskList/TaskStore return the row actually stored
+        new_task = stored_task
+    _notify_task_listeners('add', new_task, tasks_list=tasks_list, index=len(tasks_list) - 1)
     return new_task
 
 def update_task_data(task_dict, new_description, new_due_date=None, new_priority=None):
@@ -121,6 +2223,7 @@ def update_task_data(task_dict, new_description, new_due_date=None, new_priority
     clean_new_description = new_description.strip() if new_description else ""
     if not clean_new_description:
         return False # Cannot update to an empty description
+    previous = {field: task_dict.get(field) for field in ('description', 'due_date', 'priority')}
     
     task_dict['description'] = clean_new_description
     
@@ -141,12 +2244,13 @@ def update_task_data(task_dict, new_description, new_due_date=None, new_priority
     # Validate and update priority
     if new_priority: # If a new priority string is provided
         normalized_new_priority = str(new_priority).lower()
-        if normalized_new_priority in [p for p in VALID_PRIORITIES_CORE if p is not None]:
+        if normalized_new_priority in _PRIORITY_NAMES_CORE:
             task_dict['priority'] = normalized_new_priority
         # else: invalid new priority string, do not change.
     elif new_priority is None: # Explicitly setting to None (or empty string from UI meaning None)
         task_dict['priority'] = None
-    
+
+    _notify_task_listeners('update', task_dict, previous=previous)
     return True
 
 def get_task_by_original_index(tasks_list, index):
@@ -155,19 +2259,878 @@ def get_task_by_original_index(tasks_list, index):
         return tasks_list[index]
     return None
 
+def get_task_by_id(tasks_list, task_id):
+    """Gets a task by its id. O(1) for a TaskList or TaskStore."""
+    if isinstance(tasks_list, (TaskList, TaskStore)):
+        return tasks_list.get_by_id(task_id)
+    for task in tasks_list:
+        if task.get('id') == task_id:
+            return task
+    return None
+
 def delete_task_data(tasks_list, task_index):
     """Deletes a task from the list by index. Returns True if successful."""
     if 0 <= task_index < len(tasks_list):
-        tasks_list.pop(task_index)
+        removed_task = tasks_list.pop(task_index)
+        _notify_task_listeners('delete', removed_task, tasks_list=tasks_list, index=task_index)
+        return True
+    return False
+
+def delete_task_by_id(tasks_list, task_id):
+    """Deletes a task by its id (O(1) for a TaskList or TaskStore). Returns True if successful."""
+    if isinstance(tasks_list, (TaskList, TaskStore)):
+        index = tasks_list.position_of(task_id) # For listeners that restore it in place (TaskHistory)
+        removed_task = tasks_list.remove_by_id(task_id)
+        if removed_task is None:
+            return False
+        _notify_task_listeners('delete', removed_task, tasks_list=tasks_list, index=index)
         return True
+    for index, task in enumerate(tasks_list):
+        if task.get('id') == task_id:
+            return delete_task_data(tasks_list, index)
     return False
 
+def insert_task_data(tasks_list, index, task):
+    """
+    Puts a complete task (id and completion state included, e.g. one restored by undo)
+    into tasks_list at index, or at the end if index is None or past the end.
+    Returns the stored task.
+    """
+    count = len(tasks_list)
+    index = count if index is None else _insert_position(index, count)
+    if index == count:
+        stored_task = tasks_list.append(task)
+    else:
+        stored_task = tasks_list.insert(index, task)
+    if stored_task is None: # A plain list
+        stored_task = task
+    _notify_task_listeners('add', stored_task, tasks_list=tasks_list, index=index)
+    return stored_task
+
 def toggle_task_completion_data(task_dict):
     """Toggles the completion status of a task dictionary."""
     if task_dict:
         task_dict['completed'] = not task_dict.get('completed', False)
+        _notify_task_listeners('toggle', task_dict)
         return True
     return False
 
-# Sorting and filtering logic can be added here later if complex
-# For now, the main PRIORITY_ORDER_MAP_CORE is here for reference by UIs
\ No newline at end of file
+# --- 批量操作 ---
+# 一次处理一批任务：输入只校验一遍（日期走 validate_dates_core 的批量路径），按 id 的
+# 查找表只建一次，批量删除只整理一次列表 (O(N))，而不是每个任务一次 pop。每个任务仍然
+# 各自通知监听者（日志、SQLite、索引和撤销历史都按单个任务维护）。每个函数都返回与输入
+# 一一对应的结果列表；要让整批修改成为一步撤销，用 TaskHistory.grouped() 包起来。
+def _task_lookup(tasks_list):
+    """A task_id -> task function: O(1) for a TaskList/TaskStore, one dict build for a plain list."""
+    if isinstance(tasks_list, (TaskList, TaskStore)):
+        return tasks_list.get_by_id
+    return {task.get('id'): task for task in tasks_list}.get
+
+def _normalized_priority(priority):
+    """The priority as stored ("high"/"medium"/"low"), None for no priority, or False if invalid."""
+    if not priority:
+        return None
+    normalized = str(priority).lower()
+    return normalized if normalized in _PRIORITY_NAMES_CORE else False
+
+def add_tasks_bulk(tasks_list, items):
+    """
+    Adds one task per item (a mapping with 'description' and optionally 'due_date' and
+    'priority'), with the same rules as add_task_data. Returns a list with the new task
+    for each item, or None where the description was empty or not a string.
+    """
+    items = list(items)
+    date_ok = validate_dates_core([item.get('due_date') or "" for item in items])
+    results = []
+    with paused_gc():
+        for item, valid_date in zip(items, date_ok):
+            description = item.get('description')
+            description = description.strip() if isinstance(description, str) else "" # e.g. a number from JSON input
+            if not description:
+                results.append(None)
+                continue
+            priority = _normalized_priority(item.get('priority'))
+            new_task = Task(description, completed=False, due_date=(item.get('due_date') or None) if valid_date else None,
+                            priority=priority or None, id=_new_task_id())
+            stored_task = tasks_list.append(new_task)
+            if stored_task is not None:
+                new_task = stored_task
+            _notify_task_listeners('add', new_task, tasks_list=tasks_list, index=len(tasks_list) - 1)
+            results.append(new_task)
+    return results
+
+def update_tasks_bulk(tasks_list, updates):
+    """
+    Applies (task_id, fields) pairs (or a {task_id: fields} mapping), fields holding any of
+    'description', 'due_date', 'priority'; fields left out keep their value. Values follow
+    update_task_data: an invalid date or priority is ignored, None or "" clears it. Returns a list
+    of bools: False for an unknown id or an empty or non-string description (that task is left unchanged).
+    """
+    updates = list(updates.items() if isinstance(updates, Mapping) else updates)
+    date_ok = validate_dates_core([fields.get('due_date') or "" for _task_id, fields in updates])
+    lookup = _task_lookup(tasks_list)
+    results = []
+    for (task_id, fields), valid_date in zip(updates, date_ok):
+        task = lookup(task_id)
+        changes = {}
+        if 'description' in fields:
+            description = fields['description'].strip() if isinstance(fields['description'], str) else ""
+            if not description:
+                task = None
+            changes['description'] = description
+        if 'due_date' in fields and valid_date:
+            changes['due_date'] = fields['due_date'] or None
+        if 'priority' in fields:
+            priority = _normalized_priority(fields['priority'])
+            if priority is not False:
+                changes['priority'] = priority
+        if task is None:
+            results.append(False)
+            continue
+        previous = {field: task.get(field) for field in ('description', 'due_date', 'priority')}
+        for field, value in changes.items():
+            task[field] = value
+        _notify_task_listeners('update', task, previous=previous)
+        results.append(True)
+    return results
+
+def delete_tasks_bulk(tasks_list, task_ids=None, indexes=None):
+    """
+    Deletes the tasks with the given ids, or at the given positions (as they are before
+    the call), with a single compaction of the list instead of one pop per task.
+    Returns a list of bools, one per requested id/index: True if it was deleted.
+    """
+    if indexes is not None:
+        count = len(tasks_list)
+        positions = list(indexes)
+        task_ids = [tasks_list[index]['id'] if 0 <= index < count else None for index in positions]
+    task_ids = list(task_ids or ())
+    if isinstance(tasks_list, (TaskList, TaskStore)):
+        removed = tasks_list.remove_many(task_ids)
+    else: # A plain list: one pass keeping the rest
+        wanted = set(task_ids)
+        removed, kept = [], []
+        for position, task in enumerate(tasks_list):
+            if task.get('id') in wanted:
+                removed.append((position, task))
+            else:
+                kept.append(task)
+        tasks_list[:] = kept
+    for number, (position, task) in enumerate(removed):
+        # The position it would have had if the tasks were deleted one by one, in list order
+        _notify_task_listeners('delete', task, tasks_list=tasks_list, index=position - number)
+    removed_ids = {task['id'] for _position, task in removed}
+    return [task_id is not None and task_id in removed_ids for task_id in task_ids]
+
+def toggle_many(tasks_list, task_ids, completed=None):
+    """
+    Flips the completion status of each task (completed=None), or sets it to completed.
+    Returns a list of bools: True where the task changed, False for unknown ids and for
+    tasks that already had the requested status.
+    """
+    lookup = _task_lookup(tasks_list)
+    results = []
+    for task_id in task_ids:
+        task = lookup(task_id)
+        if task is None or (completed is not None and bool(task.get('completed')) == bool(completed)):
+            results.append(False)
+            continue
+        task['completed'] = not task.get('completed', False)
+        _notify_task_listeners('toggle', task)
+        results.append(True)
+    return results
+
+def complete_all_tasks_data(tasks_list):
+    """Marks every pending task as completed (toggle_many). Returns the number of tasks changed."""
+    pending_ids = [task['id'] for task in tasks_list if not task.get('completed')]
+    return sum(toggle_many(tasks_list, pending_ids, completed=True))
+
+def purge_completed_tasks_data(tasks_list):
+    """Deletes every completed task (delete_tasks_bulk). Returns the number of tasks deleted."""
+    completed_ids = [task['id'] for task in tasks_list if task.get('completed')]
+    return sum(delete_tasks_bulk(tasks_list, completed_ids))
+
+# --- 归档 ---
+# 已完成的旧任务可以移到数据文件旁的冷存储 <数据文件>.archive.gz：gzip 压缩、只追加，每次
+# 归档追加一个 gzip 成员（内容是每行一个 JSON 记录）。热列表——每次加载、保存、排序和刷新
+# 的那份——于是只剩未完成和最近完成的任务；冷文件只在查看或搜索归档时才读取。
+# 任务没有“完成时间”字段，所以“旧”按截止日期算：已完成且截止日期早于 N 天前。没有截止
+# 日期的已完成任务只会因热列表超过上限而归档，按列表顺序（即添加顺序）从前往后。
+# 恢复一个归档任务就是把它按原 id 加回热列表；归档里 id 仍在热列表中的任务不显示，所以
+# 撤销归档、撤销恢复都不会丢任务，归档文件本身从不改写。
+ARCHIVE_SUFFIX = ".archive.gz"
+ARCHIVE_DAYS_ENV = "TODO_ARCHIVE_AFTER_DAYS"      # 环境变量：自动归档截止日期早于这么多天前的已完成任务
+ARCHIVE_MAX_TASKS_ENV = "TODO_ARCHIVE_MAX_TASKS"  # 环境变量：热列表超过这么多个任务时归档最早的已完成任务
+ARCHIVE_DEFAULT_DAYS = 30 # 没有设置策略时，手动归档（菜单/按钮）使用的天数
+_GZIP_MAGIC = b"\x1f\x8b\x08"
+_archive_after_days = None # None 表示不按日期自动归档
+_archive_max_tasks = None  # None 表示热列表不设上限
+
+def _non_negative_int(value):
+    if value is None or value == "":
+        return None
+    number = int(value)
+    if number < 0:
+        raise ValueError(f"must not be negative: {value!r}")
+    return number
+
+def set_archive_policy(after_days=None, max_tasks=None):
+    """
+    Sets the automatic archiving policy that auto_archive_tasks() applies after a UI's initial load: completed
+    tasks due more than after_days days ago, then (if the list is still longer than
+    max_tasks) the earliest added completed tasks. None turns a rule off; both None
+    (the default) turns automatic archiving off. Returns the old (after_days, max_tasks).
+    """
+    global _archive_after_days, _archive_max_tasks
+    after_days, max_tasks = _non_negative_int(after_days), _non_negative_int(max_tasks)
+    previous = (_archive_after_days, _archive_max_tasks)
+    _archive_after_days, _archive_max_tasks = after_days, max_tasks
+    return previous
+
+def archive_policy():
+    """The automatic archiving policy as (after_days, max_tasks); (None, None) when it is off."""
+    return _archive_after_days, _archive_max_tasks
+
+def archive_file(backend=None):
+    """Path of the archive of backend (default: the active one), or None if it has no data file."""
+    backend = backend or _storage_backend
+    data_file = getattr(backend, 'data_file', None)
+    return data_file() + ARCHIVE_SUFFIX if data_file is not None else None
+
+def select_tasks_to_archive(tasks, after_days=None, max_tasks=None, today=None):
+    """
+    Ids of the completed tasks the policy moves out of tasks, in list order: those due
+    before today minus after_days, then the earliest remaining completed ones while
+    more than max_tasks tasks would be left. Pending tasks are never selected, so the
+    list can stay longer than max_tasks.
+    """
+    cutoff = None
+    if after_days is not None:
+        today = datetime.date.fromisoformat(today) if today else datetime.date.today()
+        cutoff = (today - datetime.timedelta(days=after_days)).isoformat() # ISO dates compare as strings
+    completed = [] # (id, old enough by date) of each completed task, in list order
+    for task in tasks:
+        if task.get('completed'):
+            due_date = task.get('due_date')
+            completed.append((task['id'], cutoff is not None and bool(due_date) and due_date < cutoff))
+    old_count = sum(is_old for _task_id, is_old in completed)
+    extra = max(0, len(tasks) - old_count - max_tasks) if max_tasks is not None else 0
+    selected = []
+    for task_id, is_old in completed:
+        if is_old:
+            selected.append(task_id)
+        elif extra:
+            selected.append(task_id)
+            extra -= 1
+    return selected
+
+def _append_archive(path, tasks, today=None):
+    """Appends tasks to the archive as one gzip member, fsynced before returning."""
+    import gzip # Only needed when archiving
+    archived_on = today or datetime.date.today().isoformat()
+    lines = "".join(json.dumps({'archived_on': archived_on, 'task': task_to_dict(task)}, ensure_ascii=False) + "\n"
+                    for task in tasks)
+    data = gzip.compress(lines.encode('utf-8'), compresslevel=6)
+    with open(path, 'ab') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+def archive_tasks_data(tasks_list, after_days=None, max_tasks=None, today=None):
+    """
+    Moves the completed tasks selected by select_tasks_to_archive() to the archive file,
+    then deletes them from tasks_list (delete_tasks_bulk, so listeners see ordinary
+    deletes). The archive is written and fsynced first: a crash in between leaves a task
+    in both places, never in neither. Returns the number of tasks archived; raises
+    OSError if the archive could not be written (tasks_list is then unchanged).
+    """
+    path = archive_file()
+    if path is None:
+        return 0
+    task_ids = select_tasks_to_archive(tasks_list, after_days, max_tasks, today)
+    if not task_ids:
+        return 0
+    lookup = _task_lookup(tasks_list)
+    _append_archive(path, [lookup(task_id) for task_id in task_ids], today)
+    return sum(delete_tasks_bulk(tasks_list, task_ids))
+
+def auto_archive_tasks(tasks):
+    """
+    Applies the automatic archiving policy (set_archive_policy) to tasks. Call it once,
+    after the initial load and after attaching listeners such as TaskHistory, so the
+    archiving is an ordinary edit; then save like after any edit. Reloads that merge
+    external changes (sync_tasks_data) never archive. Returns the number of tasks archived.
+    """
+    if _archive_after_days is None and _archive_max_tasks is None:
+        return 0
+    try:
+        return archive_tasks_data(tasks, _archive_after_days, _archive_max_tasks)
+    except OSError:
+        return 0 # The archive could not be written: everything stays in the hot list
+
+def _archive_records(data):
+    """
+    Yields the records of an archive file's bytes, member by member. A member that does
+    not decompress (a torn append) is skipped up to the next gzip header.
+    """
+    view = memoryview(data)
+    offset = 0
+    while offset < len(data):
+        decompressor = zlib.decompressobj(wbits=31) # gzip framing
+        try:
+            text = decompressor.decompress(view[offset:])
+        except zlib.error:
+            text = None
+        if text is None or not decompressor.eof:
+            offset = data.find(_GZIP_MAGIC, offset + 1)
+            if offset < 0:
+                return
+            continue
+        offset = len(data) - len(decompressor.unused_data)
+        for line in text.decode('utf-8', errors='replace').splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict):
+                yield record
+
+def load_archived_tasks(tasks_list=None, path=None):
+    """
+    Reads the archive (default: archive_file()) into a TaskList, the latest copy of each
+    task in the order they were first archived. Tasks whose id is in tasks_list (the hot
+    list, e.g. restored or un-archived by an undo) are left out.
+    """
+    path = path or archive_file()
+    if path is None:
+        return TaskList()
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return TaskList()
+    in_hot_list = _task_lookup(tasks_list) if tasks_list is not None else (lambda task_id: None)
+    archived = {}
+    for record in _archive_records(data):
+        task = _sanitize_task_item(record.get('task'))
+        if task is not None and task['id'] is not None and in_hot_list(task['id']) is None:
+            archived[task['id']] = task
+    return TaskList(archived.values())
+
+def restore_archived_tasks(tasks_list, archived_tasks, task_ids):
+    """
+    Adds the archived tasks with the given ids (from load_archived_tasks) back to the end of
+    tasks_list, keeping their ids, and drops them from archived_tasks. Returns a list of
+    bools, one per id: False for ids that are not in archived_tasks.
+    """
+    results = []
+    for task_id in task_ids:
+        task = archived_tasks.remove_by_id(task_id)
+        if task is None:
+            results.append(False)
+            continue
+        stored_task = tasks_list.append(Task(**task_to_dict(task)))
+        _notify_task_listeners('add', stored_task if stored_task is not None else task,
+                               tasks_list=tasks_list, index=len(tasks_list) - 1)
+        results.append(True)
+    return results
+
+try:
+    set_archive_policy(os.environ.get(ARCHIVE_DAYS_ENV), os.environ.get(ARCHIVE_MAX_TASKS_ENV))
+except ValueError:
+    pass # Not a number: no automatic archiving
+
+# --- 撤销/重做与历史 ---
+# TaskHistory 挂在任务监听上，把每次修改记成一条很小的增量元组，而不是整表快照：
+#   ('add' | 'delete', 时间, id, 位置, (描述, 完成, 截止日期, 优先级))
+#   ('update', 时间, id, 修改前的字段, 修改后的字段)   只含变化了的字段
+#   ('toggle', 时间, id, 切换后的完成状态)
+# 所有修改（包括撤销/重做本身和从其他进程合并来的修改）按时间顺序记入日志，用来回答
+# “某一时刻的任务是什么样”；撤销/重做栈只引用本进程做出的修改。日志和检查点共用一个
+# 按估算字节数计的上限，超出时丢弃最旧的记录，能回溯到的最早时刻随之后移。
+# 每 max(checkpoint_interval, 任务数) 条记录保存一个检查点（列式 TaskStore 副本，约 21
+# 字节/任务，描述字符串与当前列表共享；超过上限的 1/4 时不保存），这样建检查点的 O(N)
+# 摊到每次修改上是 O(1)。回溯时从目标时刻之后最近的检查点往回倒放，最多倒放一个间隔的
+# 增量。回溯总要复制整个列表，所以检查点只在日志比列表长得多时才明显有用
+# （见 benchmarks/bench_history.py）。
+HISTORY_MAX_BYTES = 8 << 20
+HISTORY_CHECKPOINT_INTERVAL = 2000
+HISTORY_MAX_CHECKPOINTS = 4
+
+def _history_bytes(value):
+    """Rough deep size of a history delta; strings shared with live tasks are counted too."""
+    if value is None or value is True or value is False or (type(value) is str and value in _SHARED_HISTORY_STRINGS):
+        return 0 # Singletons and interned constants cost nothing extra
+    size = sys.getsizeof(value)
+    if isinstance(value, tuple):
+        size += sum(map(_history_bytes, value))
+    elif isinstance(value, dict):
+        size += sum(map(_history_bytes, value.values()))
+    return size
+
+_SHARED_HISTORY_STRINGS = frozenset(('add', 'delete', 'update', 'toggle')) | _PRIORITY_NAMES_CORE
+
+def _store_bytes(store):
+    """Bytes held by a checkpoint TaskStore besides the description strings it shares."""
+    return (sys.getsizeof(store._descriptions) + store._ids.itemsize * len(store._ids) + len(store._completed)
+            + store._due.itemsize * len(store._due) + len(store._priority))
+
+def _snapshot_store(tasks):
+    """A TaskStore copy of tasks (a checkpoint), built a column at a time rather than row by row."""
+    if isinstance(tasks, TaskStore) and not tasks._tombstones:
+        return TaskStore.from_columns(array('q', tasks._ids), list(tasks._descriptions), bytearray(tasks._completed),
+                                      array('i', tasks._due), array('B', tasks._priority))
+    rows = list(tasks)
+    completed = bytearray((len(rows) + 7) // 8)
+    for slot, task in enumerate(rows):
+        if task['completed']:
+            completed[slot >> 3] |= 1 << (slot & 7)
+    no_priority = PRIORITY_ORDER_MAP_CORE[None]
+    return TaskStore.from_columns(
+        array('q', [task['id'] for task in rows]), [task['description'] for task in rows], completed,
+        parse_dates_core([task['due_date'] for task in rows]),
+        array('B', [PRIORITY_ORDER_MAP_CORE.get(task['priority'], no_priority) for task in rows]))
+
+def _task_row(task):
+    return (task['description'], bool(task.get('completed')), task.get('due_date'), task.get('priority'))
+
+def _task_from_row(task_id, row):
+    description, completed, due_date, priority = row
+    return Task(description, completed=completed, due_date=due_date, priority=priority, id=task_id)
+
+def _restore_task_fields(task, fields):
+    """Sets fields on a stored task and notifies listeners as an update (used by undo/redo)."""
+    previous = {field: task.get(field) for field in fields}
+    for field, value in fields.items():
+        task[field] = value
+    _notify_task_listeners('update', task, previous=previous)
+
+def _revert_delta(order, by_id, delta):
+    """
+    Undoes one delta on a detached copy (tasks_as_of): order is a plain list of Tasks and
+    by_id maps ids to them. Going backwards, the recorded positions are exact, so adds and
+    deletes are a single list.pop/insert.
+    """
+    event, _time, task_id = delta[:3]
+    if event == 'add':
+        task = by_id.pop(task_id, None)
+        index = delta[3]
+        if task is None:
+            return
+        if index is not None and index < len(order) and order[index] is task:
+            del order[index]
+        else:
+            order.remove(task)
+    elif event == 'delete':
+        if task_id not in by_id:
+            task = by_id[task_id] = _task_from_row(task_id, delta[4])
+            index = delta[3]
+            order.insert(len(order) if index is None else index, task)
+    else:
+        task = by_id.get(task_id)
+        if task is None:
+            return
+        if event == 'update':
+            task.update(delta[3])
+        else:
+            task['completed'] = not delta[3]
+
+class TaskHistory:
+    """
+    Undo/redo and time travel for one TaskList/TaskStore, in bounded memory.
+
+    Changes go through the usual core functions either way, so undo() and redo() are
+    saved, journaled and shown like any other edit. Call detach() when the list is
+    replaced (e.g. reloaded). The history lives in memory only, for this session.
+    """
+
+    def __init__(self, tasks, max_bytes=HISTORY_MAX_BYTES, checkpoint_interval=HISTORY_CHECKPOINT_INTERVAL,
+                 max_checkpoints=HISTORY_MAX_CHECKPOINTS):
+        self.tasks = tasks
+        self.max_bytes = max_bytes
+        self.checkpoint_interval = checkpoint_interval
+        self.max_checkpoints = max_checkpoints
+        self._log = collections.deque() # Deltas, oldest first
+        self._first_seq = 0             # Sequence number of _log[0]
+        self._log_bytes = 0
+        self._checkpoints = collections.deque() # (seq, time, TaskStore): the state before delta seq
+        self._checkpoint_bytes = 0
+        self._since_checkpoint = 0
+        self._horizon = time.time()     # Earliest moment tasks_as_of can reconstruct
+        self._undo = collections.deque() # Steps (tuples of deltas) made in this process, newest last
+        self._redo = []
+        self._group = None              # Deltas of the grouped() block in progress
+        self._replaying = False         # True while undo()/redo() apply a step
+        add_task_listener(self._on_task_event)
+
+    def detach(self):
+        remove_task_listener(self._on_task_event)
+
+    def can_undo(self):
+        return bool(self._undo)
+
+    def can_redo(self):
+        return bool(self._redo)
+
+    def undo_step_size(self):
+        """Number of changes the next undo() reverts (0 if there is nothing to undo)."""
+        return len(self._undo[-1]) if self._undo else 0
+
+    def redo_step_size(self):
+        return len(self._redo[-1]) if self._redo else 0
+
+    def earliest_time(self):
+        """The earliest time.time() value tasks_as_of accepts."""
+        return self._horizon
+
+    def memory_usage(self):
+        """Estimated bytes held by the log and the checkpoints."""
+        return self._log_bytes + self._checkpoint_bytes
+
+    @contextmanager
+    def grouped(self):
+        """Makes all the changes inside the with block a single undo step (e.g. a bulk edit)."""
+        if self._group is not None: # Nested: the outer block owns the step
+            yield self
+            return
+        self._group = []
+        first_seq = self._first_seq + len(self._log)
+        try:
+            yield self
+        finally:
+            step, self._group = tuple(self._group), None
+            if step and self._first_seq > first_seq: # Bigger than the budget: already partly evicted
+                self._redo.clear()
+            elif step:
+                self._push_undo(step)
+
+    def undo(self):
+        """Reverts the newest undoable step. Returns the number of changes reverted (0: nothing to undo)."""
+        if not self._undo:
+            return 0
+        step = self._undo.pop()
+        applied = self._replay(reversed(step), forward=False)
+        self._redo.append(step)
+        return applied
+
+    def redo(self):
+        """Re-applies the newest undone step. Returns the number of changes re-applied (0: nothing to redo)."""
+        if not self._redo:
+            return 0
+        step = self._redo.pop()
+        applied = self._replay(step, forward=True)
+        self._undo.append(step)
+        return applied
+
+    def recent_changes(self, count=20):
+        """The newest count changes, newest first, as dicts (time, event, id, description)."""
+        changes = []
+        for delta in itertools.islice(reversed(self._log), count):
+            event, changed_at, task_id = delta[:3]
+            if event in ('add', 'delete'):
+                description = delta[4][0]
+            else:
+                task = self.tasks.get_by_id(task_id)
+                description = task['description'] if task is not None else None
+            changes.append({'time': changed_at, 'event': event, 'id': task_id, 'description': description})
+        return changes
+
+    def tasks_as_of(self, timestamp):
+        """
+        A TaskList copy of the tasks as they were at timestamp (a time.time() value).
+        Raises ValueError if the history no longer reaches back that far (earliest_time()).
+        """
+        if timestamp < self._horizon:
+            raise ValueError(f"history only reaches back to {datetime.datetime.fromtimestamp(self._horizon)}")
+        later = len(self._log) # Log position of the first change made after timestamp
+        for delta in reversed(self._log):
+            if delta[1] <= timestamp:
+                break
+            later -= 1
+        start_seq = self._first_seq + later
+        source, end_seq = self.tasks, self._first_seq + len(self._log)
+        for seq, _checkpoint_time, store in self._checkpoints:
+            if seq >= start_seq:
+                source, end_seq = store, seq
+                break
+        if isinstance(source, TaskStore):
+            order = source.detached_tasks()
+        else:
+            order = [Task(**task_to_dict(task)) for task in source]
+        by_id = {task.id: task for task in order}
+        for delta in reversed(list(itertools.islice(self._log, later, end_seq - self._first_seq))):
+            _revert_delta(order, by_id, delta)
+        return TaskList(order)
+
+    def _replay(self, deltas, forward):
+        self._replaying = True
+        try:
+            return sum(self._apply(delta, forward) for delta in deltas)
+        finally:
+            self._replaying = False
+
+    def _apply(self, delta, forward):
+        """Applies delta (or its inverse) to the live list through the core functions."""
+        event, _time, task_id = delta[:3]
+        tasks = self.tasks
+        task = tasks.get_by_id(task_id)
+        if event in ('add', 'delete'):
+            present = (event == 'add') == forward
+            if present and task is None:
+                insert_task_data(tasks, delta[3], _task_from_row(task_id, delta[4]))
+            elif not present and task is not None:
+                delete_task_by_id(tasks, task_id)
+            else:
+                return False
+            return True
+        if task is None: # Deleted since, e.g. by another process
+            return False
+        if event == 'update':
+            _restore_task_fields(task, delta[4] if forward else delta[3])
+        else:
+            completed = delta[3] if forward else not delta[3]
+            if bool(task['completed']) == completed:
+                return False
+            toggle_task_completion_data(task)
+        return True
+
+    def _on_task_event(self, event, task, tasks_list=None, external=False, index=None, previous=None,
+                       **details):
+        if event in ('add', 'delete'):
+            if tasks_list is not self.tasks:
+                return
+            delta = (event, time.time(), task['id'], index, _task_row(task))
+        elif not owns_task(self.tasks, task):
+            return
+        elif event == 'update':
+            if previous is None:
+                return
+            before = {field: value for field, value in previous.items() if task.get(field) != value}
+            if not before:
+                return
+            delta = (event, time.time(), task['id'], before, {field: task.get(field) for field in before})
+        elif event == 'toggle':
+            delta = (event, time.time(), task['id'], bool(task['completed']))
+        else:
+            return
+        self._log.append(delta)
+        self._log_bytes += _history_bytes(delta)
+        if not (external or self._replaying):
+            if self._group is not None:
+                self._group.append(delta)
+            else:
+                self._push_undo((delta,))
+        self._since_checkpoint += 1
+        if self._since_checkpoint >= max(self.checkpoint_interval, len(self.tasks)):
+            self._add_checkpoint()
+        self._enforce_budget()
+
+    def _push_undo(self, step):
+        self._undo.append(step)
+        self._redo.clear() # A new change forks the timeline: the undone steps cannot come back
+
+    def _add_checkpoint(self):
+        self._since_checkpoint = 0
+        if len(self.tasks) * 21 > self.max_bytes // 4: # ~21 B/task; too big for the budget: replay the log only
+            return
+        store = _snapshot_store(self.tasks)
+        size = _store_bytes(store)
+        self._checkpoints.append((self._first_seq + len(self._log), time.time(), store))
+        self._checkpoint_bytes += size
+        while len(self._checkpoints) > self.max_checkpoints:
+            self._drop_oldest_checkpoint()
+
+    def _drop_oldest_checkpoint(self):
+        _seq, _time, store = self._checkpoints.popleft()
+        self._checkpoint_bytes -= _store_bytes(store)
+
+    def _enforce_budget(self):
+        while self._log and self.memory_usage() > self.max_bytes:
+            delta = self._log.popleft()
+            self._first_seq += 1
+            self._log_bytes -= _history_bytes(delta)
+            self._horizon = max(self._horizon, delta[1])
+            if self._undo and self._undo[0][0] is delta:
+                self._undo.popleft()
+            if self._redo and self._redo[-1][0] is delta:
+                self._redo.clear() # The oldest undone step goes first; the later ones depend on it
+            while self._checkpoints and self._checkpoints[0][0] < self._first_seq:
+                self._drop_oldest_checkpoint()
+
+# --- 组合查询 ---
+# query(tasks).where(completed=False, priority="high").due_before("2026-12-31").order_by("due_date").limit(50)
+# 查询是惰性的：过滤用生成器，带 limit 的排序用 heapq.nsmallest (O(N log k))，不会整表排序；
+# 分页使用游标（上一页最后一条的排序键 + 原始位置），每一页都是一次独立的 top-k。
+def _description_sort_key(task):
+    return task.get('description', '').lower()
+
+def _due_date_sort_key(task):
+    due_date = task.get('due_date')
+    return (due_date is None, due_date or "") # Undated tasks after dated ones
+
+def _priority_sort_key(task):
+    return PRIORITY_ORDER_MAP_CORE.get(task.get('priority'), 99)
+
+SORT_KEYS_CORE = {
+    "description": _description_sort_key,
+    "due_date": _due_date_sort_key,
+    "priority": _priority_sort_key,
+}
+
+class _Descending:
+    """Inverts the ordering of a sort key, so descending keys can share one ascending heap."""
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+def _as_tuples(value):
+    # Cursors that went through JSON come back with lists where the keys had tuples.
+    return tuple(_as_tuples(item) for item in value) if isinstance(value, list) else value
+
+class TaskQuery:
+    """
+    A lazily evaluated query over a task container. Builder methods return a new query;
+    nothing is read until the query is iterated (or page()/count()/first() is called).
+
+    Results are in list order unless order_by() is used. Ties in the sort key keep list
+    order, also when reversed, like sorted(..., reverse=True) does.
+    """
+
+    def __init__(self, tasks, filters=(), order=None, reverse=False, limit_count=None, cursor=None):
+        self.tasks = tasks
+        self._filters = tuple(filters)
+        self._order = order
+        self._reverse = reverse
+        self._limit = limit_count
+        self._cursor = cursor
+
+    def _derive(self, **changes):
+        state = dict(filters=self._filters, order=self._order, reverse=self._reverse,
+                     limit_count=self._limit, cursor=self._cursor)
+        state.update(changes)
+        return TaskQuery(self.tasks, **state)
+
+    # 构造
+    def where(self, **conditions):
+        """Keeps tasks whose fields equal the given values (priority is case-insensitive)."""
+        filters = list(self._filters)
+        for field, value in conditions.items():
+            if field not in _TASK_FIELD_SET:
+                raise ValueError(f"Unknown task field: {field}")
+            if field == 'priority' and value:
+                value = str(value).lower()
+            filters.append(lambda task, field=field, value=value: task.get(field) == value)
+        return self._derive(filters=filters)
+
+    def filter(self, predicate):
+        """Keeps tasks for which predicate(task) is true."""
+        return self._derive(filters=self._filters + (predicate,))
+
+    def due_before(self, date_string):
+        """Keeps dated tasks due strictly before date_string (YYYY-MM-DD)."""
+        return self.filter(lambda task: bool(task.get('due_date')) and task.get('due_date') < date_string)
+
+    def due_after(self, date_string):
+        """Keeps dated tasks due strictly after date_string (YYYY-MM-DD)."""
+        return self.filter(lambda task: bool(task.get('due_date')) and task.get('due_date') > date_string)
+
+    def order_by(self, key, reverse=False):
+        """Orders by one of SORT_KEYS_CORE ("description", "due_date", "priority")."""
+        if key not in SORT_KEYS_CORE:
+            raise ValueError(f"Unknown sort key: {key}")
+        return self._derive(order=key, reverse=reverse)
+
+    def limit(self, count):
+        """At most count results (count >= 0; a negative count raises ValueError)."""
+        if count < 0:
+            raise ValueError(f"limit must not be negative: {count}")
+        return self._derive(limit_count=count)
+
+    def after(self, cursor):
+        """Continues after the position described by a cursor returned from page()."""
+        return self._derive(cursor=_as_tuples(cursor) if cursor is not None else None)
+
+    # 执行
+    def _sort_key(self):
+        """Returns key(position, task) -> comparable, or None for list order."""
+        if self._order is None:
+            return None
+        base = SORT_KEYS_CORE[self._order]
+        if self._reverse:
+            return lambda position, task: (_Descending(base(task)), position)
+        return lambda position, task: (base(task), position)
+
+    def _cursor_key(self):
+        key_value, position = self._cursor
+        if self._order is None:
+            return position
+        return (_Descending(key_value) if self._reverse else key_value, position)
+
+    def _matches(self):
+        """Yields (position, task) for tasks passing every filter; position is the list index."""
+        filters = self._filters
+        for position, task in enumerate(self.tasks):
+            if all(keep(task) for keep in filters):
+                yield position, task
+
+    def _rows(self):
+        """Yields (position, task) in result order, honouring cursor and limit."""
+        rows = self._matches()
+        sort_key = self._sort_key()
+        if sort_key is None:
+            if self._cursor is not None:
+                start = self._cursor_key()
+                rows = ((position, task) for position, task in rows if position > start)
+            return itertools.islice(rows, self._limit) if self._limit is not None else rows
+
+        key = lambda row: sort_key(*row)
+        if self._cursor is not None:
+            start = self._cursor_key()
+            rows = (row for row in rows if start < key(row))
+        if self._limit is not None:
+            return iter(heapq.nsmallest(self._limit, rows, key=key)) # Top-k, no full sort
+        return iter(sorted(rows, key=key))
+
+    def __iter__(self):
+        return (task for _position, task in self._rows())
+
+    def iter_with_positions(self):
+        """Like iterating the query, but yields (list position, task) pairs."""
+        return self._rows()
+
+    def to_list(self):
+        return list(self)
+
+    def first(self):
+        return next(iter(self.limit(1)), None)
+
+    def count(self):
+        return sum(1 for _row in self._rows())
+
+    def cursor_for(self, position, task):
+        """The cursor that continues right after (position, task) in this query's order."""
+        key_value = SORT_KEYS_CORE[self._order](task) if self._order else None
+        return (key_value, position)
+
+    def page(self, size):
+        """
+        Returns (rows, next_cursor) for the next size results, rows being (position, task)
+        pairs. next_cursor is None when there are no more results; otherwise pass it to
+        after() (it is JSON-serializable) to fetch the following page.
+        """
+        rows = list(self.limit(size + 1)._rows())
+        if len(rows) <= size:
+            return rows, None
+        rows = rows[:size]
+        return rows, self.cursor_for(*rows[-1])
+
+def query(tasks):
+    """Starts a TaskQuery over a task container (or any iterable of tasks)."""
+    return TaskQuery(tasks)
\ No newline at end of file
@@ -0,0 +1,282 @@
+# instrumentation.py
+# Opt-in timing of core_logic operations and of the CLI/GUI entry points, for
+# finding out where a slow session spends its time.
+#
+# Nothing is wrapped until enable() runs, so a session without profiling calls the
+# original functions directly and pays nothing. Enable it with the environment
+# variable TODO_PROFILE (see PROFILE_MODES) or with --profile on the CLI/GUI command line.
+
+import atexit
+import bisect
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+import core_logic
+
+PROFILE_ENV = "TODO_PROFILE"           # 例如 TODO_PROFILE=1 或 TODO_PROFILE=cprofile,tracemalloc
+PROFILE_DIR_ENV = "TODO_PROFILE_DIR"   # 退出时写出统计/剖析文件的目录，默认当前目录
+PROFILE_MODES = ("counters", "cprofile", "tracemalloc") # "1"/"on" = counters, "all" = 全部
+PROFILE_FLAG = "--profile"             # 命令行参数：counters + cprofile
+
+# 延迟直方图的桶上界（毫秒），最后一个桶收集更慢的调用
+LATENCY_BUCKETS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, 5000)
+
+# 被计时的 core_logic 函数；load/save 还统计处理的任务数（任务/秒）
+CORE_OPERATIONS = (
+    'load_tasks_data', 'save_tasks_data', 'flush_tasks_data', 'sync_tasks_data', 'merge_loaded_tasks',
+    'add_task_data', 'update_task_data', 'delete_task_data', 'delete_task_by_id',
+    'toggle_task_completion_data',
+)
+
+def _loaded_count(args, result):
+    return len(result) if result is not None else 0
+
+def _saved_count(args, result):
+    return len(args[0]) if args and hasattr(args[0], '__len__') else 0
+
+def _method_saved_count(args, result):
+    return _saved_count(args[1:], result)
+
+ITEM_COUNTERS = {
+    'load_tasks_data': _loaded_count,
+    'save_tasks_data': _saved_count,
+}
+
+class OperationStats:
+    """Call count, total/min/max time, items processed and a latency histogram of one operation."""
+
+    __slots__ = ('count', 'total', 'minimum', 'maximum', 'items', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = 0.0
+        self.items = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def record(self, seconds, items=0):
+        self.count += 1
+        self.total += seconds
+        self.minimum = seconds if self.minimum is None else min(self.minimum, seconds)
+        self.maximum = max(self.maximum, seconds)
+        self.items += items
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS_MS, seconds * 1000)] += 1
+
+    def to_dict(self):
+        result = {
+            'count': self.count,
+            'total_ms': round(self.total * 1000, 3),
+            'mean_ms': round(self.total * 1000 / self.count, 3) if self.count else 0,
+            'min_ms': round((self.minimum or 0) * 1000, 3),
+            'max_ms': round(self.maximum * 1000, 3),
+            'histogram': {label: count for label, count in zip(bucket_labels(), self.buckets) if count},
+        }
+        if self.items:
+            result['items'] = self.items
+            result['items_per_second'] = round(self.items / self.total) if self.total else None
+        return result
+
+def bucket_labels():
+    return [f"<={bound:g}ms" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]:g}ms"]
+
+_stats = {}          # operation name -> OperationStats
+_stats_lock = threading.Lock() # The GUI loads and saves on worker threads
+_modes = set()       # Enabled PROFILE_MODES; empty while instrumentation is off
+_wrapped = set()     # (owner id, attribute name) already wrapped
+_profiler = None
+_started_at = None
+
+def is_enabled():
+    return bool(_modes)
+
+def record(name, seconds, items=0):
+    """Adds one timed call of name (for code that times itself, e.g. with timed())."""
+    with _stats_lock:
+        stats = _stats.get(name)
+        if stats is None:
+            stats = _stats[name] = OperationStats()
+        stats.record(seconds, items)
+
+class timed:
+    """Context manager timing a block as one call of name; does nothing while instrumentation is off."""
+
+    def __init__(self, name, items=0):
+        self.name = name
+        self.items = items
+
+    def __enter__(self):
+        self._started = time.perf_counter() if _modes else None
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._started is not None:
+            record(self.name, time.perf_counter() - self._started, self.items)
+        return False
+
+def _positional_limit(function):
+    """How many positional arguments function accepts, or None if it takes *args."""
+    import inspect # Only needed once profiling is on; it is slow to import
+    parameters = inspect.signature(function).parameters.values()
+    if any(parameter.kind == parameter.VAR_POSITIONAL for parameter in parameters):
+        return None
+    return sum(parameter.kind in (parameter.POSITIONAL_ONLY, parameter.POSITIONAL_OR_KEYWORD)
+               for parameter in parameters)
+
+def _timing_wrapper(name, function, count_items=None, drop_extra_args=False):
+    limit = _positional_limit(function) if drop_extra_args else None
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if limit is not None:
+            args = args[:limit]
+        started = time.perf_counter()
+        result = None
+        try:
+            result = function(*args, **kwargs)
+            return result
+        finally:
+            elapsed = time.perf_counter() - started
+            record(name, elapsed, count_items(args, result) if count_items else 0)
+    return wrapper
+
+def instrument(owner, names, prefix=None, item_counters=None, drop_extra_args=False):
+    """
+    Replaces owner.<name> (a module or class attribute) with a timing wrapper for each
+    name. Only has an effect once enable() has run; wrapping twice is a no-op.
+
+    drop_extra_args: for Qt slots. PyQt drops signal arguments a Python slot does not
+    accept, but it cannot see through the wrapper's *args, so the wrapper drops them.
+    """
+    if not _modes:
+        return
+    prefix = prefix if prefix is not None else getattr(owner, '__name__', type(owner).__name__)
+    for name in names:
+        key = (id(owner), name)
+        function = getattr(owner, name, None)
+        if key in _wrapped or function is None:
+            continue
+        _wrapped.add(key)
+        setattr(owner, name, _timing_wrapper(f"{prefix}.{name}", function, (item_counters or {}).get(name),
+                                             drop_extra_args))
+
+def parse_modes(value):
+    """Modes named by a TODO_PROFILE value: '' -> none, '1'/'on' -> counters, 'all' -> every mode."""
+    value = (value or "").strip().lower()
+    if value in ("", "0", "off", "no", "false"):
+        return set()
+    if value == "all":
+        return set(PROFILE_MODES)
+    modes = {mode.strip() for mode in value.split(",")} & set(PROFILE_MODES)
+    return modes | {"counters"}
+
+def enable(modes=("counters",)):
+    """
+    Turns instrumentation on: wraps the core_logic operations and the storage backends'
+    load/save, starts cProfile/tracemalloc if asked, and writes a report at exit.
+    """
+    global _profiler, _started_at
+    new_modes = set(modes) - _modes
+    if not new_modes:
+        return
+    first_time = not _modes
+    _modes.update(new_modes | {"counters"})
+    if first_time:
+        _started_at = time.perf_counter()
+        instrument(core_logic, CORE_OPERATIONS, prefix="core", item_counters=ITEM_COUNTERS)
+        for backend_name, backend_class in core_logic.STORAGE_BACKENDS.items():
+            instrument(backend_class, ("load", "save"), prefix=f"storage.{backend_name}",
+                       item_counters={'load': _loaded_count, 'save': _method_saved_count})
+        atexit.register(write_report)
+    if "cprofile" in new_modes:
+        import cProfile
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+    if "tracemalloc" in new_modes:
+        import tracemalloc
+        tracemalloc.start(10)
+
+def enable_from_environment(argv=None):
+    """
+    Enables instrumentation if TODO_PROFILE is set or argv contains --profile.
+    Returns argv without --profile.
+    """
+    argv = list(sys.argv[1:] if argv is None else argv)
+    modes = parse_modes(os.environ.get(PROFILE_ENV))
+    if PROFILE_FLAG in argv:
+        argv = [arg for arg in argv if arg != PROFILE_FLAG]
+        modes |= {"counters", "cprofile"}
+    if modes:
+        enable(modes)
+    return argv
+
+# --- 读取统计 ---
+def stats():
+    """{operation name: OperationStats.to_dict()}, slowest total first."""
+    with _stats_lock:
+        items = sorted(_stats.items(), key=lambda item: item[1].total, reverse=True)
+        return {name: operation.to_dict() for name, operation in items}
+
+def reset():
+    with _stats_lock:
+        _stats.clear()
+
+def format_stats():
+    """Lines of a table of stats() for the terminal."""
+    lines = [f"{'operation':<40}{'calls':>8}{'total ms':>11}{'mean ms':>10}{'max ms':>10}{'tasks/s':>11}"]
+    for name, operation in stats().items():
+        rate = operation.get('items_per_second')
+        lines.append(f"{name:<40}{operation['count']:>8}{operation['total_ms']:>11.1f}{operation['mean_ms']:>10.2f}"
+                     f"{operation['max_ms']:>10.1f}{rate if rate is not None else '':>11}")
+        lines.append("    " + "  ".join(f"{label}: {count}" for label, count in operation['histogram'].items()))
+    return lines
+
+def summary_line():
+    """One line for a status bar: calls, time spent and the slowest operation so far."""
+    with _stats_lock:
+        calls = sum(operation.count for operation in _stats.values())
+        total = sum(operation.total for operation in _stats.values())
+        slowest = max(_stats.items(), key=lambda item: item[1].maximum, default=None)
+    text = f"性能: {calls} 次调用, 共 {total * 1000:.0f} ms"
+    if slowest is not None:
+        text += f", 最慢 {slowest[0]} {slowest[1].maximum * 1000:.1f} ms"
+    return text
+
+# --- 退出时的报告 ---
+def write_report(directory=None):
+    """
+    Writes todo_profile_stats.json, plus todo_profile.prof (cProfile, open with pstats
+    or snakeviz) and todo_profile_memory.txt (tracemalloc top allocations) when those
+    modes are on. Returns the written paths.
+    """
+    if not _modes:
+        return []
+    directory = directory or os.environ.get(PROFILE_DIR_ENV) or os.getcwd()
+    paths = []
+    stats_path = os.path.join(directory, "todo_profile_stats.json")
+    with open(stats_path, 'w', encoding='utf-8') as f:
+        json.dump({'session_seconds': round(time.perf_counter() - _started_at, 3), 'operations': stats()},
+                  f, ensure_ascii=False, indent=4)
+    paths.append(stats_path)
+    if _profiler is not None:
+        _profiler.disable()
+        profile_path = os.path.join(directory, "todo_profile.prof")
+        _profiler.dump_stats(profile_path)
+        paths.append(profile_path)
+    if "tracemalloc" in _modes:
+        import tracemalloc
+        if tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            _current, peak = tracemalloc.get_traced_memory()
+            memory_path = os.path.join(directory, "todo_profile_memory.txt")
+            with open(memory_path, 'w', encoding='utf-8') as f:
+                f.write(f"peak traced memory: {peak / 2 ** 20:.1f} MiB\n\n")
+                for statistic in snapshot.statistics('lineno')[:30]:
+                    f.write(f"{statistic}\n")
+            paths.append(memory_path)
+    print(f"[profile] 统计已写入: {', '.join(paths)}", file=sys.stderr)
+    return paths
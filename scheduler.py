@@ -0,0 +1,273 @@
+# scheduler.py
+# Due dates of pending tasks: a heap keyed on (due_date, priority rank) kept up to date
+# through core_logic's task listeners, so "overdue", "due today" and "next N due" never
+# sort the whole list, and a reminder engine that says when it next needs waking up
+# (the UIs set a timer for that moment instead of rescanning the list).
+
+import datetime
+import heapq
+import itertools
+import weakref
+
+import core_logic
+
+SCHEDULER_COMPACT_MIN_STALE = 1024 # 堆里失效的条目至少这么多、且超过有效条目时重建堆
+DEFAULT_REMIND_AT = datetime.time(9, 0) # 到期当天几点提醒
+
+def _today():
+    return datetime.date.today().isoformat()
+
+class TaskScheduler:
+    """
+    Pending, dated tasks of one TaskList/TaskStore ordered by (due_date, priority rank
+    from PRIORITY_ORDER_MAP_CORE), kept up to date on add/update/toggle/delete.
+
+    Entries are (due_date, rank, seq, task_id) tuples; seq is unique, so ties go to the
+    task scheduled first. Tasks due before the current day are moved out of the heap
+    into an overdue dict as days pass (each task once), so "next N due" only walks
+    upcoming entries. An edited or deleted task leaves a stale heap entry behind (its
+    id maps to a newer entry, or to none); stale entries are skipped, and the heap is
+    rebuilt once they outnumber the live ones.
+
+    - overdue():            O(k log k) for k overdue tasks
+    - due_on(date):         O(k log k) for k tasks due that day (per-date buckets)
+    - next_due(count):      O(count log count), plus any stale entries passed over
+    - counts():             O(1)
+    """
+
+    def __init__(self, tasks_list, today=None):
+        self._tasks_ref = weakref.ref(tasks_list, self._on_tasks_collected)
+        self._seq = itertools.count()
+        self._live = {}     # task id -> its current entry
+        self._by_date = {}  # due_date -> {task id: entry}
+        self._overdue = {}  # task id -> entry, for due_date < self._boundary
+        self._boundary = today or _today()
+        self._stale = 0
+        upcoming = []
+        with core_logic.paused_gc():
+            for entry in self._initial_entries(tasks_list):
+                self._add_entry(entry)
+                if entry[0] >= self._boundary:
+                    upcoming.append(entry)
+        heapq.heapify(upcoming)
+        self._upcoming = upcoming
+        core_logic.add_task_listener(self._on_task_event)
+
+    def detach(self):
+        """Stops following mutations. The schedule is stale afterwards."""
+        core_logic.remove_task_listener(self._on_task_event)
+
+    # 增量维护
+    def _entry(self, task):
+        due_date = task.get('due_date')
+        if not due_date or task.get('completed'):
+            return None
+        rank = core_logic.PRIORITY_ORDER_MAP_CORE.get(task.get('priority'), core_logic.PRIORITY_ORDER_MAP_CORE[None])
+        return (due_date, rank, next(self._seq), task['id'])
+
+    def _initial_entries(self, tasks_list):
+        if isinstance(tasks_list, core_logic.TaskStore): # Straight from the columns, no TaskView per row
+            ranks = core_logic.PRIORITY_ORDER_MAP_CORE
+            return [(due_date, ranks[priority], next(self._seq), task_id)
+                    for task_id, due_date, priority in tasks_list.pending_due_rows()]
+        return filter(None, map(self._entry, tasks_list))
+
+    def _add_entry(self, entry):
+        """Registers entry in _live and _by_date, and in _overdue if it is before the boundary."""
+        due_date, _rank, _seq, task_id = entry
+        self._live[task_id] = entry
+        self._by_date.setdefault(due_date, {})[task_id] = entry
+        if due_date < self._boundary:
+            self._overdue[task_id] = entry
+
+    def _track(self, task):
+        entry = self._entry(task)
+        if entry is None:
+            return
+        self._add_entry(entry)
+        if entry[0] >= self._boundary:
+            heapq.heappush(self._upcoming, entry)
+
+    def _untrack(self, task_id):
+        entry = self._live.pop(task_id, None)
+        if entry is None:
+            return
+        bucket = self._by_date[entry[0]]
+        del bucket[task_id]
+        if not bucket:
+            del self._by_date[entry[0]]
+        if self._overdue.pop(task_id, None) is None:
+            self._stale += 1 # Still in the heap
+            if self._stale >= SCHEDULER_COMPACT_MIN_STALE and self._stale > len(self._live) - len(self._overdue):
+                self._compact()
+
+    def _compact(self):
+        self._upcoming = [entry for task_id, entry in self._live.items() if task_id not in self._overdue]
+        heapq.heapify(self._upcoming)
+        self._stale = 0
+
+    def _is_live(self, entry):
+        return self._live.get(entry[3]) is entry
+
+    def _on_task_event(self, event, task, tasks_list=None, **details):
+        tasks = self._tasks_ref()
+        if tasks is None:
+            return
+        if event in ('add', 'delete'):
+            if tasks_list is not tasks:
+                return
+            if event == 'delete':
+                self._untrack(task['id'])
+            else:
+                self._track(task)
+        elif core_logic.owns_task(tasks, task):
+            self._untrack(task['id'])
+            self._track(task)
+
+    def _on_tasks_collected(self, _ref):
+        self.detach()
+
+    def _advance(self, today):
+        """Moves the overdue/upcoming boundary to today (either direction)."""
+        if today > self._boundary:
+            heap = self._upcoming
+            while heap and heap[0][0] < today:
+                entry = heapq.heappop(heap)
+                if self._is_live(entry):
+                    self._overdue[entry[3]] = entry
+                else:
+                    self._stale -= 1
+        elif today < self._boundary:
+            for task_id, entry in list(self._overdue.items()):
+                if entry[0] >= today:
+                    del self._overdue[task_id]
+                    heapq.heappush(self._upcoming, entry)
+        self._boundary = today
+
+    def _upcoming_in_order(self):
+        """Live upcoming entries in (due_date, rank) order, without popping the heap."""
+        heap = self._upcoming
+        frontier = [(heap[0], 0)] if heap else []
+        while frontier:
+            entry, position = heapq.heappop(frontier)
+            if self._is_live(entry):
+                yield entry
+            for child in (2 * position + 1, 2 * position + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child], child))
+
+    def _resolve(self, entries):
+        tasks = self._tasks_ref()
+        if tasks is None:
+            return []
+        return [tasks.get_by_id(entry[3]) for entry in entries]
+
+    # 查询
+    def overdue(self, today=None):
+        """Pending tasks due before today (YYYY-MM-DD, default: the current date), by (due_date, priority)."""
+        self._advance(today or _today())
+        return self._resolve(sorted(self._overdue.values()))
+
+    def due_on(self, date):
+        """Pending tasks due on date, by priority."""
+        return self._resolve(sorted(self._by_date.get(date, {}).values()))
+
+    def due_today(self, today=None):
+        return self.due_on(today or _today())
+
+    def next_due(self, count=10, today=None):
+        """The first count pending tasks due today or later, by (due_date, priority)."""
+        self._advance(today or _today())
+        return self._resolve(itertools.islice(self._upcoming_in_order(), max(0, count)))
+
+    def due_between(self, after, through):
+        """Pending tasks with after < due_date <= through (after=None: no lower bound), by (due_date, priority)."""
+        if after is not None and through <= after:
+            return []
+        start = datetime.date.fromisoformat(after) + datetime.timedelta(days=1) if after is not None else None
+        end = datetime.date.fromisoformat(through)
+        if start is not None and (end - start).days < len(self._by_date):
+            dates = (day.isoformat() for day in (start + datetime.timedelta(days=offset)
+                                                 for offset in range((end - start).days + 1)))
+        else: # A long span (or none): fewer buckets than days to look at
+            dates = (date for date in self._by_date if (after is None or date > after) and date <= through)
+        entries = [entry for date in dates for entry in self._by_date.get(date, {}).values()]
+        return self._resolve(sorted(entries))
+
+    def next_due_date(self, after):
+        """The earliest due date of a pending task that is later than after, or None."""
+        if after < self._boundary:
+            later_overdue = [entry[0] for entry in self._overdue.values() if entry[0] > after]
+            if later_overdue:
+                return min(later_overdue)
+        for entry in self._upcoming_in_order():
+            if entry[0] > after:
+                return entry[0]
+        return None
+
+    def counts(self, today=None):
+        """{'overdue', 'due_today', 'scheduled'}: pending dated tasks overdue, due today, and in total."""
+        today = today or _today()
+        self._advance(today)
+        return {'overdue': len(self._overdue), 'due_today': len(self._by_date.get(today, ())),
+                'scheduled': len(self._live)}
+
+class ReminderEngine:
+    """
+    Calls callback(tasks) when pending tasks come due: once per due date, at remind_at on
+    that day, with every pending task due that day (by priority). The first check()
+    reminds of everything already due, overdue tasks included.
+
+    Nothing runs by itself: the owner calls check() at next_reminder_time() (a QTimer in
+    the GUI, a sleep in `todo_app_cli.py watch`) and again after edits that may have
+    moved the next reminder earlier. A task whose due date was already reminded of
+    (e.g. added later that day) is not reminded of again.
+    """
+
+    def __init__(self, task_scheduler, callback, remind_at=DEFAULT_REMIND_AT):
+        self.scheduler = task_scheduler
+        self.callback = callback
+        self.remind_at = remind_at
+        self._reminded_through = None # 最后一个已经提醒过的截止日期
+
+    def _due_through(self, now):
+        """The latest due date whose reminder moment is not after now."""
+        day = now.date() if now.time() >= self.remind_at else now.date() - datetime.timedelta(days=1)
+        return day.isoformat()
+
+    def check(self, now=None):
+        """Fires the reminders that are due at now (default: the current time). Returns the tasks reminded of."""
+        now = now or datetime.datetime.now()
+        through = self._due_through(now)
+        if self._reminded_through is not None and through <= self._reminded_through:
+            return []
+        tasks = self.scheduler.due_between(self._reminded_through, through)
+        self._reminded_through = through
+        if tasks:
+            self.callback(tasks)
+        return tasks
+
+    def next_reminder_time(self, now=None):
+        """When check() next has something to report (a datetime), or None if no pending task is due later."""
+        now = now or datetime.datetime.now()
+        if self._reminded_through is None:
+            return now
+        due_date = self.scheduler.next_due_date(self._reminded_through)
+        if due_date is None:
+            return None
+        return max(now, datetime.datetime.combine(datetime.date.fromisoformat(due_date), self.remind_at))
+
+    def seconds_until_next(self, now=None):
+        """next_reminder_time() as seconds from now, or None."""
+        now = now or datetime.datetime.now()
+        moment = self.next_reminder_time(now)
+        return None if moment is None else (moment - now).total_seconds()
+
+_schedulers_by_list = weakref.WeakKeyDictionary()
+
+def scheduler_for(tasks_list):
+    """Returns the (lazily built, then incrementally maintained) scheduler of a TaskList/TaskStore."""
+    task_scheduler = _schedulers_by_list.get(tasks_list)
+    if task_scheduler is None:
+        task_scheduler = _schedulers_by_list[tasks_list] = TaskScheduler(tasks_list)
+    return task_scheduler
@@ -0,0 +1,266 @@
+# search_index.py
+# Full-text search over task descriptions: an inverted index kept up to date through
+# core_logic's task listeners, so the UIs can search a large list without scanning
+# every description.
+
+import bisect
+import collections
+import heapq
+import itertools
+import math
+import re
+import threading
+import weakref
+from array import array
+
+import core_logic
+
+# 中日韩文字没有空格分词：连续的 CJK 字符按二元组 (bigram) 建索引，每段最后一个字再单独
+# 建一个一元词，这样任意单字也能通过前缀匹配找到。其他文字按单词（字母/数字串）建索引。
+_CJK_RANGES = "぀-ヿ㐀-䶿一-鿿豈-﫿가-힯"
+_TERM_PATTERN = re.compile(f"([{_CJK_RANGES}]+)|([^\\W_{_CJK_RANGES}]+)")
+
+SEARCH_REBUILD_MIN_DEAD = 1024 # 失效文档至少这么多、且超过存活文档时重建索引
+
+def tokenize(text):
+    """Index terms of a description: lowercased words, plus CJK bigrams and the last char of each CJK run."""
+    terms = []
+    for cjk_run, word in _TERM_PATTERN.findall(text.lower()):
+        if word:
+            terms.append(word)
+        else:
+            terms.extend(map(str.__add__, cjk_run, cjk_run[1:]))
+            terms.append(cjk_run[-1])
+    return terms
+
+def _query_terms(text):
+    """
+    Terms a description must contain to match text. A CJK run of two or more characters
+    needs only its bigrams; a single character or word is matched as a prefix of index terms.
+    Returns a list of (term, is_prefix) pairs.
+    """
+    terms = []
+    for cjk_run, word in _TERM_PATTERN.findall(text.lower()):
+        if word:
+            terms.append((word, False))
+        elif len(cjk_run) == 1:
+            terms.append((cjk_run, True))
+        else:
+            terms.extend((cjk_run[i:i + 2], False) for i in range(len(cjk_run) - 1))
+    return terms
+
+class SearchIndex:
+    """
+    Inverted index over the descriptions of one TaskList/TaskStore.
+
+    Every indexed description is a document number (doc); postings are sorted
+    array('I') lists of docs, so a million-task index stays compact. Deleting or
+    editing a task only marks its doc dead (an edit re-indexes it under a new doc);
+    the index is rebuilt once dead docs outnumber live ones.
+
+    search() returns tasks containing every query term (the last word and single CJK
+    characters match as prefixes), ranked by the summed inverse document frequency of
+    the query terms (halved where only a longer word matched a prefix), normalised by
+    description length.
+    """
+
+    def __init__(self, tasks_list):
+        self._tasks_ref = weakref.ref(tasks_list, self._on_tasks_collected)
+        # 可以在工作线程中构建（GUI）：构建期间 UI 线程上的修改先记下，建完再补上
+        self._lock = threading.Lock()
+        self._pending_events = []
+        core_logic.add_task_listener(self._on_task_event)
+        with core_logic.paused_gc():
+            self._build(tasks_list)
+        with self._lock:
+            pending_events, self._pending_events = self._pending_events, None
+            for event, task, tasks_list_arg in pending_events:
+                self._apply_event(event, task, tasks_list_arg)
+
+    def detach(self):
+        """Stops following mutations. The index is stale afterwards."""
+        core_logic.remove_task_listener(self._on_task_event)
+
+    # 构建与增量维护
+    def _build(self, tasks_list):
+        postings = collections.defaultdict(list)
+        doc_ids = array('q')   # doc -> task id
+        doc_keys = array('Q')  # doc -> term count << 32 | doc: shorter (then older) docs rank first
+        doc_of = {}            # task id -> live doc
+        for doc, task in enumerate(tasks_list):
+            task_id = task['id']
+            terms = tokenize(task.get('description') or "")
+            doc_ids.append(task_id)
+            doc_keys.append(min(len(terms), 0xFFFF) << 32 | doc)
+            doc_of[task_id] = doc
+            for term in set(terms):
+                postings[term].append(doc)
+        self._postings = {term: array('I', docs) for term, docs in postings.items()}
+        self._terms = sorted(self._postings) # For prefix lookups
+        self._doc_ids = doc_ids
+        self._doc_keys = doc_keys
+        self._doc_of = doc_of
+        self._dead = set()
+
+    def _add_document(self, task):
+        doc = len(self._doc_ids)
+        task_id = task['id']
+        self._remove_document(task_id) # A replayed event may re-add a task the build already saw
+        terms = tokenize(task.get('description') or "")
+        self._doc_ids.append(task_id)
+        self._doc_keys.append(min(len(terms), 0xFFFF) << 32 | doc)
+        self._doc_of[task_id] = doc
+        for term in set(terms):
+            posting = self._postings.get(term)
+            if posting is None:
+                posting = self._postings[term] = array('I')
+                bisect.insort(self._terms, term)
+            posting.append(doc)
+
+    def _remove_document(self, task_id):
+        doc = self._doc_of.pop(task_id, None)
+        if doc is not None:
+            self._dead.add(doc)
+
+    def _on_task_event(self, event, task, tasks_list=None, **details):
+        with self._lock:
+            if self._pending_events is not None:
+                self._pending_events.append((event, task, tasks_list))
+            else:
+                self._apply_event(event, task, tasks_list)
+
+    def _apply_event(self, event, task, tasks_list):
+        tasks = self._tasks_ref()
+        if tasks is None:
+            return
+        if event == 'add':
+            if tasks_list is tasks:
+                self._add_document(task)
+        elif event == 'delete':
+            if tasks_list is tasks:
+                self._remove_document(task['id'])
+        elif event == 'update' and task['id'] in self._doc_of and core_logic.owns_task(tasks, task):
+            self._remove_document(task['id'])
+            self._add_document(task)
+        else:
+            return
+        if len(self._dead) >= SEARCH_REBUILD_MIN_DEAD and len(self._dead) > len(self._doc_of):
+            with core_logic.paused_gc():
+                self._build(tasks)
+
+    def _on_tasks_collected(self, _ref):
+        self.detach()
+
+    # 查询
+    def _docs_for(self, term, is_prefix):
+        """Docs containing term (or, with is_prefix, any term starting with it): a sorted array or a set."""
+        if not is_prefix:
+            return self._postings.get(term, ())
+        start = bisect.bisect_left(self._terms, term)
+        end = bisect.bisect_left(self._terms, term + "\U0010ffff")
+        if end - start == 1:
+            return self._postings[self._terms[start]]
+        docs = set()
+        for matched_term in self._terms[start:end]:
+            docs.update(self._postings[matched_term])
+        return docs
+
+    def _matching_docs(self, doc_lists):
+        """Set of live docs present in every list, intersecting from the rarest list up."""
+        doc_lists = sorted(doc_lists, key=len)
+        matches = set(doc_lists[0])
+        for docs in doc_lists[1:]:
+            if isinstance(docs, set) or len(matches) * 16 >= len(docs):
+                matches.intersection_update(docs)
+            else: # Few candidates left: binary-search the long posting instead of walking it
+                matches = {doc for doc in matches if _contains(docs, doc)}
+            if not matches:
+                break
+        matches.difference_update(self._dead)
+        return matches
+
+    def search(self, text, limit=20, prefix=True):
+        """
+        Returns up to limit tasks matching text, best first. With prefix=True the last
+        word of text also matches longer words ("rep" finds "report").
+        """
+        tasks = self._tasks_ref()
+        query_terms = _query_terms(text)
+        if tasks is None or not query_terms or limit <= 0:
+            return []
+        if prefix and not query_terms[-1][1]:
+            query_terms[-1] = (query_terms[-1][0], True)
+        live_count = max(len(self._doc_of), 1)
+        doc_lists = []
+        weights = []       # (weight, docs containing the exact term, or None when any match counts fully)
+        for term, is_prefix in dict.fromkeys(query_terms):
+            docs = self._docs_for(term, is_prefix)
+            if not docs:
+                return []
+            doc_lists.append(docs)
+            exact_docs = self._postings.get(term) if is_prefix else None
+            if exact_docs is docs or not exact_docs: # All matches exact, or all through longer words
+                exact_docs = None
+            weights.append((math.log(1 + live_count / len(docs)), exact_docs))
+        if len(doc_lists) == 1 and weights[0][1] is None: # One posting: rank it without copying
+            matches = itertools.filterfalse(self._dead.__contains__, doc_lists[0])
+        else:
+            matches = self._matching_docs(doc_lists)
+
+        # 得分 = 权重和 / sqrt(词数)。权重和只取决于每个前缀词是否精确命中，把匹配文档按
+        # 这个“命中签名”分组：组内只需按 doc_keys（词数、文档号）取前 limit 个，C 层完成；
+        # 再对各组候选（至多 2^前缀词数 * limit 个）用 Python 精确打分。
+        groups = [matches]
+        for _weight, exact_docs in weights:
+            if exact_docs is not None:
+                split = []
+                for group in groups:
+                    exact = group.intersection(exact_docs)
+                    split += [exact, group - exact]
+                groups = [group for group in split if group]
+        doc_key = self._doc_keys.__getitem__
+        candidates = set()
+        for group in groups:
+            candidates.update(heapq.nsmallest(limit, group, key=doc_key))
+
+        def rank(doc):
+            score = 0.0
+            for weight, exact_docs in weights:
+                score += weight if exact_docs is None or _contains(exact_docs, doc) else weight / 2
+            return (-score / math.sqrt(doc_key(doc) >> 32 or 1), doc)
+
+        best = sorted(candidates, key=rank)[:limit]
+        return [task for task in map(tasks.get_by_id, (self._doc_ids[doc] for doc in best)) if task is not None]
+
+def _contains(sorted_docs, doc):
+    position = bisect.bisect_left(sorted_docs, doc)
+    return position < len(sorted_docs) and sorted_docs[position] == doc
+
+_search_indexes = weakref.WeakKeyDictionary()
+_search_indexes_lock = threading.Lock() # Two threads asking at once build one index
+
+def search_index_for(tasks_list):
+    """Returns the (lazily built, then incrementally maintained) search index of a TaskList/TaskStore."""
+    index = _search_indexes.get(tasks_list)
+    if index is None:
+        with _search_indexes_lock:
+            index = _search_indexes.get(tasks_list)
+            if index is None:
+                index = _search_indexes[tasks_list] = SearchIndex(tasks_list)
+    return index
+
+def has_search_index(tasks_list):
+    """True if the search index for tasks_list was already built."""
+    return _search_indexes.get(tasks_list) is not None
+
+def search_tasks(tasks_list, text, limit=20):
+    """
+    Searches descriptions of any task container. TaskList/TaskStore go through the
+    index; other iterables (e.g. filtered copies) fall back to a substring scan.
+    """
+    if isinstance(tasks_list, (core_logic.TaskList, core_logic.TaskStore)):
+        return search_index_for(tasks_list).search(text, limit)
+    needle = text.strip().lower()
+    if not needle:
+        return []
+    return [task for task in tasks_list if needle in (task.get('description') or "").lower()][:limit]
@@ -0,0 +1,182 @@
+# task_index.py
+# Incrementally maintained secondary indexes over a task container (TaskList/TaskStore),
+# so the UIs can sort by due date / priority and filter by status / priority
+# without copying and re-sorting the whole list on every request.
+
+import bisect
+import itertools
+import weakref
+from operator import itemgetter
+
+import core_logic
+
+class TaskIndexes:
+    """
+    Secondary indexes for one task container, kept up to date through core_logic's
+    task listeners (add/update/toggle/delete).
+
+    Every index is a sorted list of (..., seq, ref) entries, where seq is the task's
+    position in list order (unique, so refs are never compared) and ref is the task
+    itself for a TaskList, or its id for a TaskStore whose rows are transient views.
+    Lookups are O(log N) and results come out in the same order the stable
+    sorted()/list comprehension in the CLI would produce.
+
+    - due date: (due_date, seq, ref) for dated tasks, (seq, ref) for undated ones
+    - priority: one (seq, ref) bucket per value in VALID_PRIORITIES_CORE
+    - status:   (seq, ref) lists for completed and pending tasks
+    """
+
+    def __init__(self, tasks_list):
+        self._tasks_ref = weakref.ref(tasks_list, self._on_tasks_collected)
+        self._by_ref = isinstance(tasks_list, core_logic.TaskList)
+        self._rebuild(tasks_list)
+        core_logic.add_task_listener(self._on_task_event)
+
+    def detach(self):
+        """Stops following mutations. The indexes are stale afterwards."""
+        core_logic.remove_task_listener(self._on_task_event)
+
+    # 构建与增量维护
+    def _rebuild(self, tasks_list):
+        self._entries = {} # task id -> (seq, ref, due_date, priority, completed) as indexed
+        self._next_seq = 0
+        self._dated = []
+        self._undated = []
+        self._by_priority = {priority: [] for priority in core_logic.VALID_PRIORITIES_CORE}
+        self._by_status = {True: [], False: []}
+        with core_logic.paused_gc():
+            self._build(tasks_list)
+
+    def _build(self, tasks_list):
+        for task in tasks_list:
+            seq = self._next_seq
+            self._next_seq += 1
+            ref, due_date, priority, completed = self._fields(task)
+            self._entries[task['id']] = (seq, ref, due_date, priority, completed)
+            if due_date:
+                self._dated.append((due_date, seq, ref))
+            else:
+                self._undated.append((seq, ref)) # Already in seq order
+            self._by_priority[priority].append((seq, ref))
+            self._by_status[completed].append((seq, ref))
+        self._dated.sort() # seq is unique, so refs are never compared
+
+    def _fields(self, task):
+        priority = task.get('priority')
+        if priority not in core_logic.PRIORITY_ORDER_MAP_CORE:
+            priority = None
+        ref = task if self._by_ref else task['id']
+        return ref, task.get('due_date'), priority, bool(task.get('completed'))
+
+    def _insert(self, task, seq):
+        ref, due_date, priority, completed = self._fields(task)
+        self._entries[task['id']] = (seq, ref, due_date, priority, completed)
+        if due_date:
+            bisect.insort(self._dated, (due_date, seq, ref))
+        else:
+            bisect.insort(self._undated, (seq, ref))
+        bisect.insort(self._by_priority[priority], (seq, ref))
+        bisect.insort(self._by_status[completed], (seq, ref))
+
+    def _remove(self, task_id):
+        entry = self._entries.pop(task_id, None)
+        if entry is None:
+            return None
+        seq, ref, due_date, priority, completed = entry
+        if due_date:
+            _discard(self._dated, (due_date, seq, ref))
+        else:
+            _discard(self._undated, (seq, ref))
+        _discard(self._by_priority[priority], (seq, ref))
+        _discard(self._by_status[completed], (seq, ref))
+        return seq
+
+    def _on_task_event(self, event, task, tasks_list=None, **details):
+        tasks = self._tasks_ref()
+        if tasks is None:
+            return
+        if event == 'add':
+            if tasks_list is not tasks:
+                return
+            index = details.get('index')
+            if index is not None and index < len(tasks) - 1:
+                self._rebuild(tasks) # Inserted mid-list (e.g. an undone delete): every later seq shifts
+            else:
+                self._insert(task, self._next_seq)
+                self._next_seq += 1
+        elif event == 'delete':
+            if tasks_list is tasks:
+                self._remove(task['id'])
+        elif task['id'] in self._entries and core_logic.owns_task(tasks, task):
+            seq = self._remove(task['id'])
+            self._insert(task, seq) # Same place in list order, new field values
+
+    def _on_tasks_collected(self, _ref):
+        self.detach()
+
+    # 查询
+    def _resolve(self, refs):
+        tasks = self._tasks_ref()
+        if tasks is None:
+            return []
+        if self._by_ref:
+            return list(refs)
+        return list(map(tasks.get_by_id, refs))
+
+    def sorted_by_due_date(self, reverse=False):
+        """Tasks by due date, undated last (first when reversed); ties keep list order."""
+        if not reverse:
+            return self._resolve(itertools.chain(map(_third, self._dated), map(_second, self._undated)))
+        ids = list(map(_second, self._undated))
+        dated = self._dated
+        end = len(dated)
+        while end > 0: # Walk equal-date runs from the latest date back, each run in list order
+            start = bisect.bisect_left(dated, (dated[end - 1][0],))
+            ids.extend(map(_third, dated[start:end]))
+            end = start
+        return self._resolve(ids)
+
+    def sorted_by_priority(self, reverse=False):
+        """Tasks by PRIORITY_ORDER_MAP_CORE rank; ties keep list order."""
+        priorities = sorted(self._by_priority, key=core_logic.PRIORITY_ORDER_MAP_CORE.get, reverse=reverse)
+        return self._resolve(itertools.chain.from_iterable(map(_second, self._by_priority[priority])
+                                                           for priority in priorities))
+
+    def with_status(self, completed):
+        """Completed (True) or pending (False) tasks, in list order."""
+        return self._resolve(map(_second, self._by_status[bool(completed)]))
+
+    def with_priority(self, priority):
+        """Tasks with the given priority (None = no priority), in list order."""
+        return self._resolve(map(_second, self._by_priority.get(priority, ())))
+
+    def due_between(self, start=None, end=None):
+        """Dated tasks with start <= due_date < end (either bound may be None), by due date."""
+        low = 0 if start is None else bisect.bisect_left(self._dated, (start,))
+        high = len(self._dated) if end is None else bisect.bisect_left(self._dated, (end,))
+        return self._resolve(map(_third, self._dated[low:high]))
+
+_second = itemgetter(1)
+_third = itemgetter(2)
+
+def _discard(sorted_list, entry):
+    position = bisect.bisect_left(sorted_list, entry)
+    if position < len(sorted_list) and sorted_list[position] == entry:
+        del sorted_list[position]
+
+_indexes_by_list = weakref.WeakKeyDictionary()
+
+def indexes_for(tasks_list):
+    """Returns the (lazily built, then incrementally maintained) indexes of a TaskList/TaskStore."""
+    indexes = _indexes_by_list.get(tasks_list)
+    if indexes is None:
+        indexes = _indexes_by_list[tasks_list] = TaskIndexes(tasks_list)
+    return indexes
+
+def has_indexes(tasks_list):
+    """True if indexes for tasks_list were already built (and are being maintained)."""
+    return _indexes_by_list.get(tasks_list) is not None
+
+def supports_indexes(tasks_list):
+    """Only id-indexed containers can be indexed; plain lists (e.g. filtered copies) cannot."""
+    return isinstance(tasks_list, (core_logic.TaskList, core_logic.TaskStore))
@@ -0,0 +1,432 @@
+# task_server.py
+# Local HTTP/JSON API over core_logic, so several clients and scripts can work on the
+# same tasks at once instead of each re-reading tasks.json.
+#
+# One asyncio process keeps a single in-memory task container loaded through
+# core_logic. Single-task reads and /summary (counts kept up to date through the task
+# listeners) are answered straight from it on the event loop; list selections run in a
+# thread. Every write goes through one writer task, which applies queued writes in order
+# and saves once per batch. Large list responses are streamed with chunked transfer encoding.
+#
+#   GET    /tasks                 list; ?status=pending|done &priority=high|...|none
+#                                 &due_before= &due_after= &sort=due_date|priority|description
+#                                 &reverse=1 &limit=N, or ?page_size=N[&after=<cursor>] for pages
+#   POST   /tasks                 add     {"description", "due_date"?, "priority"?}
+#   GET    /tasks/<id>            one task
+#   PATCH  /tasks/<id>            update  any of {"description", "due_date", "priority", "completed"}
+#   POST   /tasks/<id>/toggle     toggle completion
+#   DELETE /tasks/<id>            delete
+#   GET    /summary               counts (total, pending, overdue, next due date, ...)
+#
+# Usage: python task_server.py [--host 127.0.0.1] [--port 8765]
+# There is no authentication: keep it on the loopback interface.
+
+import asyncio
+import json
+import sys
+from urllib.parse import parse_qs, urlsplit
+
+import core_logic
+
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8765
+MAX_REQUEST_BODY = 1 << 20      # 请求体上限（字节）
+MAX_HEADER_LINES = 100
+STREAM_CHUNK_TASKS = 500        # 流式列表每块的任务数；不超过一块的列表直接带 Content-Length 返回
+WRITE_BATCH_LIMIT = 256         # 写任务每批最多处理的写请求数，一批只保存一次
+
+HTTP_REASONS = {
+    200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    411: "Length Required", 413: "Payload Too Large", 500: "Internal Server Error",
+}
+
+class HttpError(Exception):
+    """An error answered as {"error": message} with the given HTTP status."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+# --- 请求体校验 ---
+def _json_object(body):
+    try:
+        value = json.loads(body or b"{}")
+    except ValueError:
+        raise HttpError(400, "request body is not valid JSON")
+    if not isinstance(value, dict):
+        raise HttpError(400, "request body must be a JSON object")
+    return value
+
+def _checked_fields(fields):
+    """Validates the task fields present in a request body; returns them normalized."""
+    checked = {}
+    if 'description' in fields:
+        description = fields['description']
+        if not isinstance(description, str) or not description.strip():
+            raise HttpError(400, "description must be a non-empty string")
+        checked['description'] = description.strip()
+    if 'due_date' in fields:
+        due_date = fields['due_date'] or None
+        if due_date is not None and not (isinstance(due_date, str) and core_logic.is_valid_date_format_core(due_date)):
+            raise HttpError(400, "due_date must be YYYY-MM-DD or null")
+        checked['due_date'] = due_date
+    if 'priority' in fields:
+        priority = fields['priority'] or None
+        if priority is not None:
+            priority = str(priority).lower()
+            if priority not in core_logic.VALID_PRIORITIES_CORE:
+                raise HttpError(400, "priority must be high, medium, low or null")
+        checked['priority'] = priority
+    if 'completed' in fields:
+        if not isinstance(fields['completed'], bool):
+            raise HttpError(400, "completed must be true or false")
+        checked['completed'] = fields['completed']
+    return checked
+
+def _task_id(text):
+    try:
+        return int(text)
+    except ValueError:
+        raise HttpError(404, f"no task {text}")
+
+def _list_query(tasks, params):
+    """core_logic.query() for the list parameters (the same ones as the CLI's list command)."""
+    def param(name):
+        values = params.get(name)
+        return values[-1] if values else None
+
+    task_query = core_logic.query(tasks)
+    status = param('status')
+    if status in ("pending", "done"):
+        task_query = task_query.where(completed=status == "done")
+    elif status not in (None, "all"):
+        raise HttpError(400, "status must be all, pending or done")
+    priority = param('priority')
+    if priority:
+        if priority != "none" and priority.lower() not in core_logic.VALID_PRIORITIES_CORE:
+            raise HttpError(400, "unknown priority")
+        task_query = task_query.where(priority=None if priority == "none" else priority)
+    if param('due_before'):
+        task_query = task_query.due_before(param('due_before'))
+    if param('due_after'):
+        task_query = task_query.due_after(param('due_after'))
+    sort = param('sort')
+    if sort:
+        if sort not in core_logic.SORT_KEYS_CORE:
+            raise HttpError(400, f"sort must be one of {', '.join(core_logic.SORT_KEYS_CORE)}")
+        task_query = task_query.order_by(sort, reverse=param('reverse') in ("1", "true"))
+    if param('limit'):
+        try:
+            task_query = task_query.limit(int(param('limit')))
+        except ValueError:
+            raise HttpError(400, "limit must be a non-negative integer")
+    return task_query
+
+# --- HTTP ---
+def _response_head(status, headers, keep_alive):
+    lines = [f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}"]
+    lines += [f"{name}: {value}" for name, value in headers.items()]
+    lines.append("Connection: keep-alive" if keep_alive else "Connection: close")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode('latin-1')
+
+async def _send_json(writer, status, value, keep_alive):
+    body = json.dumps(value, ensure_ascii=False).encode('utf-8')
+    writer.write(_response_head(status, {"Content-Type": "application/json; charset=utf-8",
+                                         "Content-Length": len(body)}, keep_alive) + body)
+    await writer.drain()
+
+async def _read_request(reader):
+    """Returns (method, target, headers, body), or None when the client closed the connection."""
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    parts = request_line.decode('latin-1').split()
+    if len(parts) != 3 or not parts[2].startswith("HTTP/"):
+        raise HttpError(400, "malformed request line")
+    headers = {'_version': parts[2]}
+    for _ in range(MAX_HEADER_LINES):
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode('latin-1').partition(":")
+        headers[name.strip().lower()] = value.strip()
+    else:
+        raise HttpError(400, "too many header lines")
+    if 'chunked' in headers.get('transfer-encoding', '').lower():
+        raise HttpError(411, "send the request body with a Content-Length")
+    try:
+        length = int(headers.get('content-length') or 0)
+    except ValueError:
+        raise HttpError(400, "bad Content-Length")
+    if length > MAX_REQUEST_BODY:
+        raise HttpError(413, f"request body over {MAX_REQUEST_BODY} bytes")
+    body = await reader.readexactly(length) if length else b""
+    return parts[0].upper(), parts[1], headers, body
+
+def _wants_keep_alive(headers):
+    connection = headers.get('connection', '').lower()
+    if headers['_version'] == "HTTP/1.0":
+        return connection == "keep-alive"
+    return connection != "close"
+
+class TaskServer:
+    """
+    Serves one task container over HTTP. start() loads it (unless tasks is given) and
+    starts listening; close() stops, flushes the pending writes and saves.
+
+    Reads see a state in which every earlier write has been applied: single tasks and
+    the summary are read on the event loop between writes, and list selections run in
+    a thread while holding the list lock, which the writer task takes to change the
+    list. Writes are queued to the writer task and answered once the batch they are in
+    has been saved.
+    """
+
+    def __init__(self, host=SERVER_HOST, port=SERVER_PORT, tasks=None):
+        self.host = host
+        self.port = port # 0 picks a free port; the real one is set by start()
+        self.tasks = tasks
+        self.requests_served = 0
+        self.summary = None # core_logic.TaskSummary of self.tasks, set by start()
+        self._list_lock = asyncio.Lock() # 列表选择（在线程里）与写任务修改列表互斥
+        self._writes = None # asyncio.Queue of (operation, future); None ends the writer
+        self._writer = None
+        self._server = None
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        if self.tasks is None:
+            self.tasks = await loop.run_in_executor(None, core_logic.load_tasks_data)
+            # 自动归档只在启动时做一次（还没有请求在读列表）；写任务里的同步重新加载不会归档
+            if await loop.run_in_executor(None, core_logic.auto_archive_tasks, self.tasks):
+                await loop.run_in_executor(None, core_logic.save_tasks_data, self.tasks)
+        self.summary = await loop.run_in_executor(None, core_logic.TaskSummary, self.tasks)
+        self._writes = asyncio.Queue()
+        self._writer = asyncio.create_task(self._write_loop())
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._writer is not None:
+            await self._writes.put(None)
+            await self._writer
+        if self.summary is not None:
+            self.summary.detach()
+        loop = asyncio.get_running_loop()
+        if await loop.run_in_executor(None, core_logic.flush_tasks_data):
+            await loop.run_in_executor(None, core_logic.write_summary_cache, self.tasks)
+
+    # --- 写任务 ---
+    async def write(self, operation):
+        """Runs operation() in the writer task; returns its result once it has been saved."""
+        future = asyncio.get_running_loop().create_future()
+        await self._writes.put((operation, future))
+        return await future
+
+    async def _write_loop(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            batch = [await self._writes.get()]
+            while len(batch) < WRITE_BATCH_LIMIT and not self._writes.empty():
+                batch.append(self._writes.get_nowait())
+            stopping = None in batch
+            batch = [item for item in batch if item is not None]
+            if not batch:
+                continue
+            # CLI/GUI 可能同时在写任务文件：先把它们的修改合并进来。检查（可能要对文件算哈希）
+            # 和读文件都放到线程里，合并留在事件循环上，这样读请求不会看到合并了一半的列表。
+            # 文件读不完整（例如正被写到一半）时不合并，保留内存中的列表，下一批再试。
+            # 修改列表前先拿列表锁，等正在线程里进行的列表选择做完。
+            fresh_tasks = await loop.run_in_executor(None, core_logic.reload_changed_tasks_data)
+            results = []
+            async with self._list_lock:
+                if fresh_tasks is not None:
+                    core_logic.merge_loaded_tasks(self.tasks, fresh_tasks)
+                for operation, future in batch:
+                    try:
+                        results.append((future, operation(), None))
+                    except Exception as error:
+                        results.append((future, None, error))
+            # 保存在线程里进行；保存期间写任务不再修改列表，读请求照常在事件循环上处理
+            saved = await loop.run_in_executor(None, core_logic.save_tasks_data, self.tasks)
+            for future, result, error in results:
+                if future.cancelled():
+                    continue
+                if error is None and not saved:
+                    error = HttpError(500, "the change was applied but saving the tasks failed")
+                if error is None:
+                    future.set_result(result)
+                else:
+                    future.set_exception(error)
+
+    # --- 连接与路由 ---
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                keep_alive = False
+                try:
+                    request = await _read_request(reader)
+                    if request is None:
+                        break
+                    method, target, headers, body = request
+                    keep_alive = _wants_keep_alive(headers)
+                    await self._dispatch(method, target, body, writer, keep_alive)
+                except HttpError as error:
+                    await _send_json(writer, error.status, {"error": error.message}, keep_alive)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    raise
+                except Exception as error:
+                    await _send_json(writer, 500, {"error": f"{type(error).__name__}: {error}"}, keep_alive)
+                self.requests_served += 1
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass # The client went away
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method, target, body, writer, keep_alive):
+        url = urlsplit(target)
+        parts = [part for part in url.path.split("/") if part]
+        if parts == ["tasks"]:
+            if method == "GET":
+                return await self._list_tasks(parse_qs(url.query), writer, keep_alive)
+            if method == "POST":
+                return await _send_json(writer, 201, await self._add_task(_json_object(body)), keep_alive)
+        elif len(parts) == 2 and parts[0] == "tasks":
+            task_id = _task_id(parts[1])
+            if method == "GET":
+                return await _send_json(writer, 200, core_logic.task_to_dict(self._task(task_id)), keep_alive)
+            if method == "PATCH":
+                fields = _checked_fields(_json_object(body))
+                return await _send_json(writer, 200, await self.write(lambda: self._update(task_id, fields)),
+                                        keep_alive)
+            if method == "DELETE":
+                return await _send_json(writer, 200, await self.write(lambda: self._delete(task_id)), keep_alive)
+        elif len(parts) == 3 and parts[0] == "tasks" and parts[2] == "toggle":
+            task_id = _task_id(parts[1])
+            if method == "POST":
+                return await _send_json(writer, 200, await self.write(lambda: self._toggle(task_id)), keep_alive)
+        elif parts == ["summary"]:
+            if method == "GET":
+                counts = core_logic.summary_counts(self.summary.summary())
+                return await _send_json(writer, 200, counts, keep_alive)
+        else:
+            raise HttpError(404, f"no such resource: {url.path}")
+        raise HttpError(405, f"{method} is not supported on {url.path}")
+
+    # --- 读 ---
+    def _task(self, task_id):
+        task = core_logic.get_task_by_id(self.tasks, task_id)
+        if task is None:
+            raise HttpError(404, f"no task {task_id}")
+        return task
+
+    async def _select(self, select):
+        """Runs select() in a thread while the writer task cannot change the list."""
+        async with self._list_lock:
+            return await asyncio.get_running_loop().run_in_executor(None, select)
+
+    async def _list_tasks(self, params, writer, keep_alive):
+        task_query = _list_query(self.tasks, params)
+        if params.get('page_size'):
+            try:
+                page_size = max(1, int(params['page_size'][-1]))
+                cursor = json.loads(params['after'][-1]) if params.get('after') else None
+                rows, next_cursor = await self._select(lambda: task_query.after(cursor).page(page_size))
+            except (ValueError, TypeError):
+                raise HttpError(400, "page_size must be an integer and after a cursor from a previous page")
+            page = {'tasks': [core_logic.task_to_dict(task) for _position, task in rows], 'next': next_cursor}
+            return await _send_json(writer, 200, page, keep_alive)
+        # 先在线程里一次性选出结果（只是对象引用），保证列表是某一时刻的一致结果，选择期间
+        # 事件循环照常处理其他请求；再分块序列化和发送，每块之间让出事件循环。发送期间被删除的
+        # 任务跳过：不再属于 self.tasks 的任务（TaskList 里被删的 Task 对象仍然可读，所以要检查归属）。
+        selected = await self._select(task_query.to_list)
+        if len(selected) <= STREAM_CHUNK_TASKS:
+            rows = [core_logic.task_to_dict(task) for task in selected]
+            return await _send_json(writer, 200, rows, keep_alive)
+        writer.write(_response_head(200, {"Content-Type": "application/json; charset=utf-8",
+                                          "Transfer-Encoding": "chunked"}, keep_alive))
+        separator = "["
+        for start in range(0, len(selected), STREAM_CHUNK_TASKS):
+            parts = []
+            for task in selected[start:start + STREAM_CHUNK_TASKS]:
+                if task is None or not core_logic.owns_task(self.tasks, task):
+                    continue # Deleted by a write while this response was being sent
+                parts.append(separator + json.dumps(core_logic.task_to_dict(task), ensure_ascii=False))
+                separator = ","
+            if parts:
+                data = "\n".join(parts).encode('utf-8')
+                writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+            await writer.drain()
+            await asyncio.sleep(0) # drain() does not yield while the buffer is small
+        tail = b"]\n" if separator == "," else b"[]\n"
+        writer.write(b"%x\r\n%s\r\n0\r\n\r\n" % (len(tail), tail))
+        await writer.drain()
+
+    # --- 写（在写任务中执行） ---
+    async def _add_task(self, fields):
+        fields = _checked_fields(fields)
+        if 'description' not in fields:
+            raise HttpError(400, "description is required")
+
+        def add():
+            task = core_logic.add_task_data(self.tasks, fields['description'], fields.get('due_date'),
+                                            fields.get('priority'))
+            if fields.get('completed'):
+                core_logic.toggle_task_completion_data(task)
+            return core_logic.task_to_dict(task)
+        return await self.write(add)
+
+    def _update(self, task_id, fields):
+        task = self._task(task_id)
+        if {'description', 'due_date', 'priority'} & fields.keys():
+            core_logic.update_task_data(task, fields.get('description', task['description']),
+                                        fields.get('due_date', task['due_date']),
+                                        fields.get('priority', task['priority']))
+        if 'completed' in fields and fields['completed'] != task['completed']:
+            core_logic.toggle_task_completion_data(task)
+        return core_logic.task_to_dict(task)
+
+    def _toggle(self, task_id):
+        task = self._task(task_id)
+        core_logic.toggle_task_completion_data(task)
+        return core_logic.task_to_dict(task)
+
+    def _delete(self, task_id):
+        if not core_logic.delete_task_by_id(self.tasks, task_id):
+            raise HttpError(404, f"no task {task_id}")
+        return {'deleted': task_id}
+
+async def serve(host=SERVER_HOST, port=SERVER_PORT):
+    server = TaskServer(host, port)
+    await server.start()
+    print(f"listening on http://{server.host}:{server.port} ({len(server.tasks)} tasks)", flush=True)
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="任务清单的本地 HTTP/JSON 服务")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT, help="0 表示任选一个空闲端口")
+    args = parser.parse_args(argv)
+    if args.host not in ("127.0.0.1", "::1", "localhost"):
+        print("警告：服务没有身份验证，监听非本机地址时任何能连上的人都能修改任务。", file=sys.stderr)
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
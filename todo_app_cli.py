@@ -2,10 +2,17 @@
 # Command-Line Interface for the To-Do application.
 # Uses core_logic.py for data management.
 
-import json # Though json direct use might be minimal now
-from colorama import Fore, init as colorama_init
-import datetime
+import json # 导入 core_logic 时已经加载（解析任务快照、读摘要文件），这里不增加启动时间
+import os
+import shutil
+import sys
+import time
+import unicodedata
+from colorama import Fore, Style, init as colorama_init
+import datetime # 同上：core_logic 校验日期要用，启动时总会加载
 import core_logic # Import the refactored core logic
+# 为了让菜单尽快出现，只在个别功能里用到的模块 (argparse, csv, search_index, scheduler,
+# task_index, instrumentation) 在用到时才导入
 
 # --- 初始化 Colorama ---
 colorama_init(autoreset=True)
@@ -125,33 +132,148 @@ def add_task_cli(tasks_list):
         # This case should ideally not be reached if description is mandatory and validated by get_validated_description_input_cli
         print(Fore.RED + "添加任务失败。请确保描述不为空。")
 
-def view_tasks_cli(tasks_to_display, title="--- 你的任务清单 ---"):
+# --- CLI: 表格渲染 ---
+# 每个任务格式化后的行（不含序号）按 id 缓存，连同格式化时的字段值一起存：字段对不上就重新格式化，
+# 所以历史视图等其他容器里 id 相同、内容不同的任务不会拿到（或覆盖成）错误的行。
+# 整张表攒在缓冲区里成批写出；输出到终端时按屏分页。列宽按显示宽度计算，中文占两列。
+# 输出不是终端时（管道、文件）不带颜色，直接写入 stdout 的字节流：colorama 会逐段扫描
+# 并去掉颜色代码，10 万行时这比格式化本身还慢得多。
+CLI_TABLE_COLUMNS = (("序号", 5), ("状态", 7), ("任务描述", 40), ("截止日期", 12), ("优先级", 8))
+CLI_TABLE_WRITE_ROWS = 10000 # 不分页时每攒够这么多行写一次
+CLI_ROW_CACHE_SIZE = 200000  # 缓存的行数上限，超过时整体清空
+
+def char_width_cli(char):
+    return 2 if unicodedata.east_asian_width(char) in "WF" else 1
+
+def display_width_cli(text):
+    """Terminal columns text takes up: East Asian wide/fullwidth characters count twice."""
+    if text.isascii():
+        return len(text)
+    widths = "".join(map(unicodedata.east_asian_width, text)) # e.g. "NaWW"; only W and F are double
+    return len(text) + widths.count("W") + widths.count("F")
+
+def fit_width_cli(text, width):
+    """Pads text to exactly width columns, cutting it (ending with '..') if it is wider."""
+    used = display_width_cli(text)
+    if used > width:
+        kept = []
+        used = 2
+        for char in text:
+            char_width = char_width_cli(char)
+            if used + char_width > width:
+                break
+            kept.append(char)
+            used += char_width
+        text = "".join(kept) + ".."
+    return text + " " * (width - used)
+
+class TaskTableRenderer:
+    """
+    Formats task rows for view_tasks_cli, caching each row until its task changes.
+    A cached row is only reused while the task's fields still match the ones it was
+    formatted from, whichever container the task comes from.
+    """
+
+    def __init__(self, colored=True, cache_rows=True):
+        self.colored = colored
+        self.cache_rows = cache_rows # False: for one-off views such as past states, which would only evict live rows
+        self._rows = {}  # task id -> (description, completed, due_date, priority, formatted row without the number column)
+        self._cells = {} # (completed, due_date, priority) -> text around the description
+
+    def header(self):
+        return " | ".join(fit_width_cli(name, width) for name, width in CLI_TABLE_COLUMNS)
+
+    def row(self, task):
+        task_id = task.get('id')
+        description = task.get('description') or ""
+        completed = bool(task.get('completed'))
+        due_date = task.get('due_date')
+        priority = task.get('priority')
+        cached = self._rows.get(task_id)
+        if cached is not None and cached[:4] == (description, completed, due_date, priority):
+            return cached[4]
+        cells = self._cells.get((completed, due_date, priority))
+        if cells is None:
+            cells = self._cells[(completed, due_date, priority)] = self._format_cells(completed, due_date, priority)
+        row = cells[0] + fit_width_cli(description, 40) + cells[1]
+        if task_id is not None and self.cache_rows:
+            if len(self._rows) >= CLI_ROW_CACHE_SIZE:
+                self._rows.clear()
+            self._rows[task_id] = (description, completed, due_date, priority, row)
+        return row
+
+    def paint(self, color):
+        """color, or nothing when rendering without colours."""
+        return color if self.colored else ""
+
+    def _format_cells(self, completed, due_date, priority):
+        """The text before and after the description; the combinations repeat, so each is built once."""
+        status_color = self.paint(Fore.GREEN if completed else Fore.YELLOW)
+        desc_color = self.paint(Fore.GREEN if completed else Fore.WHITE)
+        reset = self.paint(Style.RESET_ALL)
+        before = status_color + fit_width_cli("[x]" if completed else "[ ]", 7) + reset + " | " + desc_color
+        if due_date and not core_logic.is_valid_date_format_core(due_date):
+            # Should not happen if data integrity is maintained
+            due_cell = self.paint(Fore.RED) + fit_width_cli("日期损坏", 12) + desc_color
+        else:
+            due_cell = fit_width_cli(due_date or "N/A", 12)
+        after = " | " + due_cell + " | " + fit_width_cli(format_priority_display_cli(priority), 8) + reset + "\n"
+        return before, after
+
+_table_renderers = {} # (colored, cache_rows) -> TaskTableRenderer
+
+def table_renderer_cli(colored=True, cache_rows=True):
+    renderer = _table_renderers.get((colored, cache_rows))
+    if renderer is None:
+        renderer = _table_renderers[(colored, cache_rows)] = TaskTableRenderer(colored, cache_rows)
+    return renderer
+
+def write_table_output_cli(text, colored):
+    """Writes a rendered chunk. Uncoloured text skips colorama and goes straight to stdout's bytes."""
+    binary_stdout = None if colored else getattr(sys.stdout, 'buffer', None)
+    if binary_stdout is None:
+        sys.stdout.write(text)
+        sys.stdout.flush()
+        return
+    sys.stdout.flush() # Keep the order with anything printed before
+    binary_stdout.write(text.encode(sys.stdout.encoding or "utf-8", errors="replace"))
+    binary_stdout.flush()
+
+def terminal_page_size_cli():
+    """Rows per page when paging in a terminal: the window height minus the table header and prompt."""
+    return max(shutil.get_terminal_size().lines - 5, 5)
+
+def view_tasks_cli(tasks_to_display, title="--- 你的任务清单 ---", start_number=1, page_size=None, cache_rows=True):
+    """
+    Prints tasks as a table. page_size=None pages by the terminal height when stdout is
+    a terminal; 0 writes everything (in buffered chunks) without stopping. cache_rows=False
+    formats every row afresh without touching the row cache (for one-off views).
+    """
     if not tasks_to_display:
         print(Fore.YELLOW + "当前没有符合条件的任务，或列表为空。")
         return
+    colored = sys.stdout.isatty()
+    if page_size is None:
+        page_size = terminal_page_size_cli() if colored else 0
 
-    print(Fore.CYAN + f"\n{title}")
-    header = f"{'序号':<5} | {'状态':<7} | {'任务描述':<40} | {'截止日期':<12} | {'优先级':<8}"
-    print(header)
-    print("-" * len(header))
-
-    for index, task in enumerate(tasks_to_display):
-        status_char = "[x]" if task.get('completed') else "[ ]" # Use .get for safety
-        status_color = Fore.GREEN if task.get('completed') else Fore.YELLOW
-        status_marker = status_color + status_char
-        
-        desc_color = Fore.GREEN if task.get('completed') else Fore.WHITE 
-        
-        due_date_display = format_date_display_cli(task.get('due_date'))
-        priority_display = format_priority_display_cli(task.get('priority'))
-        
-        description_str = task.get('description', '') # Use .get for safety
-        max_desc_len = 38 
-        description_display = description_str[:max_desc_len] + ".." if len(description_str) > max_desc_len else description_str
-        
-        print(f"{index + 1:<5} | {status_marker:<13} | {desc_color + description_display:<40} | {due_date_display:<12} | {priority_display:<8}")
-    
-    print(Fore.CYAN + "-" * len(header))
+    renderer = table_renderer_cli(colored, cache_rows)
+    header = renderer.header()
+    separator = "-" * display_width_cli(header)
+    cyan, reset = renderer.paint(Fore.CYAN), renderer.paint(Style.RESET_ALL)
+    chunk = [cyan + f"\n{title}" + reset + "\n", header + "\n", separator + "\n"]
+    rows_in_chunk = 0
+    for number, task in enumerate(tasks_to_display, start_number):
+        chunk.append(f"{number:<5} | ")
+        chunk.append(renderer.row(task))
+        rows_in_chunk += 1
+        if rows_in_chunk == (page_size or CLI_TABLE_WRITE_ROWS):
+            write_table_output_cli("".join(chunk), colored)
+            chunk = []
+            rows_in_chunk = 0
+            if page_size and input("-- 回车显示下一页，q 停止 --").strip().lower() == 'q':
+                return
+    chunk.append(cyan + separator + reset + "\n")
+    write_table_output_cli("".join(chunk), colored)
 
 def edit_task_cli(tasks_list):
     print(Fore.MAGENTA +"\n请参考以下原始任务列表选择要编辑的序号：")
@@ -221,7 +343,7 @@ def delete_task_cli(tasks_list):
         
         if task_to_delete:
             description_of_deleted_task = task_to_delete['description']
-            if core_logic.delete_task_data(tasks_list, task_index): # Core logic handles deletion
+            if core_logic.delete_task_by_id(tasks_list, task_to_delete['id']): # Core logic handles deletion
                 print(Fore.GREEN + f"任务 '{description_of_deleted_task}' 已删除。")
             else: # Should not happen if index is valid before call
                 print(Fore.RED + "删除任务失败。")
@@ -230,32 +352,298 @@ def delete_task_cli(tasks_list):
     except ValueError:
         print(Fore.RED + "错误：请输入有效的任务序号（数字）。")
 
+# --- CLI: 撤销/重做与历史 ---
+# core_logic.TaskHistory 记录本次运行中的修改（只在内存里，退出后不保留）。
+HISTORY_EVENT_NAMES_CLI = {'add': "添加", 'delete': "删除", 'update': "编辑", 'toggle': "切换完成状态"}
+
+def parse_history_time_cli(text):
+    """'YYYY-MM-DD HH:MM[:SS]' 或 '-N' (N 分钟前) -> time.time() 时间戳；无效时返回 None。"""
+    text = text.strip()
+    try:
+        if text.startswith("-"):
+            return datetime.datetime.now().timestamp() - float(text[1:]) * 60
+        return datetime.datetime.fromisoformat(text).timestamp()
+    except ValueError:
+        return None
+
+def show_recent_changes_cli(history, count=20):
+    changes = history.recent_changes(count)
+    if not changes:
+        print(Fore.YELLOW + "本次运行还没有修改。")
+        return
+    print(Fore.CYAN + f"\n--- 最近的 {len(changes)} 次修改 (新的在前) ---")
+    for change in changes:
+        changed_at = datetime.datetime.fromtimestamp(change['time']).strftime("%H:%M:%S")
+        description = change['description'] if change['description'] is not None else "(已删除)"
+        print(f"{changed_at}  {HISTORY_EVENT_NAMES_CLI[change['event']]:<8} {description}")
+
+def history_menu_cli(tasks_list, history):
+    while True:
+        print(Fore.CYAN + "\n--- 撤销/重做与历史 ---")
+        print("1. 撤销上一次修改")
+        print("2. 重做")
+        print("3. 最近的修改")
+        print("4. 查看某一时刻的任务")
+        print("0. 返回主菜单")
+
+        sub_choice = input("请选择操作 (0-4): ")
+        if sub_choice == '1':
+            if not history.can_undo():
+                print(Fore.YELLOW + "没有可以撤销的修改。")
+                continue
+            count = history.undo()
+            save_tasks_cli(tasks_list)
+            print(Fore.GREEN + f"已撤销 ({count} 个任务)。")
+        elif sub_choice == '2':
+            if not history.can_redo():
+                print(Fore.YELLOW + "没有可以重做的修改。")
+                continue
+            count = history.redo()
+            save_tasks_cli(tasks_list)
+            print(Fore.GREEN + f"已重做 ({count} 个任务)。")
+        elif sub_choice == '3':
+            show_recent_changes_cli(history)
+        elif sub_choice == '4':
+            earliest = datetime.datetime.fromtimestamp(history.earliest_time()).strftime("%Y-%m-%d %H:%M:%S")
+            timestamp = parse_history_time_cli(input(f"请输入时间 (YYYY-MM-DD HH:MM[:SS]，或 -N 表示 N 分钟前，最早 {earliest}): "))
+            if timestamp is None:
+                print(Fore.RED + "无效的时间格式。")
+                continue
+            try:
+                past_tasks = history.tasks_as_of(timestamp)
+            except ValueError:
+                print(Fore.RED + f"历史记录只能回溯到 {earliest}。")
+                continue
+            shown_at = datetime.datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+            # 过去的副本与当前列表的 id 相同：不进行缓存，免得把当前任务的缓存行挤掉
+            view_tasks_cli(past_tasks, title=f"--- {shown_at} 时的任务 ---", cache_rows=False)
+        elif sub_choice == '0':
+            break
+        else:
+            print(Fore.RED + "无效的选择，请输入0到4之间的数字。")
+
+# --- CLI: 批量操作 ---
+# 整批修改在撤销历史里算一步 (TaskHistory.grouped)
+def bulk_actions_menu_cli(tasks_list, history):
+    while True:
+        print(Fore.CYAN + "\n--- 批量操作 ---")
+        print("1. 把全部未完成任务标记为已完成")
+        print("2. 删除全部已完成任务")
+        print("0. 返回主菜单")
+
+        sub_choice = input("请选择操作 (0-2): ")
+        if sub_choice == '1':
+            with history.grouped():
+                count = core_logic.complete_all_tasks_data(tasks_list)
+            if count:
+                save_tasks_cli(tasks_list)
+            print(Fore.GREEN + f"已把 {count} 个任务标记为已完成。")
+        elif sub_choice == '2':
+            completed_count = sum(1 for task in tasks_list if task.get('completed'))
+            if not completed_count:
+                print(Fore.YELLOW + "没有已完成的任务。")
+                continue
+            if input(f"确定要删除 {completed_count} 个已完成任务吗? (y/N): ").strip().lower() != 'y':
+                continue
+            with history.grouped():
+                count = core_logic.purge_completed_tasks_data(tasks_list)
+            save_tasks_cli(tasks_list)
+            undo_hint = " (可在菜单 9 中撤销)" if history.can_undo() else " (修改太多，超出了撤销历史的容量)"
+            print(Fore.GREEN + f"已删除 {count} 个已完成任务。" + undo_hint)
+        elif sub_choice == '0':
+            break
+        else:
+            print(Fore.RED + "无效的选择，请输入0到2之间的数字。")
+
+# --- CLI: 归档 ---
+# 已完成的旧任务移到冷存储 (core_logic.archive_tasks_data)；归档只在查看/搜索时才读取。
+# 设置了 TODO_ARCHIVE_AFTER_DAYS / TODO_ARCHIVE_MAX_TASKS 时，启动后第一次加载任务时自动归档
+# (auto_archive_cli)；同步其他程序的修改时不会归档。
+def read_archive_rule_cli(prompt, default):
+    """Asks for a non-negative whole number; Enter keeps default. Returns the number, None for none, or False if invalid."""
+    text = input(prompt).strip()
+    if not text:
+        return default
+    if text == "-":
+        return None
+    return int(text) if text.isdigit() else False
+
+def archive_now_cli(tasks_list, history):
+    after_days, max_tasks = core_logic.archive_policy()
+    if after_days is None and max_tasks is None:
+        after_days = core_logic.ARCHIVE_DEFAULT_DAYS
+    after_days = read_archive_rule_cli(f"归档截止日期早于多少天前的已完成任务? (回车 = {after_days}，- 表示不按日期): ", after_days)
+    max_tasks = read_archive_rule_cli(f"任务清单最多保留多少个任务? (回车 = {max_tasks if max_tasks is not None else '不限'}，- 表示不限): ", max_tasks)
+    if after_days is False or max_tasks is False:
+        print(Fore.RED + "请输入非负整数。")
+        return
+    count = len(core_logic.select_tasks_to_archive(tasks_list, after_days, max_tasks))
+    if not count:
+        print(Fore.YELLOW + "没有符合条件的已完成任务。")
+        return
+    if input(f"确定要把 {count} 个已完成任务移到归档吗? (y/N): ").strip().lower() != 'y':
+        return
+    try:
+        with history.grouped():
+            count = core_logic.archive_tasks_data(tasks_list, after_days, max_tasks)
+    except OSError as e:
+        print(Fore.RED + f"写入归档文件失败: {e}")
+        return
+    save_tasks_cli(tasks_list)
+    print(Fore.GREEN + f"已归档 {count} 个任务 ({core_logic.archive_file()})。")
+
+def auto_archive_cli(tasks_list, history):
+    """Applies the automatic archiving policy after the initial load, as one undoable step, and saves."""
+    with history.grouped():
+        count = core_logic.auto_archive_tasks(tasks_list)
+    if count:
+        save_tasks_cli(tasks_list)
+        print(Fore.YELLOW + f"已自动归档 {count} 个已完成的旧任务 (可以在 9 中撤销)。")
+
+def archive_menu_cli(tasks_list, history):
+    archived = None # 第一次查看/搜索/恢复时才读取归档文件
+    while True:
+        print(Fore.CYAN + "\n--- 归档 ---")
+        print("1. 现在归档已完成的旧任务")
+        print("2. 查看归档")
+        print("3. 搜索归档")
+        print("4. 从归档恢复任务")
+        print("0. 返回主菜单")
+
+        sub_choice = input("请选择操作 (0-4): ")
+        if sub_choice in ('2', '3', '4') and archived is None:
+            archived = core_logic.load_archived_tasks(tasks_list)
+        if sub_choice == '1':
+            archive_now_cli(tasks_list, history)
+            archived = None
+        elif sub_choice == '2':
+            view_tasks_cli(archived, title=f"--- 已归档的任务 ({len(archived)} 个) ---")
+        elif sub_choice == '3':
+            search_tasks_cli(archived)
+        elif sub_choice == '4':
+            view_tasks_cli(archived, title="--- 已归档的任务 (供恢复选择) ---")
+            if not archived:
+                continue
+            try:
+                task_index = int(input("请输入要恢复的任务序号: ")) - 1
+            except ValueError:
+                print(Fore.RED + "错误：请输入有效的任务序号（数字）。")
+                continue
+            task = core_logic.get_task_by_original_index(archived, task_index)
+            if task is None:
+                print(Fore.RED + "错误：无效的任务序号。")
+                continue
+            core_logic.restore_archived_tasks(tasks_list, archived, [task['id']])
+            save_tasks_cli(tasks_list)
+            print(Fore.GREEN + f"任务 '{task['description']}' 已恢复到任务清单。")
+        elif sub_choice == '0':
+            break
+        else:
+            print(Fore.RED + "无效的选择，请输入0到4之间的数字。")
+
+# --- CLI: 到期与提醒 ---
+# scheduler.TaskScheduler 按 (截止日期, 优先级) 维护未完成任务的堆，随任务修改增量更新，
+# 查询“已过期 / 今天到期 / 接下来”时不必对整个列表排序。
+WATCH_SYNC_SECONDS = 60 # watch 最多等这么久就检查一次任务文件有没有被修改（没有变化时只是几次 stat）
+CLI_UPCOMING_COUNT = 10
+
+def show_due_tasks_cli(tasks_list):
+    import scheduler
+    task_scheduler = scheduler.scheduler_for(tasks_list)
+    today = datetime.date.today().isoformat()
+    overdue = task_scheduler.overdue(today)
+    if overdue:
+        view_tasks_cli(overdue, title=f"--- 已过期 ({len(overdue)} 个) ---")
+    due_today = task_scheduler.due_on(today)
+    if due_today:
+        view_tasks_cli(due_today, title=f"--- 今天到期 ({len(due_today)} 个) ---")
+    upcoming = [task for task in task_scheduler.next_due(CLI_UPCOMING_COUNT + len(due_today), today)
+                if task['due_date'] > today][:CLI_UPCOMING_COUNT]
+    if upcoming:
+        view_tasks_cli(upcoming, title=f"--- 接下来到期 (最近的 {len(upcoming)} 个) ---")
+    if not (overdue or due_today or upcoming):
+        print(Fore.YELLOW + "没有设置了截止日期的未完成任务。")
+
+def print_reminders_cli(due_tasks):
+    """ReminderEngine callback of `watch`: one JSON line per task that came due."""
+    today = datetime.date.today().isoformat()
+    for task in due_tasks:
+        print_json_cli({"reminder": "overdue" if task['due_date'] < today else "due", **core_logic.task_to_dict(task)})
+    sys.stdout.flush()
+
+def watch_cli(tasks, remind_at, once=False):
+    """
+    Prints reminders as tasks come due, until interrupted: first everything already due,
+    then each due date at remind_at on that day. Sleeps until the next reminder (at most
+    WATCH_SYNC_SECONDS, to pick up edits saved by other programs).
+    """
+    import scheduler
+    engine = scheduler.ReminderEngine(scheduler.scheduler_for(tasks), print_reminders_cli, remind_at)
+    engine.check()
+    while not once:
+        wait = engine.seconds_until_next()
+        time.sleep(WATCH_SYNC_SECONDS if wait is None else min(wait, WATCH_SYNC_SECONDS))
+        core_logic.sync_tasks_data(tasks)
+        engine.check()
+
 # --- CLI: 排序与过滤功能 ---
+# 对 load_tasks_cli 返回的任务容器，截止日期/优先级排序和状态/优先级过滤直接读取
+# task_index 中增量维护的索引；对普通列表（例如已经过滤过的副本）才回退到排序/扫描。
+def select_in_storage_cli(tasks_list, **conditions):
+    """
+    Lets a backend that can query its own storage (SQLite) sort/filter; None if it cannot.
+    Indexes that already exist in memory are faster than a query, so they take precedence.
+    """
+    import task_index
+    select_tasks = getattr(core_logic.get_storage_backend(), 'select_tasks', None)
+    if select_tasks is None or task_index.has_indexes(tasks_list):
+        return None
+    return select_tasks(tasks_list, **conditions)
+
 def sort_tasks_cli(tasks_list_original, sort_key, reverse_order=False):
     """Sorts a copy of the task list for CLI display."""
+    import task_index
     if not tasks_list_original: return []
-    
+
+    selected = select_in_storage_cli(tasks_list_original, order_by=sort_key, reverse=reverse_order)
+    if selected is not None:
+        return selected
+
+    if task_index.supports_indexes(tasks_list_original):
+        indexes = task_index.indexes_for(tasks_list_original)
+        if sort_key == "due_date":
+            return indexes.sorted_by_due_date(reverse=reverse_order)
+        if sort_key == "priority":
+            return indexes.sorted_by_priority(reverse=reverse_order)
+
     # Work on a copy
     tasks_to_sort = list(tasks_list_original) 
 
-    if sort_key == "description":
-        return sorted(tasks_to_sort, key=lambda task: task.get('description', '').lower(), reverse=reverse_order)
-    elif sort_key == "due_date":
-        return sorted(tasks_to_sort, key=lambda task: (
-            task.get('due_date') is None, # Sorts None (True) after non-None (False)
-            task.get('due_date') if task.get('due_date') else "9999-99-99" # Actual date or late placeholder
-        ), reverse=reverse_order)
-    elif sort_key == "priority":
-        # Use the map from core_logic for consistent sorting
-        return sorted(tasks_to_sort, key=lambda task: core_logic.PRIORITY_ORDER_MAP_CORE.get(task.get('priority'), 99), reverse=reverse_order)
+    if sort_key in core_logic.SORT_KEYS_CORE:
+        # Use the sort keys from core_logic for consistent sorting
+        return sorted(tasks_to_sort, key=core_logic.SORT_KEYS_CORE[sort_key], reverse=reverse_order)
     else:
         # print(Fore.RED + "错误：无效的排序键。") # Feedback handled by caller
         return tasks_to_sort
 
 def filter_tasks_cli(tasks_list_original, filter_type, filter_value=None):
     """Filters a copy of the task list for CLI display."""
+    import task_index
     if not tasks_list_original: return []
 
+    if filter_type in ("status", "priority"):
+        field = "completed" if filter_type == "status" else "priority"
+        selected = select_in_storage_cli(tasks_list_original, where={field: filter_value})
+        if selected is not None:
+            return selected
+
+    if task_index.supports_indexes(tasks_list_original):
+        indexes = task_index.indexes_for(tasks_list_original)
+        if filter_type == "status":
+            return indexes.with_status(filter_value)
+        if filter_type == "priority":
+            return indexes.with_priority(filter_value)
+
     tasks_to_filter = list(tasks_list_original)
 
     if filter_type == "status":
@@ -266,6 +654,69 @@ def filter_tasks_cli(tasks_list_original, filter_type, filter_value=None):
         # print(Fore.RED + "错误：无效的过滤类型。") # Feedback handled by caller
         return tasks_to_filter
 
+CLI_QUERY_PAGE_SIZE = 20
+CLI_QUERY_ORDER_CHOICES = {'d': "due_date", 'p': "priority", 't': "description"}
+
+def build_query_cli(current_tasks):
+    """Asks for status/priority/due date conditions and an order, returns a core_logic query."""
+    task_query = core_logic.query(current_tasks)
+
+    status_input = input("状态 (p=未完成, c=已完成, 留空=全部): ").strip().lower()
+    if status_input == 'p':
+        task_query = task_query.where(completed=False)
+    elif status_input == 'c':
+        task_query = task_query.where(completed=True)
+
+    priority_input = input(f"优先级 ({CLI_PRIORITY_DISPLAY_OPTIONS}, n=无优先级, 留空=全部): ").strip().lower()
+    if priority_input in CLI_VALID_PRIORITY_CHOICES:
+        task_query = task_query.where(priority=priority_input)
+    elif priority_input == 'n':
+        task_query = task_query.where(priority=None)
+
+    while True:
+        due_input = input("截止日期早于 (YYYY-MM-DD, 留空=不限): ").strip()
+        if not due_input:
+            break
+        if core_logic.is_valid_date_format_core(due_input):
+            task_query = task_query.due_before(due_input)
+            break
+        print(Fore.RED + "错误：日期格式无效，请输入YYYY-MM-DD 格式或留空。")
+
+    order_input = input("排序 (d=截止日期, p=优先级, t=描述, 留空=原始顺序): ").strip().lower()
+    if order_input in CLI_QUERY_ORDER_CHOICES:
+        reverse = input("升序 (a) 还是降序 (d)? [a]: ").lower() == 'd'
+        task_query = task_query.order_by(CLI_QUERY_ORDER_CHOICES[order_input], reverse=reverse)
+    return task_query
+
+def combined_query_cli(current_tasks):
+    """Runs a combined query and shows it page by page; each page is a separate top-k."""
+    print(Fore.CYAN + "\n--- 组合查询 (CLI) ---")
+    task_query = build_query_cli(current_tasks)
+    cursor = None
+    page_number = 1
+    while True:
+        rows, cursor = task_query.after(cursor).page(CLI_QUERY_PAGE_SIZE)
+        view_tasks_cli([task for _position, task in rows], title=f"--- 查询结果 (第 {page_number} 页) ---",
+                       start_number=(page_number - 1) * CLI_QUERY_PAGE_SIZE + 1)
+        if cursor is None:
+            break
+        if input("回车查看下一页，q 返回: ").strip().lower() == 'q':
+            break
+        page_number += 1
+
+def search_tasks_cli(current_tasks):
+    """Asks for search words and shows the best matching tasks."""
+    search_text = input("搜索内容 (多个词用空格分隔，最后一个词可只输入开头): ").strip()
+    if not search_text:
+        print(Fore.YELLOW + "未输入搜索内容。")
+        return
+    import search_index # Compiles a large Unicode regex on import
+    results = search_index.search_tasks(current_tasks, search_text, limit=CLI_QUERY_PAGE_SIZE)
+    if not results:
+        print(Fore.YELLOW + f"没有找到包含 '{search_text}' 的任务。")
+        return
+    view_tasks_cli(results, title=f"--- 搜索 '{search_text}' 的结果 (最相关的 {len(results)} 个) ---")
+
 def handle_advanced_view_options_cli(current_tasks):
     if not current_tasks:
         print(Fore.YELLOW + "当前没有任务可供排序或过滤。")
@@ -279,9 +730,11 @@ def handle_advanced_view_options_cli(current_tasks):
         print("4. 过滤已完成任务")
         print("5. 过滤未完成任务")
         print("6. 按优先级过滤")
+        print("7. 组合查询 (状态/优先级/截止日期 + 排序, 分页)")
+        print("8. 全文搜索 (按描述)")
         print("0. 返回主菜单")
         
-        sub_choice = input("请选择操作 (0-6): ")
+        sub_choice = input("请选择操作 (0-8): ")
         
         processed_list = None # To store the result of sort/filter
 
@@ -316,16 +769,363 @@ def handle_advanced_view_options_cli(current_tasks):
                 view_tasks_cli(processed_list, title=f"--- 优先级为 '{display_prio}' 的任务 ---")
             else:
                 print(Fore.RED + "无效的优先级输入。")
+        elif sub_choice == '7':
+            combined_query_cli(current_tasks)
+        elif sub_choice == '8':
+            search_tasks_cli(current_tasks)
         elif sub_choice == '0':
             break
         else:
-            print(Fore.RED + "无效的选择，请输入0到6之间的数字。")
+            print(Fore.RED + "无效的选择，请输入0到8之间的数字。")
+
+# --- CLI: 非交互批处理子命令 ---
+# 供脚本调用：python todo_app_cli.py <子命令> ...。每次调用只加载一次、保存一次，
+# 所有操作都经由 core_logic 完成，结果以 JSON 输出到 stdout。
+BATCH_SORT_CHOICES = list(core_logic.SORT_KEYS_CORE)
+BATCH_EXPORT_FORMATS = ("json", "jsonl", "csv")
+BATCH_CSV_FIELDS = ("description", "due_date", "priority")
+
+def non_negative_int_cli(text):
+    """argparse type for counts and day numbers: a whole number >= 0."""
+    import argparse
+    try:
+        value = int(text)
+    except ValueError:
+        value = -1
+    if value < 0:
+        raise argparse.ArgumentTypeError(f"需要非负整数: {text}")
+    return value
+
+def build_arg_parser_cli():
+    import argparse
+    parser = argparse.ArgumentParser(prog="todo_app_cli.py", description="任务清单 (不带参数时进入交互菜单)")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    add_parser = subcommands.add_parser("add", help="添加一个任务")
+    add_parser.add_argument("description")
+    add_parser.add_argument("--due", help="截止日期 YYYY-MM-DD")
+    add_parser.add_argument("--priority", choices=CLI_VALID_PRIORITY_CHOICES)
+
+    bulk_parser = subcommands.add_parser("bulk-add", help="从 stdin 批量添加 (CSV 带表头，或每行一个 JSON 对象)")
+    bulk_parser.add_argument("--format", choices=("csv", "jsonl"), default="jsonl")
+
+    list_parser = subcommands.add_parser("list", help="列出任务")
+    list_parser.add_argument("--status", choices=("all", "pending", "done"), default="all")
+    list_parser.add_argument("--priority", choices=CLI_VALID_PRIORITY_CHOICES + ["none"])
+    list_parser.add_argument("--due-before", help="只列出截止日期早于该日期的任务")
+    list_parser.add_argument("--due-after", help="只列出截止日期晚于该日期的任务")
+    list_parser.add_argument("--sort", choices=BATCH_SORT_CHOICES)
+    list_parser.add_argument("--reverse", action="store_true")
+    list_parser.add_argument("--limit", type=non_negative_int_cli)
+    list_parser.add_argument("--table", action="store_true", help="输出表格而不是 JSON")
+    list_parser.add_argument("--page", action="store_true", help="表格按终端高度分页 (配合 --table)")
+
+    for name, help_text in (("done", "把任务标记为已完成"), ("delete", "删除任务")):
+        id_parser = subcommands.add_parser(name, help=help_text)
+        id_parser.add_argument("ids", nargs="+", type=int, metavar="ID", help="任务 id (见 list 的输出)")
+
+    subcommands.add_parser("complete-all", help="把全部未完成任务标记为已完成")
+    subcommands.add_parser("purge-completed", help="删除全部已完成任务")
+
+    archive_parser = subcommands.add_parser("archive", help="把已完成的旧任务移到归档 (默认按已设置的策略)")
+    archive_parser.add_argument("--days", type=non_negative_int_cli, help="归档截止日期早于这么多天前的已完成任务")
+    archive_parser.add_argument("--max-tasks", type=non_negative_int_cli, help="任务清单超过这么多个任务时归档最早的已完成任务")
+    archived_parser = subcommands.add_parser("archived", help="列出已归档的任务")
+    archived_parser.add_argument("--search", help="只列出描述匹配的任务 (按相关度)")
+    archived_parser.add_argument("--limit", type=non_negative_int_cli, default=None)
+    restore_parser = subcommands.add_parser("restore", help="把已归档的任务恢复到任务清单")
+    restore_parser.add_argument("ids", nargs="+", type=int, metavar="ID", help="任务 id (见 archived 的输出)")
+
+    watch_parser = subcommands.add_parser("watch", help="任务到期时输出提醒 (每行一个 JSON)，直到按 Ctrl+C")
+    watch_parser.add_argument("--remind-at", default="09:00", help="到期当天几点提醒 (HH:MM，默认 09:00)")
+    watch_parser.add_argument("--once", action="store_true", help="只输出已经到期的任务，然后退出")
+
+    export_parser = subcommands.add_parser("export", help="导出全部任务")
+    export_parser.add_argument("--format", choices=BATCH_EXPORT_FORMATS, default="json")
+    export_parser.add_argument("--output", help="输出文件 (默认 stdout)")
+    return parser
+
+def print_json_cli(value, stream=None):
+    (stream or sys.stdout).write(json.dumps(value, ensure_ascii=False) + "\n")
+
+def read_bulk_rows_cli(stream, input_format):
+    """Yields (line number, row dict or None if unparsable) from CSV (with header) or JSONL input."""
+    if input_format == "csv":
+        import csv
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_number, row if isinstance(row, dict) else None
+
+def bulk_add_cli(tasks, stream, input_format):
+    """Adds every valid row of stream with one core_logic.add_tasks_bulk call. Returns the JSON result."""
+    failed = []
+    rows, line_numbers = [], []
+    for line_number, row in read_bulk_rows_cli(stream, input_format):
+        if row is None:
+            failed.append({"line": line_number, "error": "无法解析"})
+            continue
+        rows.append(row)
+        line_numbers.append(line_number)
+    date_ok = core_logic.validate_dates_core([row.get("due_date") or "" for row in rows])
+    valid_rows = []
+    for row, line_number, valid_date in zip(rows, line_numbers, date_ok):
+        if not valid_date:
+            failed.append({"line": line_number, "error": f"日期格式无效: {row.get('due_date')}"})
+        elif core_logic._normalized_priority(row.get("priority")) is False:
+            failed.append({"line": line_number, "error": f"优先级无效: {row.get('priority')}"})
+        else:
+            valid_rows.append((line_number, row))
+    added = 0
+    for (line_number, _row), new_task in zip(valid_rows, core_logic.add_tasks_bulk(tasks, (row for _line, row in valid_rows))):
+        if new_task is None:
+            failed.append({"line": line_number, "error": "描述必须是非空文本"})
+        else:
+            added += 1
+    failed.sort(key=lambda failure: failure["line"])
+    return {"added": added, "failed": failed}
+
+def list_query_cli(tasks, args):
+    task_query = core_logic.query(tasks)
+    if args.status != "all":
+        task_query = task_query.where(completed=args.status == "done")
+    if args.priority:
+        task_query = task_query.where(priority=None if args.priority == "none" else args.priority)
+    if args.due_before:
+        task_query = task_query.due_before(args.due_before)
+    if args.due_after:
+        task_query = task_query.due_after(args.due_after)
+    if args.sort:
+        task_query = task_query.order_by(args.sort, reverse=args.reverse)
+    if args.limit is not None:
+        task_query = task_query.limit(args.limit)
+    return task_query
+
+def write_tasks_json_cli(task_iterable, stream):
+    """Writes a JSON array one task at a time, so large lists are never built as one string."""
+    stream.write("[")
+    for count, task in enumerate(task_iterable):
+        stream.write(("," if count else "") + "\n" + json.dumps(core_logic.task_to_dict(task), ensure_ascii=False))
+    stream.write("\n]\n")
+
+def export_tasks_cli(tasks, export_format, stream):
+    if export_format == "json":
+        write_tasks_json_cli(tasks, stream)
+    elif export_format == "jsonl":
+        for task in tasks:
+            stream.write(json.dumps(core_logic.task_to_dict(task), ensure_ascii=False) + "\n")
+    else:
+        import csv
+        writer = csv.DictWriter(stream, fieldnames=core_logic.TASK_FIELDS)
+        writer.writeheader()
+        writer.writerows(map(core_logic.task_to_dict, tasks))
+
+def apply_to_ids_cli(tasks, task_ids, command):
+    """Marks done ("done") or deletes ("delete") the tasks in one bulk call. Returns the JSON result listing done / unknown ids."""
+    if command == "done":
+        found = [core_logic.get_task_by_id(tasks, task_id) is not None for task_id in task_ids]
+        core_logic.toggle_many(tasks, task_ids, completed=True) # Already completed tasks stay as they are
+    else:
+        found = core_logic.delete_tasks_bulk(tasks, task_ids)
+    return {"ok": [task_id for task_id, ok in zip(task_ids, found) if ok],
+            "not_found": [task_id for task_id, ok in zip(task_ids, found) if not ok]}
+
+def run_batch_cli(argv):
+    """Runs one batch subcommand: load once, apply everything, save once. Returns the exit code."""
+    args = build_arg_parser_cli().parse_args(argv)
+    for date_argument in ("due", "due_before", "due_after"):
+        date_string = getattr(args, date_argument, None)
+        if date_string and not core_logic.is_valid_date_format_core(date_string):
+            print_json_cli({"error": f"日期格式无效: {date_string}"}, sys.stderr)
+            return 2
+    remind_at = None
+    if args.command == "watch":
+        try:
+            remind_at = datetime.time.fromisoformat(args.remind_at)
+        except ValueError:
+            print_json_cli({"error": f"时间格式无效: {args.remind_at}"}, sys.stderr)
+            return 2
+
+    tasks = load_tasks_cli()
+    auto_archived = core_logic.auto_archive_tasks(tasks) # 保存在最后，与命令本身的修改一起
+    changed = True
+    exit_code = 0
+    if args.command == "add":
+        new_task = core_logic.add_task_data(tasks, args.description, args.due, args.priority)
+        if new_task is None:
+            print_json_cli({"error": "描述不能为空"}, sys.stderr)
+            return 1
+        print_json_cli(core_logic.task_to_dict(new_task))
+    elif args.command == "bulk-add":
+        result = bulk_add_cli(tasks, sys.stdin, args.format)
+        print_json_cli(result)
+        changed = result["added"] > 0
+        exit_code = 1 if result["failed"] else 0
+    elif args.command in ("done", "delete"):
+        result = apply_to_ids_cli(tasks, args.ids, args.command)
+        print_json_cli(result)
+        changed = bool(result["ok"])
+        exit_code = 1 if result["not_found"] else 0
+    elif args.command in ("complete-all", "purge-completed"):
+        if args.command == "complete-all":
+            result = {"completed": core_logic.complete_all_tasks_data(tasks)}
+        else:
+            result = {"deleted": core_logic.purge_completed_tasks_data(tasks)}
+        print_json_cli(result)
+        changed = any(result.values())
+    elif args.command == "archive":
+        after_days, max_tasks = args.days, args.max_tasks
+        if after_days is None and max_tasks is None:
+            after_days, max_tasks = core_logic.archive_policy()
+            if after_days is None and max_tasks is None:
+                after_days = core_logic.ARCHIVE_DEFAULT_DAYS
+        try:
+            result = {"archived": core_logic.archive_tasks_data(tasks, after_days, max_tasks)}
+        except OSError as e:
+            print_json_cli({"error": f"写入归档文件失败: {e}"}, sys.stderr)
+            return 1
+        print_json_cli(result)
+        changed = result["archived"] > 0
+    elif args.command == "restore":
+        archived = core_logic.load_archived_tasks(tasks)
+        restored = core_logic.restore_archived_tasks(tasks, archived, args.ids)
+        result = {"ok": [task_id for task_id, ok in zip(args.ids, restored) if ok],
+                  "not_found": [task_id for task_id, ok in zip(args.ids, restored) if not ok]}
+        print_json_cli(result)
+        changed = bool(result["ok"])
+        exit_code = 1 if result["not_found"] else 0
+    else:
+        changed = False
+        if args.command == "watch":
+            try:
+                watch_cli(tasks, remind_at, once=args.once)
+            except KeyboardInterrupt:
+                pass
+        elif args.command == "archived":
+            archived = core_logic.load_archived_tasks(tasks)
+            if args.search:
+                import search_index
+                archived = search_index.search_tasks(archived, args.search,
+                                                     limit=len(archived) if args.limit is None else args.limit)
+            elif args.limit is not None:
+                archived = archived[:args.limit]
+            write_tasks_json_cli(archived, sys.stdout)
+        elif args.command == "list" and args.table:
+            view_tasks_cli(list_query_cli(tasks, args).to_list(), page_size=terminal_page_size_cli() if args.page else 0)
+        elif args.command == "list":
+            write_tasks_json_cli(list_query_cli(tasks, args), sys.stdout)
+        elif args.output:
+            with open(args.output, 'w', encoding='utf-8', newline='') as f:
+                export_tasks_cli(tasks, args.format, f)
+        else:
+            export_tasks_cli(tasks, args.format, sys.stdout)
+
+    changed = changed or auto_archived > 0
+    if changed and not (core_logic.save_tasks_data(tasks) and core_logic.flush_tasks_data()):
+        print_json_cli({"error": "保存任务失败"}, sys.stderr)
+        return 1
+    if changed:
+        core_logic.write_summary_cache(tasks)
+    return exit_code
+
+# --- CLI: 性能统计 ---
+# 只有开启 instrumentation（--profile 或环境变量 TODO_PROFILE）时才包装这些函数
+CLI_INSTRUMENTED_FUNCTIONS = (
+    'view_tasks_cli', 'sort_tasks_cli', 'filter_tasks_cli', 'select_in_storage_cli',
+    'run_batch_cli', 'bulk_add_cli', 'export_tasks_cli', 'write_tasks_json_cli',
+)
+
+PROFILE_FLAG_CLI = "--profile"  # 与 instrumentation.PROFILE_FLAG / PROFILE_ENV 相同；
+PROFILE_ENV_CLI = "TODO_PROFILE" # 先在这里检查，不要求性能统计时就不导入 instrumentation
+
+def enable_instrumentation_cli(argv):
+    """Turns on instrumentation if asked for; returns argv without --profile."""
+    if PROFILE_FLAG_CLI not in argv and not os.environ.get(PROFILE_ENV_CLI):
+        return list(argv)
+    import instrumentation
+    argv = instrumentation.enable_from_environment(argv)
+    if instrumentation.is_enabled():
+        instrumentation.instrument(sys.modules[__name__], CLI_INSTRUMENTED_FUNCTIONS, prefix="cli")
+        import search_index
+        instrumentation.instrument(search_index, ("search_tasks",), prefix="search")
+    return argv
+
+def show_stats_cli():
+    import instrumentation
+    if not instrumentation.is_enabled():
+        print(Fore.YELLOW + f"性能统计未开启。请用 --profile 参数或设置环境变量 {instrumentation.PROFILE_ENV}=1 启动。")
+        return
+    print(Fore.CYAN + "\n--- 性能统计 (本次运行) ---")
+    for line in instrumentation.format_stats():
+        print(line)
 
 # --- CLI: 主程序逻辑 ---
-def main_cli():
-    tasks = load_tasks_cli() # Uses core_logic
+def main_cli(argv=None):
+    argv = enable_instrumentation_cli(sys.argv[1:] if argv is None else argv)
+    if argv: # 带参数：非交互的批处理子命令
+        try:
+            return run_batch_cli(argv)
+        except BrokenPipeError: # 例如输出被管道传给 head：静默退出
+            devnull = os.open(os.devnull, os.O_WRONLY)
+            os.dup2(devnull, sys.stdout.fileno())
+            return 1
+        finally:
+            instrumentation = sys.modules.get('instrumentation') # 只有要求性能统计时才导入过
+            if instrumentation is not None and instrumentation.is_enabled():
+                print("\n".join(instrumentation.format_stats()), file=sys.stderr)
+
+    # 交互菜单立即出现；任务在第一次需要它们的选择时才加载 (见 run_menu_cli)
+    show_summary_cli()
+    tasks = None
+    try:
+        tasks = run_menu_cli()
+    finally:
+        # 开启写入合并 (core_logic.set_write_coalescing) 时，最后几次保存可能还没写出
+        if not core_logic.flush_tasks_data():
+            print(Fore.RED + "错误：保存任务失败！")
+        elif tasks is not None:
+            core_logic.write_summary_cache(tasks) # 下次启动时菜单上方的摘要
 
+def show_summary_cli():
+    """Prints task counts from the summary sidecar, if it is up to date (no task file is parsed)."""
+    counts = core_logic.read_summary_cache()
+    if counts is None:
+        return
+    line = f"任务: 共 {counts['total']} 个, 未完成 {counts['pending']} 个"
+    if counts['overdue']:
+        line += Fore.RED + f", 已过期 {counts['overdue']} 个" + Style.RESET_ALL
+    if counts['due_today']:
+        line += f", 今天到期 {counts['due_today']} 个"
+    if counts['next_due']:
+        line += f", 最近截止: {counts['next_due']}"
+    print(line)
+
+CLI_MENU_CHOICES_NEEDING_TASKS = ('1', '2', '3', '4', '5', '6', '9', '10', '11', '12') # 退出和性能统计不需要加载任务
+
+def run_menu_cli(tasks=None):
+    """
+    The interactive menu loop. With tasks=None the tasks are loaded on the first choice
+    that needs them, so the menu shows without waiting for a large task file.
+    Returns the task list (None if it was never loaded).
+    """
+    history = None
+    if tasks is not None:
+        history = core_logic.TaskHistory(tasks)
+        auto_archive_cli(tasks, history)
     while True:
+        if tasks is not None:
+            # GUI 或另一个 CLI 可能同时在修改任务文件；没有变化时这只是几次 stat
+            changed_count = core_logic.sync_tasks_data(tasks)
+            if changed_count:
+                print(Fore.YELLOW + f"任务文件已被其他程序修改，已同步 {changed_count} 个任务。")
         print(Fore.BLUE + "\n请选择操作 (CLI)：")
         print("1. 添加任务")
         print("2. 查看所有任务 (原始顺序)")
@@ -334,8 +1134,17 @@ def main_cli():
         print("5. 删除任务")
         print("6. 高级查看 (排序/过滤)")
         print("7. 退出")
+        print("8. 性能统计")
+        print("9. 撤销/重做/历史")
+        print("10. 批量操作 (全部完成/删除已完成)")
+        print("11. 归档 (移出/查看/搜索/恢复已完成的旧任务)")
+        print("12. 到期提醒 (已过期/今天到期/接下来)")
         
-        choice = input(f"请输入你的选择 (1-7): ")
+        choice = input(f"请输入你的选择 (1-12): ")
+        if tasks is None and choice in CLI_MENU_CHOICES_NEEDING_TASKS:
+            tasks = load_tasks_cli()
+            history = core_logic.TaskHistory(tasks)
+            auto_archive_cli(tasks, history)
 
         if choice == '1':
             add_task_cli(tasks)
@@ -355,9 +1164,19 @@ def main_cli():
             handle_advanced_view_options_cli(tasks)
         elif choice == '7':
             print(Fore.GREEN + "感谢使用CLI版本。任务数据已自动保存（如适用）。再见！")
-            break
+            return tasks
+        elif choice == '8':
+            show_stats_cli()
+        elif choice == '9':
+            history_menu_cli(tasks, history)
+        elif choice == '10':
+            bulk_actions_menu_cli(tasks, history)
+        elif choice == '11':
+            archive_menu_cli(tasks, history)
+        elif choice == '12':
+            show_due_tasks_cli(tasks)
         else:
-            print(Fore.RED + f"无效的选择，请输入1到7之间的数字。")
+            print(Fore.RED + f"无效的选择，请输入1到12之间的数字。")
 
 if __name__ == "__main__":
-    main_cli()
\ No newline at end of file
+    sys.exit(main_cli())
\ No newline at end of file
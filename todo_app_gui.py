@@ -1,15 +1,264 @@
 # todo_app_gui.py
 
+import os
 import sys
+import time
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, 
-    QVBoxLayout, QListWidget, QPushButton,
-    QLabel # 我们可能需要一个标签来显示状态或标题
+    QVBoxLayout, QHBoxLayout, QListView, QPushButton,
+    QLabel, # 我们可能需要一个标签来显示状态或标题
+    QComboBox, QLineEdit, QMessageBox
+)
+from PyQt6.QtGui import QFont, QColor, QAction, QKeySequence # For setting font properties
+from PyQt6.QtCore import (
+    Qt, QAbstractListModel, QModelIndex, # 主要用于对齐等标志
+    QObject, QRunnable, QThreadPool, QTimer, QFileSystemWatcher, pyqtSignal
 )
-from PyQt6.QtGui import QFont # For setting font properties
-from PyQt6.QtCore import Qt # 主要用于对齐等标志
 
 import core_logic # 导入我们的核心逻辑模块
+import search_index # 任务描述的全文搜索
+import scheduler # 截止日期的堆与到期提醒
+import instrumentation # 可选的性能统计 (--profile / TODO_PROFILE)
+
+# 视图选项：(显示文本, 查询条件) 和 (显示文本, 排序键)，都交给 core_logic.query 处理
+STATUS_FILTER_OPTIONS_GUI = [
+    ("全部任务", {}),
+    ("未完成", {'completed': False}),
+    ("已完成", {'completed': True}),
+]
+ARCHIVE_VIEW_LABEL_GUI = "已归档" # “显示”下拉框的最后一项：列出归档文件里的任务（双击恢复）
+ORDER_OPTIONS_GUI = [
+    ("原始顺序", None),
+    ("按截止日期", "due_date"),
+    ("按优先级", "priority"),
+    ("按描述", "description"),
+]
+
+EMPTY_LIST_TEXT_GUI = "当前没有任务。"
+COMPLETED_TASK_COLOR_GUI = QColor("#2e7d32") # 已完成任务显示为绿色，与 CLI 一致
+BACKGROUND_QUERY_THRESHOLD_GUI = 20000 # 任务数超过这个值时，排序/过滤放到工作线程里做
+FILE_CHANGE_DEBOUNCE_MS_GUI = 200 # 文件变化通知合并的时间窗口（其他进程保存时往往连续写几次）
+SEARCH_DEBOUNCE_MS_GUI = 150 # 搜索框停止输入这么久后才搜索
+SEARCH_RESULT_LIMIT_GUI = 200 # 搜索结果最多显示这么多个（按相关度）
+PROFILE_REFRESH_MS_GUI = 1000 # 开启性能统计时，状态栏读数的刷新间隔
+BULK_RESET_THRESHOLD_GUI = 100 # 一次修改这么多个任务以上时，模型整体刷新一次而不是逐行更新
+REMINDER_MAX_WAIT_MS_GUI = 6 * 3600 * 1000 # 提醒定时器最长的一次等待（防止睡眠/改时钟后错过；QTimer 也不接受太大的间隔）
+REMINDER_PREVIEW_COUNT_GUI = 3 # 提醒消息里最多列出的任务数
+# 开启性能统计时计时的 TodoAppGUI 方法（UI 线程上的入口；加载/保存本身由 core_logic 计时）
+GUI_INSTRUMENTED_METHODS = (
+    'show_tasks_gui', 'show_search_results_gui', '_on_load_finished', '_on_sync_loaded',
+    '_on_query_finished', '_on_search_finished', 'sync_from_disk_gui',
+)
+
+def format_task_display_gui(task_item_data):
+    """构建要在列表项中显示的文本。"""
+    status_char = "[x]" if task_item_data.get('completed', False) else "[ ]"
+    description = task_item_data.get('description', '无描述')
+
+    # 截止日期和优先级 (如果存在)
+    due_date_str = task_item_data.get('due_date')
+    priority_str = task_item_data.get('priority')
+
+    display_text = f"{status_char} {description}"
+    if due_date_str:
+        display_text += f" (截止: {due_date_str})"
+    if priority_str:
+        display_text += f" [优先级: {priority_str.capitalize()}]"
+    return display_text
+
+class WorkerSignals(QObject):
+    """BackgroundJob 的信号。每个信号都带着任务的 generation，过期的结果由接收方丢弃。"""
+    progress = pyqtSignal(int, int)    # generation, 已处理的任务数
+    finished = pyqtSignal(int, object) # generation, 结果
+    failed = pyqtSignal(int, str)      # generation, 错误信息
+    done = pyqtSignal()                # 无论成功、失败还是被取消，最后都会发出
+
+class BackgroundJob(QRunnable):
+    """
+    在 QThreadPool 的工作线程里执行 function(*args, **kwargs)，结果通过信号交回 UI 线程。
+
+    with_progress=True 时，会把 progress_callback / should_cancel 传给 function
+    （与 core_logic.load_tasks_data 的参数一致）；should_cancel 返回 True 时
+    function 抛出 core_logic.LoadCancelled，这个任务就静默结束。
+    """
+
+    def __init__(self, generation, function, *args, should_cancel=None, with_progress=False, **kwargs):
+        super().__init__()
+        self.generation = generation
+        self.signals = WorkerSignals()
+        self._function = function
+        self._args = args
+        self._kwargs = kwargs
+        if with_progress:
+            self._kwargs['progress_callback'] = self._report_progress
+            self._kwargs['should_cancel'] = should_cancel
+
+    def _report_progress(self, count):
+        self.signals.progress.emit(self.generation, count)
+
+    def run(self):
+        try:
+            result = self._function(*self._args, **self._kwargs)
+        except core_logic.LoadCancelled:
+            pass
+        except Exception as e:
+            self.signals.failed.emit(self.generation, str(e))
+        else:
+            self.signals.finished.emit(self.generation, result)
+        finally:
+            self.signals.done.emit()
+
+class TaskListModel(QAbstractListModel):
+    """
+    直接以 core_logic 的任务容器 / 查询结果为数据源的列表模型。
+
+    - 只保存任务引用，显示文本在 data() 中按需格式化，只有可见行才会被格式化；
+    - 行通过 canFetchMore/fetchMore 分批暴露给视图，10 万行也不会一次性创建；
+    - 通过 core_logic 的任务监听器接收增删改事件，发出细粒度的
+      rowsInserted / dataChanged / rowsRemoved 信号，而不是整表清空重建。
+    """
+    FETCH_BATCH_SIZE = 500
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._source = None   # 当前显示的任务容器
+        self._rows = []       # 当前查询结果（任务引用），按显示顺序
+        self._fetched = 0     # 已经暴露给视图的行数
+        self._row_of = None   # task id -> row，按需重建
+        self._follows_source_order = True # 原始顺序且无过滤时，新增任务直接追加到末尾
+        self._suspended = False # 批量修改期间不逐行处理事件
+        core_logic.add_task_listener(self._on_task_event)
+
+    # 数据源
+    def set_rows(self, source, rows, follows_source_order=True):
+        """切换到新的查询结果。id 序列没变时只发 dataChanged，末尾新增时只发 rowsInserted。"""
+        rows = list(rows)
+        old_ids = [task['id'] for task in self._rows]
+        new_ids = [task['id'] for task in rows]
+        self._source = source
+        self._follows_source_order = follows_source_order
+        if self._rows and new_ids[:len(old_ids)] == old_ids:
+            self._rows = rows
+            self._row_of = None
+            if self._fetched:
+                self.dataChanged.emit(self.index(0), self.index(self._fetched - 1))
+            if len(new_ids) > len(old_ids) and self._fetched == len(old_ids):
+                self._fetch(len(new_ids) - len(old_ids)) # 之前已全部显示：直接插入新增的行
+            return
+        self.beginResetModel()
+        self._rows = rows
+        self._row_of = None
+        self._fetched = min(len(self._rows), self.FETCH_BATCH_SIZE)
+        self.endResetModel()
+
+    def begin_bulk_update(self):
+        """批量修改开始：清空视图并暂停逐行更新。结束后调用 end_bulk_update，再重新 set_rows。"""
+        self.beginResetModel()
+        self._suspended = True
+
+    def end_bulk_update(self):
+        self._rows = []
+        self._fetched = 0
+        self._row_of = None
+        self._suspended = False
+        self.endResetModel()
+
+    def task_at(self, row):
+        return self._rows[row] if 0 <= row < len(self._rows) else None
+
+    def _row_for_id(self, task_id):
+        if self._row_of is None:
+            self._row_of = {task['id']: row for row, task in enumerate(self._rows)}
+        return self._row_of.get(task_id)
+
+    # QAbstractListModel 接口
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self._fetched if self._rows else 1 # 空列表时显示一行提示
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if not self._rows:
+            return EMPTY_LIST_TEXT_GUI if role == Qt.ItemDataRole.DisplayRole else None
+        task_item_data = self._rows[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return format_task_display_gui(task_item_data)
+        if role == Qt.ItemDataRole.ForegroundRole and task_item_data.get('completed', False):
+            return COMPLETED_TASK_COLOR_GUI
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._fetched < len(self._rows)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        self._fetch(min(self.FETCH_BATCH_SIZE, len(self._rows) - self._fetched))
+
+    def _fetch(self, count):
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._fetched, self._fetched + count - 1)
+        self._fetched += count
+        self.endInsertRows()
+
+    # 增量更新
+    def _on_task_event(self, event, task, tasks_list=None, **details):
+        if self._source is None or self._suspended:
+            return
+        if event == 'add':
+            if tasks_list is not self._source or not self._follows_source_order:
+                return
+            row = details.get('index')
+            if row is not None and row < len(self._rows): # 插入到中间（例如撤销删除）
+                visible = row < self._fetched
+                if visible:
+                    self.beginInsertRows(QModelIndex(), row, row)
+                self._rows.insert(row, task)
+                self._row_of = None
+                if visible:
+                    self._fetched += 1
+                    self.endInsertRows()
+            else:
+                was_empty = not self._rows
+                if was_empty:
+                    self.beginResetModel()
+                self._rows.append(task)
+                if self._row_of is not None:
+                    self._row_of[task['id']] = len(self._rows) - 1
+                if was_empty:
+                    self._fetched = 1
+                    self.endResetModel()
+                elif self._fetched == len(self._rows) - 1:
+                    self._fetch(1)
+            return
+        row = self._row_for_id(task['id'])
+        if row is None:
+            return
+        if event == 'delete':
+            if tasks_list is not self._source:
+                return
+            if len(self._rows) == 1:
+                self.beginResetModel()
+                self._rows = []
+                self._fetched = 0
+                self._row_of = None
+                self.endResetModel()
+                return
+            visible = row < self._fetched
+            if visible:
+                self.beginRemoveRows(QModelIndex(), row, row)
+            del self._rows[row]
+            self._row_of = None
+            if visible:
+                self._fetched -= 1
+                self.endRemoveRows()
+        elif row < self._fetched and core_logic.owns_task(self._source, task): # update / toggle
+            self._rows[row] = task
+            model_index = self.index(row)
+            self.dataChanged.emit(model_index, model_index)
 
 class TodoAppGUI(QMainWindow): # 继承 QMainWindow 以便将来添加菜单栏、状态栏等
     def __init__(self):
@@ -17,6 +266,39 @@ class TodoAppGUI(QMainWindow): # 继承 QMainWindow 以便将来添加菜单栏
 
         self.tasks_data_list = [] # 用于存储从 core_logic 加载的任务字典列表
 
+        # 后台工作：读写文件用单线程的池，保证加载和保存按提交顺序执行；排序/过滤用全局池。
+        # 每次刷新/查询都递增 generation，过期的加载会被取消，过期的结果直接丢弃。
+        self.io_pool = QThreadPool(self)
+        self.io_pool.setMaxThreadCount(1)
+        self.query_pool = QThreadPool.globalInstance()
+        self._load_generation = 0
+        self._query_generation = 0
+        self._load_started_at = 0.0
+        self._query_source = None
+        self._running_jobs = set() # 保持 BackgroundJob（及其信号对象）存活直到执行完毕
+        self._loaded = False
+        self._local_edits = 0 # 本进程的修改次数；后台同步期间有本地修改时，丢弃那次同步结果
+        core_logic.add_task_listener(self._count_local_edit)
+        self.history = None # core_logic.TaskHistory，加载完成后挂到当前任务列表上
+        self.archived_tasks = None # 归档里的任务 (TaskList)，第一次切到“已归档”视图时才在后台读取
+        self._archive_load_generation = None # 正在读取归档的那次加载的 generation
+        self.reminders = None # scheduler.ReminderEngine，加载完成后建立
+
+        # 到期提醒：定时器只在下一个提醒时刻触发，修改任务后重新计算这个时刻
+        self.reminder_timer = QTimer(self)
+        self.reminder_timer.setSingleShot(True)
+        self.reminder_timer.timeout.connect(self.check_reminders_gui)
+
+        # 其他进程（例如 CLI）修改任务文件时自动同步。保存时文件可能被替换或删除，
+        # 所以同时监视所在目录，并在每次检查后重新登记文件。
+        self.file_watcher = QFileSystemWatcher(self)
+        self.file_check_timer = QTimer(self)
+        self.file_check_timer.setSingleShot(True)
+        self.file_check_timer.setInterval(FILE_CHANGE_DEBOUNCE_MS_GUI)
+        self.file_check_timer.timeout.connect(self.sync_from_disk_gui)
+        self.file_watcher.fileChanged.connect(self.file_check_timer.start)
+        self.file_watcher.directoryChanged.connect(self.file_check_timer.start)
+
         self.setWindowTitle('我的任务清单 - PyQt GUI V0.9')
         self.setGeometry(150, 150, 600, 450) # x, y, width, height
 
@@ -36,75 +318,511 @@ class TodoAppGUI(QMainWindow): # 继承 QMainWindow 以便将来添加菜单栏
         title_label.setFont(title_font)
         title_label.setAlignment(Qt.AlignmentFlag.AlignCenter) # 居中对齐
         
-        # 任务列表控件
-        self.task_list_widget = QListWidget()
-        self.task_list_widget.setStyleSheet("""
-            QListWidget {
+        # 任务列表控件 (模型/视图：只格式化可见行)
+        self.task_model = TaskListModel(self)
+        self.task_list_view = QListView()
+        self.task_list_view.setModel(self.task_model)
+        self.task_list_view.setUniformItemSizes(True) # 行高一致，视图无需逐行测量
+        self.task_list_view.setStyleSheet("""
+            QListView {
                 font-size: 14px;
             }
-            QListWidget::item { 
+            QListView::item { 
                 padding: 6px; 
                 border-bottom: 1px solid #eee;
             }
-            QListWidget::item:hover {
+            QListView::item:hover {
                 background-color: #f0f0f0;
             }
         """)
 
+        # 过滤与排序选项
+        self.status_filter_combo = QComboBox()
+        for label, _conditions in STATUS_FILTER_OPTIONS_GUI:
+            self.status_filter_combo.addItem(label)
+        self.status_filter_combo.addItem(ARCHIVE_VIEW_LABEL_GUI)
+        self.order_combo = QComboBox()
+        for label, _sort_key in ORDER_OPTIONS_GUI:
+            self.order_combo.addItem(label)
+        options_layout = QHBoxLayout()
+        options_layout.addWidget(QLabel('显示:'))
+        options_layout.addWidget(self.status_filter_combo)
+        options_layout.addWidget(QLabel('排序:'))
+        options_layout.addWidget(self.order_combo)
+        options_layout.addStretch()
+
+        # 搜索框：输入停顿后按相关度显示匹配的任务，清空后恢复上面的过滤/排序视图
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText('搜索任务描述...')
+        self.search_edit.setClearButtonEnabled(True)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS_GUI)
+        search_layout = QHBoxLayout()
+        search_layout.addWidget(QLabel('搜索:'))
+        search_layout.addWidget(self.search_edit)
+
         # 按钮
         self.load_button = QPushButton('加载 / 刷新任务')
         self.load_button.setFont(QFont("Arial", 10))
+        self.undo_button = QPushButton('撤销')
+        self.redo_button = QPushButton('重做')
+        self.complete_all_button = QPushButton('全部完成')
+        self.purge_button = QPushButton('删除已完成')
+        self.archive_button = QPushButton('归档已完成')
+        buttons_layout = QHBoxLayout()
+        buttons_layout.addWidget(self.undo_button)
+        buttons_layout.addWidget(self.redo_button)
+        buttons_layout.addWidget(self.complete_all_button)
+        buttons_layout.addWidget(self.purge_button)
+        buttons_layout.addWidget(self.archive_button)
+        buttons_layout.addWidget(self.load_button, 1)
+        # 快捷键 (Ctrl+Z / Ctrl+Shift+Z 等，随平台而定)
+        self.undo_action = QAction('撤销', self)
+        self.undo_action.setShortcut(QKeySequence.StandardKey.Undo)
+        self.redo_action = QAction('重做', self)
+        self.redo_action.setShortcut(QKeySequence.StandardKey.Redo)
+        self.addAction(self.undo_action)
+        self.addAction(self.redo_action)
+        self.update_history_buttons_gui()
         
         # --- 将控件添加到布局 ---
         main_layout.addWidget(title_label)
-        main_layout.addWidget(self.task_list_widget) # 占据大部分空间
-        main_layout.addWidget(self.load_button)
+        main_layout.addLayout(options_layout)
+        main_layout.addLayout(search_layout)
+        main_layout.addWidget(self.task_list_view) # 占据大部分空间
+        main_layout.addLayout(buttons_layout)
 
         # --- 设置布局的外边距和控件间距 (可选) ---
         main_layout.setContentsMargins(10, 10, 10, 10) # left, top, right, bottom
         main_layout.setSpacing(10) # Spacing between widgets
 
+        self.statusBar().showMessage('就绪')
+        self.due_label = QLabel() # 常驻在状态栏右侧：已过期 / 今天到期的任务数
+        self.statusBar().addPermanentWidget(self.due_label)
+        if instrumentation.is_enabled():
+            # 性能统计读数：常驻在状态栏右侧，定时刷新
+            self.profile_label = QLabel()
+            self.statusBar().addPermanentWidget(self.profile_label)
+            self.profile_timer = QTimer(self)
+            self.profile_timer.timeout.connect(
+                lambda: self.profile_label.setText(instrumentation.summary_line()))
+            self.profile_timer.start(PROFILE_REFRESH_MS_GUI)
+
         # --- 连接信号与槽 ---
-        self.load_button.clicked.connect(self.populate_task_list_gui) # 点击按钮时调用
+        self.load_button.clicked.connect(self.refresh_tasks_gui) # 点击按钮时调用
+        self.undo_button.clicked.connect(self.undo_gui)
+        self.redo_button.clicked.connect(self.redo_gui)
+        self.complete_all_button.clicked.connect(self.complete_all_gui)
+        self.purge_button.clicked.connect(self.purge_completed_gui)
+        self.archive_button.clicked.connect(self.archive_completed_gui)
+        self.undo_action.triggered.connect(self.undo_gui)
+        self.redo_action.triggered.connect(self.redo_gui)
+        self.task_list_view.doubleClicked.connect(self.toggle_task_gui) # 双击切换完成状态（归档视图里是恢复）
+        self.status_filter_combo.currentIndexChanged.connect(self.show_tasks_gui) # 只重新查询，不重新加载
+        self.order_combo.currentIndexChanged.connect(self.show_tasks_gui)
+        self.search_edit.textChanged.connect(self.search_timer.start)
+        self.search_timer.timeout.connect(self.show_tasks_gui)
 
         # --- 初始加载数据 ---
         self.populate_task_list_gui() # 程序启动时自动加载并显示任务
 
     def populate_task_list_gui(self):
-        """从 core_logic 加载任务并填充到 QListWidget 中。"""
-        # print("GUI: 正在加载任务...") # 调试信息，可以打印到控制台
-        self.tasks_data_list = core_logic.load_tasks_data() # 从核心逻辑加载数据
-        
-        self.task_list_widget.clear() # 清空列表，防止重复添加
-
-        if not self.tasks_data_list:
-            self.task_list_widget.addItem("当前没有任务。")
-            # print("GUI: 没有任务数据。")
-            return
-
-        # print(f"GUI: 加载了 {len(self.tasks_data_list)} 个任务。")
-        for task_item_data in self.tasks_data_list:
-            # 构建要在列表项中显示的文本
-            status_char = "[x]" if task_item_data.get('completed', False) else "[ ]"
-            description = task_item_data.get('description', '无描述')
-            
-            # 截止日期和优先级 (如果存在)
-            due_date_str = task_item_data.get('due_date')
-            priority_str = task_item_data.get('priority')
-
-            display_text = f"{status_char} {description}"
-            if due_date_str:
-                display_text += f" (截止: {due_date_str})"
-            if priority_str:
-                display_text += f" [优先级: {priority_str.capitalize()}]"
-            
-            self.task_list_widget.addItem(display_text)
-        
-        # 后续版本可以考虑根据任务状态给条目设置不同颜色或图标
-        # 例如，使用 QListWidgetItem 并设置其 setForeground 或 setIcon
+        """在后台线程中从 core_logic 加载任务，完成后在 UI 线程里显示到列表视图中。"""
+        self._load_generation += 1 # 还在进行的旧加载会在下一个进度点被取消
+        generation = self._load_generation
+        self._load_started_at = time.perf_counter()
+        self.statusBar().showMessage('正在加载任务...')
+        job = BackgroundJob(generation, core_logic.load_tasks_data, with_progress=True,
+                            should_cancel=lambda: generation != self._load_generation)
+        job.signals.progress.connect(self._on_load_progress)
+        job.signals.finished.connect(self._on_load_finished)
+        job.signals.failed.connect(self._on_job_failed)
+        self._start_job(self.io_pool, job)
+
+    def _start_job(self, pool, job):
+        self._running_jobs.add(job)
+        job.signals.done.connect(lambda: self._running_jobs.discard(job))
+        pool.start(job)
+
+    def _on_load_progress(self, generation, count):
+        if generation == self._load_generation:
+            self.statusBar().showMessage(f'正在加载任务... 已读取 {count} 个')
+
+    def _on_load_finished(self, generation, tasks):
+        if generation != self._load_generation:
+            return # 已经有更新的刷新请求
+        self.tasks_data_list = tasks
+        self._loaded = True
+        self.archived_tasks = None
+        if self.history is not None:
+            self.history.detach() # 旧列表的历史不再适用
+        self.history = core_logic.TaskHistory(tasks)
+        self.update_history_buttons_gui()
+        elapsed = time.perf_counter() - self._load_started_at
+        self.statusBar().showMessage(f'已加载 {len(tasks)} 个任务，用时 {elapsed:.2f} 秒')
+        self.show_tasks_gui()
+        self.watch_task_files_gui()
+        if self.reminders is not None:
+            self.reminders.scheduler.detach()
+        self.reminders = scheduler.ReminderEngine(scheduler.scheduler_for(tasks), self.show_reminders_gui)
+        self.check_reminders_gui()
+        self.auto_archive_gui()
+
+    def auto_archive_gui(self):
+        """
+        首次加载后按自动归档策略归档一次。作为普通修改执行：历史、模型和提醒都收到删除事件，
+        可以撤销。之后的同步重新加载不会归档。
+        """
+        if core_logic.archive_policy() == (None, None):
+            return
+        count = self._apply_edit_gui(lambda: core_logic.auto_archive_tasks(self.tasks_data_list),
+                                     len(self.tasks_data_list), grouped=True)
+        if count:
+            self.statusBar().showMessage(f'已自动归档 {count} 个已完成的旧任务 (可以撤销)')
+
+    def refresh_tasks_gui(self):
+        """刷新按钮：首次完整加载；之后只在文件被其他进程修改时才同步变化的任务。"""
+        if not self._loaded:
+            self.populate_task_list_gui()
+        elif not self.sync_from_disk_gui():
+            self.statusBar().showMessage('任务文件没有变化')
+
+    def sync_from_disk_gui(self):
+        """
+        文件有外部修改时，在后台重新加载，再在 UI 线程里按 id 合并差异，
+        模型只收到变化的行。没有变化时只花几次 stat，返回 False。
+        """
+        self.watch_task_files_gui()
+        if not self._loaded or not core_logic.storage_changed_on_disk():
+            return False
+        self._load_generation += 1
+        # strict：文件正被其他程序写到一半时加载失败（不合并），而不是得到空列表把任务都“同步删除”
+        job = BackgroundJob(self._load_generation, core_logic.load_tasks_data, strict=True)
+        job.local_edits = self._local_edits
+        job.signals.finished.connect(lambda generation, fresh_tasks: self._on_sync_loaded(job, fresh_tasks))
+        job.signals.failed.connect(self._on_job_failed)
+        self.statusBar().showMessage('任务文件已被修改，正在同步...')
+        self._start_job(self.io_pool, job)
+        return True
+
+    def _on_sync_loaded(self, job, fresh_tasks):
+        if job.generation != self._load_generation:
+            return
+        if job.local_edits != self._local_edits:
+            # 加载期间本地有修改，这份结果会把它们当成“被删除/被改回”：保存后再同步一次。
+            self.file_check_timer.start()
+            return
+        with core_logic.save_lock():
+            changed_count = core_logic.merge_loaded_tasks(self.tasks_data_list, fresh_tasks)
+        if changed_count:
+            self.archived_tasks = None # 其他程序可能归档或恢复了任务
+        if changed_count and not self._shows_source_order():
+            self.show_tasks_gui() # 排序/过滤视图：新增和修改的任务可能要换位置
+        self.statusBar().showMessage(f'已同步 {changed_count} 个来自其他程序的修改')
+        if changed_count:
+            self.arm_reminder_timer_gui()
+
+    def _count_local_edit(self, event, task, external=False, **details):
+        if not external:
+            self._local_edits += 1
+
+    def watch_task_files_gui(self):
+        backend = core_logic.get_storage_backend()
+        paths = list(getattr(backend, 'watched_files', lambda: [])())
+        directories = {os.path.dirname(os.path.abspath(path)) for path in paths}
+        wanted = [path for path in paths + sorted(directories) if os.path.exists(path)]
+        watched = set(self.file_watcher.files()) | set(self.file_watcher.directories())
+        missing = [path for path in wanted if path not in watched]
+        if missing:
+            self.file_watcher.addPaths(missing)
+
+    def _on_job_failed(self, generation, message):
+        self.statusBar().showMessage(f'后台操作失败: {message}')
+
+    def save_tasks_gui(self):
+        """
+        在 I/O 线程中保存当前任务；与加载共用单线程池，所以不会和加载交错执行。
+        UI 线程只在持有 core_logic.save_lock() 时修改列表，保存不会读到改了一半的任务。
+        """
+        job = BackgroundJob(self._load_generation, core_logic.save_tasks_data, self.tasks_data_list)
+        job.signals.failed.connect(self._on_job_failed)
+        self._start_job(self.io_pool, job)
+
+    # 修改与撤销/重做
+    def toggle_task_gui(self, index):
+        task = self.task_model.task_at(index.row())
+        if task is None:
+            return
+        if self._shows_archive_gui():
+            self.restore_archived_gui(task)
+            return
+        self._apply_edit_gui(lambda: core_logic.toggle_task_completion_data(task), 1)
+
+    def undo_gui(self):
+        if self.history is None or not self.history.can_undo():
+            self.statusBar().showMessage('没有可以撤销的修改')
+            return
+        self.archived_tasks = None # 撤销归档/恢复会改变归档视图的内容
+        count = self._apply_edit_gui(self.history.undo, self.history.undo_step_size())
+        self.statusBar().showMessage(f'已撤销 ({count} 个任务)')
+
+    def redo_gui(self):
+        if self.history is None or not self.history.can_redo():
+            self.statusBar().showMessage('没有可以重做的修改')
+            return
+        self.archived_tasks = None
+        count = self._apply_edit_gui(self.history.redo, self.history.redo_step_size())
+        self.statusBar().showMessage(f'已重做 ({count} 个任务)')
+
+    def complete_all_gui(self):
+        if not self._loaded:
+            return
+        count = self._apply_edit_gui(lambda: core_logic.complete_all_tasks_data(self.tasks_data_list),
+                                     len(self.tasks_data_list), grouped=True)
+        self.statusBar().showMessage(f'已把 {count} 个任务标记为已完成')
+
+    def purge_completed_gui(self):
+        if not self._loaded:
+            return
+        completed_count = sum(1 for task in self.tasks_data_list if task.get('completed'))
+        if not completed_count:
+            self.statusBar().showMessage('没有已完成的任务')
+            return
+        answer = QMessageBox.question(self, '删除已完成任务', f'确定要删除 {completed_count} 个已完成任务吗？')
+        if answer != QMessageBox.StandardButton.Yes:
+            return
+        count = self._apply_edit_gui(lambda: core_logic.purge_completed_tasks_data(self.tasks_data_list),
+                                     completed_count, grouped=True)
+        self.statusBar().showMessage(f'已删除 {count} 个已完成任务')
+
+    # 归档
+    def archive_completed_gui(self):
+        """按已设置的归档策略（没有设置时为 ARCHIVE_DEFAULT_DAYS 天）把已完成的旧任务移到归档文件。"""
+        if not self._loaded:
+            return
+        after_days, max_tasks = core_logic.archive_policy()
+        if after_days is None and max_tasks is None:
+            after_days = core_logic.ARCHIVE_DEFAULT_DAYS
+        count = len(core_logic.select_tasks_to_archive(self.tasks_data_list, after_days, max_tasks))
+        if not count:
+            self.statusBar().showMessage('没有需要归档的已完成任务')
+            return
+        rule = f'截止日期早于 {after_days} 天前' if after_days is not None else f'任务数超过 {max_tasks} 个时最早'
+        answer = QMessageBox.question(self, '归档已完成任务', f'把 {count} 个{rule}的已完成任务移到归档吗？')
+        if answer != QMessageBox.StandardButton.Yes:
+            return
+        try:
+            count = self._apply_edit_gui(
+                lambda: core_logic.archive_tasks_data(self.tasks_data_list, after_days, max_tasks), count, grouped=True)
+        except OSError as e:
+            self.statusBar().showMessage(f'写入归档文件失败: {e}')
+            return
+        self.archived_tasks = None
+        self.statusBar().showMessage(f'已归档 {count} 个任务')
+
+    def restore_archived_gui(self, task):
+        archived = self.archived_tasks
+        self._apply_edit_gui(lambda: core_logic.restore_archived_tasks(self.tasks_data_list, archived, [task['id']])[0], 1)
+        self.statusBar().showMessage(f"已恢复: {task['description']}")
+
+    def _shows_archive_gui(self):
+        return self.status_filter_combo.currentIndex() >= len(STATUS_FILTER_OPTIONS_GUI)
+
+    def _status_conditions_gui(self):
+        """“显示”下拉框对应的查询条件；归档视图不按状态过滤。"""
+        index = self.status_filter_combo.currentIndex()
+        return STATUS_FILTER_OPTIONS_GUI[index][1] if index < len(STATUS_FILTER_OPTIONS_GUI) else {}
+
+    def _shown_tasks_gui(self):
+        """当前视图的数据源：热列表，或归档视图里的归档任务。"""
+        if self._shows_archive_gui() and self.archived_tasks is not None:
+            return self.archived_tasks
+        return self.tasks_data_list
+
+    def show_archive_gui(self):
+        """归档视图：第一次显示时在 I/O 线程读取归档文件（和保存排队，读到的总是保存之后的内容）。"""
+        if self.archived_tasks is None:
+            if self._archive_load_generation != self._load_generation:
+                self._archive_load_generation = self._load_generation
+                job = BackgroundJob(self._load_generation, core_logic.load_archived_tasks, self.tasks_data_list)
+                job.signals.finished.connect(self._on_archive_loaded)
+                job.signals.failed.connect(self._on_job_failed)
+                self.statusBar().showMessage('正在读取归档...')
+                self._start_job(self.io_pool, job)
+            return
+        search_text = self.search_edit.text().strip()
+        if search_text:
+            self.show_search_results_gui(search_text)
+            return
+        self.statusBar().showMessage(f'归档中有 {len(self.archived_tasks)} 个任务 (双击恢复)')
+        self.task_model.set_rows(self.archived_tasks, self.archived_tasks, follows_source_order=False)
+
+    def _on_archive_loaded(self, generation, archived):
+        if generation != self._load_generation:
+            return # 任务列表已经重新加载
+        self._archive_load_generation = None
+        self.archived_tasks = archived
+        if self._shows_archive_gui():
+            self.show_archive_gui()
+
+    def _apply_edit_gui(self, edit, expected_count, grouped=False):
+        """
+        执行一次修改（撤销/重做/批量操作）并保存。涉及的任务很多时暂停模型的逐行更新，
+        改完后整体刷新一次；grouped=True 时整批修改在撤销历史里算一步。返回 edit() 的结果。
+        """
+        bulk = expected_count > BULK_RESET_THRESHOLD_GUI
+        if bulk:
+            self.task_model.begin_bulk_update()
+        try:
+            with core_logic.save_lock(): # 后台保存正在写时等它写完，再修改列表
+                if grouped and self.history is not None:
+                    with self.history.grouped():
+                        result = edit()
+                else:
+                    result = edit()
+        finally:
+            if bulk:
+                self.task_model.end_bulk_update()
+        if result:
+            self.save_tasks_gui()
+        self.update_history_buttons_gui()
+        if bulk or not self._shows_source_order():
+            self.show_tasks_gui() # 排序/过滤视图：修改过的任务可能要换位置或不再符合条件
+        self.arm_reminder_timer_gui()
+        return result
+
+    # 到期提醒
+    def check_reminders_gui(self):
+        """提醒定时器到点：发出已到期的提醒，再按下一个提醒时刻重新设定定时器。"""
+        if self.reminders is not None:
+            self.reminders.check()
+        self.arm_reminder_timer_gui()
+
+    def arm_reminder_timer_gui(self):
+        """按 ReminderEngine 的下一个提醒时刻设定定时器（没有以后到期的任务时停掉），并刷新状态栏的到期计数。"""
+        if self.reminders is None:
+            return
+        counts = self.reminders.scheduler.counts()
+        self.due_label.setText(f"已过期 {counts['overdue']} | 今天到期 {counts['due_today']}")
+        seconds = self.reminders.seconds_until_next()
+        if seconds is None:
+            self.reminder_timer.stop()
+            return
+        self.reminder_timer.start(min(int(seconds * 1000) + 1, REMINDER_MAX_WAIT_MS_GUI))
+
+    def show_reminders_gui(self, due_tasks):
+        """ReminderEngine 的回调：在状态栏列出到期的任务，并提醒用户（任务栏闪烁等，随平台而定）。"""
+        names = '、'.join(task['description'] for task in due_tasks[:REMINDER_PREVIEW_COUNT_GUI])
+        more = f' 等 {len(due_tasks)} 个任务' if len(due_tasks) > REMINDER_PREVIEW_COUNT_GUI else ''
+        self.statusBar().showMessage(f'到期提醒: {names}{more}')
+        QApplication.alert(self)
+
+    def update_history_buttons_gui(self):
+        can_undo = self.history is not None and self.history.can_undo()
+        can_redo = self.history is not None and self.history.can_redo()
+        self.undo_button.setEnabled(can_undo)
+        self.redo_button.setEnabled(can_redo)
+
+    def closeEvent(self, event):
+        self._load_generation += 1 # 取消正在进行的加载
+        core_logic.remove_task_listener(self._count_local_edit)
+        if self.history is not None:
+            self.history.detach()
+        if self.reminders is not None:
+            self.reminder_timer.stop()
+            self.reminders.scheduler.detach()
+        self.io_pool.waitForDone() # 等待尚未完成的保存写完
+        super().closeEvent(event)
+
+    def current_query_gui(self):
+        """根据过滤/排序下拉框构建 core_logic 查询。"""
+        conditions = self._status_conditions_gui()
+        _label, sort_key = ORDER_OPTIONS_GUI[self.order_combo.currentIndex()]
+        task_query = core_logic.query(self.tasks_data_list).where(**conditions)
+        if sort_key:
+            task_query = task_query.order_by(sort_key)
+        return task_query
+
+    def show_tasks_gui(self):
+        """按当前查询把已加载的任务交给列表模型；显示文本由模型按需生成。"""
+        unfiltered = self._shows_source_order()
+        self._query_generation += 1
+        if self._shows_archive_gui():
+            self.show_archive_gui()
+            return
+        search_text = self.search_edit.text().strip()
+        if search_text:
+            self.show_search_results_gui(search_text)
+            return
+        if unfiltered:
+            self.task_model.set_rows(self.tasks_data_list, self.tasks_data_list, follows_source_order=True)
+            return
+        task_query = self.current_query_gui()
+        if len(self.tasks_data_list) < BACKGROUND_QUERY_THRESHOLD_GUI:
+            self.task_model.set_rows(self.tasks_data_list, task_query, follows_source_order=False)
+            return
+        # 大列表：在工作线程中求值查询，结果回到 UI 线程后再交给模型
+        job = BackgroundJob(self._query_generation, task_query.to_list)
+        job.signals.finished.connect(self._on_query_finished)
+        job.signals.failed.connect(self._on_job_failed)
+        self._query_source = self.tasks_data_list
+        self.statusBar().showMessage('正在排序/过滤...')
+        self._start_job(self.query_pool, job)
+
+    def show_search_results_gui(self, search_text):
+        """
+        显示搜索结果（最相关的在前），再按“显示”下拉框过滤状态。大列表第一次搜索要先
+        建索引，和后续每次搜索一样放到工作线程里；小列表直接在 UI 线程里搜索。
+        """
+        conditions = self._status_conditions_gui()
+        tasks = self._shown_tasks_gui()
+
+        def search():
+            results = search_index.search_tasks(tasks, search_text, limit=SEARCH_RESULT_LIMIT_GUI)
+            return [task for task in results
+                    if all(task.get(field) == value for field, value in conditions.items())]
+
+        if len(tasks) < BACKGROUND_QUERY_THRESHOLD_GUI:
+            self._show_search_rows_gui(search_text, search())
+            return
+        job = BackgroundJob(self._query_generation, search)
+        job.signals.finished.connect(
+            lambda generation, rows: self._on_search_finished(generation, search_text, rows))
+        job.signals.failed.connect(self._on_job_failed)
+        self._query_source = tasks
+        if not search_index.has_search_index(tasks):
+            self.statusBar().showMessage('正在建立搜索索引...')
+        self._start_job(self.query_pool, job)
+
+    def _on_search_finished(self, generation, search_text, rows):
+        if generation != self._query_generation or self._query_source is not self._shown_tasks_gui():
+            return # 搜索内容或任务列表已经变了
+        self._show_search_rows_gui(search_text, rows)
+
+    def _show_search_rows_gui(self, search_text, rows):
+        self.statusBar().showMessage(f"搜索 '{search_text}'：{len(rows)} 个结果")
+        self.task_model.set_rows(self._shown_tasks_gui(), rows, follows_source_order=False)
+
+    def _shows_source_order(self):
+        """当前视图是否按原始顺序显示全部任务（没有过滤，没有排序，也没有搜索）。"""
+        order_index = self.order_combo.currentIndex()
+        return (not self._shows_archive_gui() and not self._status_conditions_gui()
+                and ORDER_OPTIONS_GUI[order_index][1] is None and not self.search_edit.text().strip())
+
+    def _on_query_finished(self, generation, rows):
+        if generation != self._query_generation or self._query_source is not self.tasks_data_list:
+            return # 过滤/排序条件或任务列表已经变了
+        self.statusBar().showMessage(f'显示 {len(rows)} / {len(self.tasks_data_list)} 个任务')
+        self.task_model.set_rows(self.tasks_data_list, rows, follows_source_order=False)
 
 def main_gui():
-    app = QApplication(sys.argv) # 创建 QApplication 实例
+    # --profile 或 TODO_PROFILE：在创建窗口之前包装，这样信号连接到的也是计时后的方法
+    argv = instrumentation.enable_from_environment(sys.argv[1:])
+    if instrumentation.is_enabled():
+        instrumentation.instrument(TodoAppGUI, GUI_INSTRUMENTED_METHODS, prefix="gui", drop_extra_args=True)
+        instrumentation.instrument(search_index, ("search_tasks",), prefix="search")
+    app = QApplication(sys.argv[:1] + argv) # 创建 QApplication 实例
     main_window = TodoAppGUI()   # 创建我们自定义的主窗口实例
     main_window.show()           # 显示主窗口
     sys.exit(app.exec())         # 启动事件循环